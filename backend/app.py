@@ -8,8 +8,13 @@ from advanced_classifier import AdvancedWasteClassifier
 from waste_classifier import WasteClassifier
 from product_analyzer import ProductAnalyzer
 from auth_manager import get_auth_manager, token_required
+from password_hasher import HashingQueueFull
+from scan_recorder import ScanQueueFull
 from community_manager import CommunityManager
+from center_materials import MATERIAL_BITS
 from impact_calculator import ImpactCalculator
+from model_registry import get_ocr_registry
+from scan_session import ScanSessionManager
 from PIL import Image
 import io
 
@@ -30,6 +35,31 @@ auth_manager = get_auth_manager()
 community_manager = CommunityManager()
 impact_calculator = ImpactCalculator()
 
+# OCR models load once per process in the background instead of at import time
+ocr_registry = get_ocr_registry()
+ocr_registry.warm_up()
+
+scan_sessions = ScanSessionManager(product_analyzer)
+
+# Keep the in-memory leaderboard in step with committed scans
+auth_manager.scan_recorder.add_listener(community_manager.on_scans_committed)
+# ...and scan challenges advanced by the same batches
+auth_manager.scan_recorder.add_listener(community_manager.challenge_progress.on_scans_committed)
+
+# Compact scans older than the retention horizon in the background
+if auth_manager.scan_retention is not None:
+    auth_manager.scan_retention.start()
+
+# Classifier responses suggest a drop-off center only within this distance
+NEAREST_CENTER_MAX_KM = 50
+# Longest free-text location accepted from PUT /profile/location
+MAX_LOCATION_LENGTH = 100
+
+def int_arg(name, default, minimum=1, maximum=None):
+    """Integer query parameter clamped to [minimum, maximum]; ValueError if it is not an integer"""
+    value = max(int(request.args.get(name, default)), minimum)
+    return value if maximum is None else min(value, maximum)
+
 def decode_image(image_data):
     """Decode base64 image"""
     try:
@@ -53,6 +83,51 @@ def decode_image(image_data):
         print(f"Image decoding error: {e}")
         return None
 
+def build_product_response(result):
+    """Shape a ProductAnalyzer result for the mobile client"""
+    response_data = {
+        "sustainability_score": result.get('sustainability_score', 0),
+        "confidence": result.get('confidence', 0),
+        "barcode_detected": result.get('barcode_detected', False),
+        "found_keywords": result.get('found_keywords', []),
+        "extracted_text": result.get('extracted_text', ''),
+        "recommendations": result.get('recommendations', []),
+        "analysis_method": "barcode" if result.get('barcode_detected') else "ocr",
+        "skipped_stages": result.get('skipped_stages', []),
+        "elapsed_ms": result.get('elapsed_ms')
+    }
+
+    if result.get('product_info') and result['product_info'].get('found'):
+        product_info = result['product_info']
+        response_data['product_details'] = {
+            'name': product_info.get('product_name', 'Unknown'),
+            'brand': product_info.get('brands', 'Unknown'),
+            'categories': product_info.get('categories', ''),
+            'nutriscore': product_info.get('nutriscore_grade', 'N/A'),
+            'ecoscore': product_info.get('ecoscore_grade', 'N/A'),
+            'packaging': product_info.get('packaging', ''),
+            'labels': product_info.get('labels', '')
+        }
+    
+    if result.get('packaging_materials'):
+        response_data['packaging_analysis'] = {
+            'materials': result.get('packaging_materials', []),
+            'packaging_score': result.get('packaging_score', 0)
+        }
+    
+    return response_data
+
+def decode_image_bytes(img_bytes):
+    """Decode raw (non-base64) image bytes, e.g. a multipart frame"""
+    img_array = np.frombuffer(img_bytes, dtype=np.uint8)
+    return cv2.imdecode(img_array, cv2.IMREAD_COLOR)
+
+def busy_response():
+    """Fast 503 when password hashing or the scan write queue is saturated"""
+    response = jsonify({'error': 'Server busy, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @app.route('/auth/register', methods=['POST'])
 def register():
     """Register new user"""
@@ -75,6 +150,8 @@ def register():
             return jsonify(result), 201
         else:
             return jsonify(result), 400
+    except HashingQueueFull:
+        return busy_response()
     except Exception as e:
         return jsonify({'error': f'Registration failed: {str(e)}'}), 500
 
@@ -99,6 +176,8 @@ def login():
             return jsonify(result), 200
         else:
             return jsonify(result), 401
+    except HashingQueueFull:
+        return busy_response()
     except Exception as e:
         return jsonify({'error': f'Login failed: {str(e)}'}), 500
 
@@ -121,6 +200,24 @@ def get_profile():
     except Exception as e:
         return jsonify({'error': f'Failed to get profile: {str(e)}'}), 500
 
+@app.route('/profile/location', methods=['PUT'])
+@token_required
+def update_location():
+    """Set the caller's location (used for city leaderboards)"""
+    data = request.get_json() or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    location = data.get('location')
+    if location is not None and not isinstance(location, str):
+        return jsonify({'error': 'location must be a string'}), 400
+    if location and len(location) > MAX_LOCATION_LENGTH:
+        return jsonify({'error': f'location must be at most {MAX_LOCATION_LENGTH} characters'}), 400
+    
+    location = auth_manager.set_location(request.user_id, location)
+    community_manager.refresh_users([request.user_id])
+    
+    return jsonify({'success': True, 'location': location}), 200
+
 @app.route('/classify-waste/advanced', methods=['POST'])
 @token_required
 def classify_waste_advanced():
@@ -178,8 +275,17 @@ def classify_waste_advanced():
             "mode": "advanced"
         }
         
+        # Where to take it: the closest center accepting this waste type
+        if latitude is not None and longitude is not None and result['waste_type'] in MATERIAL_BITS:
+            nearest = community_manager.find_nearest_recycling_centers(
+                float(latitude), float(longitude), 1, NEAREST_CENTER_MAX_KM, result['waste_type']
+            )
+            response_data["nearest_center"] = nearest[0] if nearest else None
+        
         return jsonify(response_data), 200
         
+    except ScanQueueFull:
+        return busy_response()
     except Exception as e:
         print(f"Advanced classification error: {e}")
         traceback.print_exc()
@@ -230,6 +336,8 @@ def classify_waste_simple():
         
         return jsonify(response_data), 200
         
+    except ScanQueueFull:
+        return busy_response()
     except Exception as e:
         print(f"Simple classification error: {e}")
         traceback.print_exc()
@@ -256,46 +364,91 @@ def analyze_product():
                 "error": "Failed to decode image"
             }), 400
         
-        result = product_analyzer.analyze_product(img)
+        # Clients may ask for a tighter budget than the server's, never a looser one
+        budget = product_analyzer.analysis_budget
+        if data.get('budget_ms') is not None:
+            try:
+                budget_ms = float(data['budget_ms'])
+            except (TypeError, ValueError):
+                return jsonify({"error": "budget_ms must be a number"}), 400
+            if not budget_ms > 0:
+                return jsonify({"error": "budget_ms must be positive"}), 400
+            budget = min(budget, budget_ms / 1000)
+        
+        result = product_analyzer.analyze_product(img, deadline=budget)
         
         if 'error' in result:
             return jsonify(result), 400
         
-        response_data = {
-            "sustainability_score": result.get('sustainability_score', 0),
-            "confidence": result.get('confidence', 0),
-            "barcode_detected": result.get('barcode_detected', False),
-            "found_keywords": result.get('found_keywords', []),
-            "extracted_text": result.get('extracted_text', ''),
-            "recommendations": result.get('recommendations', []),
-            "analysis_method": "barcode" if result.get('barcode_detected') else "ocr"
-        }
+        response_data = build_product_response(result)
+        
+        return jsonify(response_data), 200
+        
+    except Exception as e:
+        print(f"Product analysis error: {e}")
+        traceback.print_exc()
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
 
-        if result.get('product_info') and result['product_info'].get('found'):
-            product_info = result['product_info']
-            response_data['product_details'] = {
-                'name': product_info.get('product_name', 'Unknown'),
-                'brand': product_info.get('brands', 'Unknown'),
-                'categories': product_info.get('categories', ''),
-                'nutriscore': product_info.get('nutriscore_grade', 'N/A'),
-                'ecoscore': product_info.get('ecoscore_grade', 'N/A'),
-                'packaging': product_info.get('packaging', ''),
-                'labels': product_info.get('labels', '')
-            }
+@app.route('/scan-session', methods=['POST'])
+@token_required
+def start_scan_session():
+    """Start a multi-frame barcode scan session"""
+    session = scan_sessions.create_session(request.user_id)
+    response_data = session.to_dict()
+    response_data['expires_in'] = scan_sessions.session_ttl
+    return jsonify(response_data), 201
+
+@app.route('/scan-session/<session_id>/frames', methods=['POST'])
+@token_required
+def scan_session_frames(session_id):
+    """Submit one or more frames; stops at the first checksum-valid barcode"""
+    try:
+        session = scan_sessions.get_session(session_id, request.user_id)
         
-        if result.get('packaging_materials'):
-            response_data['packaging_analysis'] = {
-                'materials': result.get('packaging_materials', []),
-                'packaging_score': result.get('packaging_score', 0)
+        if not session:
+            return jsonify({'error': 'Scan session not found or expired'}), 404
+        
+        frames = []
+        if request.files:
+            # Chunked upload: raw JPEG/PNG frames as multipart parts, in order
+            for frame_file in request.files.getlist('frame'):
+                frames.append(decode_image_bytes(frame_file.read()))
+        else:
+            data = request.json or {}
+            encoded_frames = data.get('frames') or ([data['frame']] if data.get('frame') else [])
+            frames = [decode_image(encoded) for encoded in encoded_frames]
+        
+        frames = [frame for frame in frames if frame is not None]
+        if not frames:
+            return jsonify({'error': 'No decodable frames in request'}), 400
+        
+        scan_sessions.process_frames(session, frames)
+        response_data = session.to_dict()
+        
+        if session.barcode:
+            response_data['barcode'] = {
+                'data': session.barcode['data'],
+                'type': session.barcode['type']
             }
+            result = product_analyzer.analyze_barcode(session.barcode)
+            response_data['analysis'] = build_product_response(result)
+            scan_sessions.close_session(session_id, request.user_id)
         
         return jsonify(response_data), 200
         
     except Exception as e:
-        print(f"Product analysis error: {e}")
+        print(f"Scan session error: {e}")
         traceback.print_exc()
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+@app.route('/scan-session/<session_id>', methods=['DELETE'])
+@token_required
+def end_scan_session(session_id):
+    """Abandon a scan session"""
+    if scan_sessions.close_session(session_id, request.user_id):
+        return jsonify({'message': 'Scan session closed'}), 200
+    return jsonify({'error': 'Scan session not found'}), 404
+
 @app.route('/impact', methods=['GET'])
 @token_required
 def get_impact():
@@ -311,18 +464,7 @@ def get_impact():
         if not profile:
             return jsonify({'error': 'User not found'}), 404
         
-        import sqlite3
-        conn = sqlite3.connect('ecolife_users.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT waste_type, confidence
-            FROM scan_history
-            WHERE user_id = ?
-        ''', (user_id,))
-        
-        scans = [{'waste_type': row[0], 'confidence': row[1]} for row in cursor.fetchall()]
-        conn.close()
+        scans = auth_manager.get_scan_summary(user_id)
         
         impact = impact_calculator.calculate_cumulative_impact(scans)
         
@@ -341,7 +483,10 @@ def get_leaderboard():
     """Get global or local leaderboard"""
     timeframe = request.args.get('timeframe', 'all')  
     location = request.args.get('location')
-    limit = int(request.args.get('limit', 50))
+    try:
+        limit = int_arg('limit', 50)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
     
     if location:
         leaderboard = community_manager.get_local_leaderboard(location, limit)
@@ -350,11 +495,40 @@ def get_leaderboard():
     
     return jsonify(leaderboard), 200
 
+@app.route('/leaderboard/locations', methods=['GET'])
+def get_active_locations():
+    """Most active locations, for browsing city leaderboards"""
+    try:
+        limit = int_arg('limit', 20, maximum=100)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    return jsonify(community_manager.get_active_locations(limit)), 200
+
+@app.route('/leaderboard/me', methods=['GET'])
+@token_required
+def get_my_rank():
+    """The caller's rank with the users just above and below"""
+    try:
+        radius = int_arg('radius', 5, maximum=50)
+    except ValueError:
+        return jsonify({'error': 'radius must be an integer'}), 400
+    timeframe = request.args.get('timeframe', 'all')
+    
+    result = community_manager.get_user_rank(request.user_id, radius, timeframe)
+    if result is None:
+        return jsonify({'error': 'Not ranked yet - scan an item to join the leaderboard'}), 404
+    
+    return jsonify(result), 200
+
 @app.route('/challenges', methods=['GET'])
 def get_challenges():
-    """Get active challenges"""
-    challenges = community_manager.get_active_challenges()
-    return jsonify(challenges), 200
+    """Get active challenges (ETag / If-None-Match for cheap revalidation)"""
+    challenges, etag = community_manager.get_active_challenges_with_etag()
+    
+    response = jsonify(challenges)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/challenges/join', methods=['POST'])
 @token_required
@@ -379,8 +553,17 @@ def join_challenge():
 
 @app.route('/eco-tip', methods=['GET'])
 def get_eco_tip():
-    """Get daily eco tip"""
-    tip = community_manager.get_daily_eco_tip()
+    """Get daily eco tip (?category=, or the caller's most scanned waste type when signed in)"""
+    category = request.args.get('category')
+    
+    token = request.headers.get('Authorization', '')
+    if category is None and token:
+        payload = auth_manager.verify_token(token[7:] if token.startswith('Bearer ') else token)
+        profile = auth_manager.get_user_profile(payload['user_id']) if payload else None
+        if profile and profile['waste_breakdown']:
+            category = max(profile['waste_breakdown'], key=lambda w: w['count'])['type']
+    
+    tip = community_manager.get_daily_eco_tip(category)
     
     if tip:
         return jsonify(tip), 200
@@ -390,16 +573,53 @@ def get_eco_tip():
 @app.route('/recycling-centers', methods=['GET'])
 def find_recycling_centers():
     """Find nearby recycling centers"""
-    latitude = float(request.args.get('latitude', 0))
-    longitude = float(request.args.get('longitude', 0))
-    radius = float(request.args.get('radius', 10))
+    try:
+        latitude = float(request.args.get('latitude', 0))
+        longitude = float(request.args.get('longitude', 0))
+        limit = int_arg('limit', 10, maximum=100)
+        nearest = int_arg('nearest', 5, maximum=100) if 'nearest' in request.args else None
+        radius = request.args.get('radius')
+        radius = float(radius) if radius else None
+    except ValueError:
+        return jsonify({
+            'error': 'latitude, longitude and radius must be numbers; limit and nearest integers'
+        }), 400
+    if radius is not None and not radius > 0:
+        return jsonify({'error': 'radius must be positive'}), 400
+    waste_type = request.args.get('waste_type') or None
     
-    centers = community_manager.find_nearby_recycling_centers(
-        latitude, longitude, radius
-    )
+    if waste_type is not None and waste_type not in MATERIAL_BITS:
+        return jsonify({
+            'error': f"Unknown waste_type, expected one of: {', '.join(MATERIAL_BITS)}"
+        }), 400
+    
+    if nearest is not None:
+        # k-nearest, optionally capped by radius
+        centers = community_manager.find_nearest_recycling_centers(
+            latitude, longitude, nearest, radius, waste_type
+        )
+    else:
+        centers = community_manager.find_nearby_recycling_centers(
+            latitude, longitude, radius or 10, limit, waste_type
+        )
     
     return jsonify(centers), 200
 
+@app.route('/recycling-centers/clusters', methods=['GET'])
+def get_recycling_center_clusters():
+    """Recycling center clusters for a map viewport: bbox=west,south,east,north&zoom=z"""
+    try:
+        west, south, east, north = (float(value) for value in request.args['bbox'].split(','))
+        zoom = int(request.args.get('zoom', 10))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'bbox=west,south,east,north and an integer zoom are required'}), 400
+    
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        return jsonify({'error': 'bbox is out of range'}), 400
+    
+    clusters = community_manager.get_center_clusters(south, west, north, east, zoom)
+    return jsonify(clusters), 200
+
 @app.route('/community/stats', methods=['GET'])
 def get_community_stats():
     """Get global community impact statistics"""
@@ -469,10 +689,10 @@ def home():
         "endpoints": {
             "auth": ["/auth/register", "/auth/login", "/verify-token", "/debug-token"],
             "classification": ["/classify-waste/advanced", "/classify-waste/simple"],
-            "analysis": ["/analyze-product"],
+            "analysis": ["/analyze-product", "/scan-session"],
             "user": ["/profile", "/impact"],
-            "community": ["/leaderboard", "/challenges", "/community/stats"],
-            "info": ["/eco-tip", "/recycling-centers"]
+            "community": ["/leaderboard", "/leaderboard/me", "/leaderboard/locations", "/challenges", "/community/stats"],
+            "info": ["/eco-tip", "/recycling-centers", "/recycling-centers/clusters"]
         },
         "note": "Most endpoints require JWT token in Authorization header"
     })
@@ -488,7 +708,28 @@ def health_check():
             "impact_calculator": "active",
             "advanced_classifier": "loaded",
             "simple_classifier": "loaded",
-            "product_analyzer": "loaded"
+            "product_analyzer": ocr_registry.load_state()
+        },
+        "ocr_models": ocr_registry.status(),
+        "token_cache": auth_manager.token_cache.stats(),
+        "profile_cache": auth_manager.profile_cache.stats(),
+        "password_hashing": auth_manager.password_hasher.stats(),
+        "scan_recorder": auth_manager.scan_recorder.stats(),
+        "leaderboard_index": community_manager.leaderboard.stats(),
+        "center_index": community_manager.center_index.stats(),
+        "center_clusters": community_manager.center_clusters.stats(),
+        "tip_catalog": community_manager.tip_catalog.stats(),
+        "challenge_cache": community_manager.challenge_cache.stats(),
+        "challenge_progress": community_manager.challenge_progress.stats(),
+        "local_leaderboards": community_manager.local_leaderboards.stats(),
+        "leaderboard_sync": community_manager.leaderboard_sync_stats(),
+        "windowed_leaderboards": {
+            timeframe: board.stats() for timeframe, board in community_manager.windowed_leaderboards.items()
+        },
+        "scan_retention": auth_manager.scan_retention.stats() if auth_manager.scan_retention else None,
+        "databases": auth_manager.storage.health(),
+        "product_lookup_sources": {
+            name: breaker.to_dict() for name, breaker in product_analyzer.source_breakers.items()
         }
     })
 
@@ -507,9 +748,13 @@ if __name__ == '__main__':
     print("\nAdded debug endpoint: /debug-token")
     print("\nProtected Endpoints (require token):")
     print("  GET  /profile")
+    print("  PUT  /profile/location")
     print("  POST /classify-waste/advanced")
     print("  POST /classify-waste/simple")
+    print("  POST /scan-session")
+    print("  POST /scan-session/<id>/frames")
     print("  GET  /impact")
+    print("  GET  /leaderboard/me")
     print("  POST /challenges/join")
     print("\nPublic Endpoints:")
     print("  POST /auth/register")
@@ -517,8 +762,11 @@ if __name__ == '__main__':
     print("  POST /verify-token")
     print("  GET  /debug-token")
     print("  GET  /leaderboard")
+    print("  GET  /leaderboard/locations")
     print("  GET  /challenges")
     print("  GET  /eco-tip")
+    print("  GET  /recycling-centers")
+    print("  GET  /recycling-centers/clusters")
     print("\nServer Configuration:")
     print("  Host: 0.0.0.0")
     print("  Port: 5500")
@@ -1,10 +1,16 @@
 import jwt
-import bcrypt
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
-import sqlite3
 import os
+from storage import get_storage
+from repositories import DuplicateRecordError
+from token_cache import VerifiedTokenCache
+from password_hasher import PasswordHasher, HashingQueueFull
+from scan_recorder import ScanRecorder
+from profile_cache import ProfileCache
+from scan_retention import ScanRetention, default_archive_path
+from locations import normalize_location
 
 # Create a SINGLE instance of AuthManager
 _auth_manager = None
@@ -17,67 +23,49 @@ def get_auth_manager():
     return _auth_manager
 
 class AuthManager:
-    def __init__(self, db_path='ecolife_users.db'):
+    def __init__(self, db_path='ecolife_users.db', token_cache_size=10000,
+                 bcrypt_rounds=12, hash_workers=2, hash_queue=32, scan_durability='async',
+                 profile_cache_size=5000, profile_cache_ttl=300,
+                 scan_retention_days=90, scan_archive_path=None, storage=None):
         self.db_path = db_path
+        # Users, scans and achievements live behind the storage repositories;
+        # the community database sits next to the users database
+        self.storage = storage or get_storage(
+            users_db_path=db_path,
+            community_db_path=os.path.join(os.path.dirname(db_path), 'ecolife_community.db')
+        )
+        # Verified JWT payloads, so signature checks are paid once per token
+        self.token_cache = VerifiedTokenCache(token_cache_size)
+        # bcrypt runs on a bounded pool; a full queue raises HashingQueueFull
+        self.password_hasher = PasswordHasher(bcrypt_rounds, hash_workers, hash_queue)
+        # Scans are written in batches by a single writer thread
+        self.scan_recorder = ScanRecorder(self._apply_scan_batch, durability=scan_durability)
+        # Profiles only change on scans and achievements, which invalidate them
+        self.profile_cache = ProfileCache(profile_cache_size, profile_cache_ttl)
+        self.scan_recorder.add_listener(self._invalidate_scanned_profiles)
+        # Old raw scans are folded into daily rollups and archived (SQLite only)
+        self.scan_retention = None
+        if self.storage.engine == 'sqlite':
+            self.scan_retention = ScanRetention(
+                self.storage.users_db, scan_archive_path or default_archive_path(db_path),
+                scan_retention_days
+            )
         # FIX: Use a consistent secret key
         self.secret_key = 'your-secret-key-change-in-production'  # Always use same key
-        self.init_database()
-    
-    def init_database(self):
-        """Initialize SQLite database for users"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                total_scans INTEGER DEFAULT 0,
-                recycling_score INTEGER DEFAULT 0,
-                co2_saved REAL DEFAULT 0.0,
-                profile_picture TEXT,
-                location TEXT,
-                preferences TEXT
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS scan_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                waste_type TEXT,
-                confidence REAL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                image_path TEXT,
-                latitude REAL,
-                longitude REAL,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS achievements (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                achievement_type TEXT,
-                earned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
     
     def hash_password(self, password):
         """Hash password using bcrypt"""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        return self.password_hasher.hash_password(password)
     
     def verify_password(self, password, password_hash):
         """Verify password against hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        return self.password_hasher.verify_password(password, password_hash)
+    
+    def _rehash_password(self, user_id, password, old_hash):
+        """Re-hash at the current work factor (runs on the hashing pool)"""
+        new_hash = self.password_hasher.hash_blocking(password)
+        # Only replace the hash we verified against, in case it changed meanwhile
+        self.storage.users.replace_password_hash(user_id, old_hash, new_hash)
     
     def generate_token(self, user_id, username):
         """Generate JWT token"""
@@ -90,8 +78,13 @@ class AuthManager:
     
     def verify_token(self, token):
         """Verify JWT token"""
+        payload = self.token_cache.get(token)
+        if payload is not None:
+            return payload
+        
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=['HS256'])
+            self.token_cache.put(token, payload)
             return payload
         except jwt.ExpiredSignatureError as e:
             print(f"Token expired: {e}")
@@ -106,19 +99,8 @@ class AuthManager:
     def register_user(self, username, email, password):
         """Register new user"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             password_hash = self.hash_password(password)
-            
-            cursor.execute(
-                'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
-                (username, email, password_hash)
-            )
-            
-            user_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            user_id = self.storage.users.create(username, email, password_hash)
             
             token = self.generate_token(user_id, username)
             
@@ -129,7 +111,7 @@ class AuthManager:
                 'username': username
             }
             
-        except sqlite3.IntegrityError:
+        except DuplicateRecordError:
             return {
                 'success': False,
                 'error': 'Username or email already exists'
@@ -137,16 +119,7 @@ class AuthManager:
     
     def login_user(self, username, password):
         """Login user"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute(
-            'SELECT id, username, password_hash FROM users WHERE username = ? OR email = ?',
-            (username, username)
-        )
-        
-        user = cursor.fetchone()
-        conn.close()
+        user = self.storage.users.find_login(username)
         
         if not user:
             return {'success': False, 'error': 'User not found'}
@@ -156,6 +129,12 @@ class AuthManager:
         if not self.verify_password(password, password_hash):
             return {'success': False, 'error': 'Invalid password'}
         
+        if self.password_hasher.needs_rehash(password_hash):
+            try:
+                self.password_hasher.submit(self._rehash_password, user_id, password, password_hash)
+            except HashingQueueFull:
+                pass  # upgrade on a quieter login
+        
         token = self.generate_token(user_id, username)
         
         return {
@@ -166,99 +145,64 @@ class AuthManager:
         }
     
     def get_user_profile(self, user_id):
-        """Get user profile and statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT username, email, total_scans, recycling_score, 
-                   co2_saved, created_at, location
-            FROM users WHERE id = ?
-        ''', (user_id,))
-        
-        user_data = cursor.fetchone()
-        
-        if not user_data:
-            conn.close()
+        """Get user profile and statistics (served from the profile cache)"""
+        return self.profile_cache.get_or_load(user_id, self._load_user_profile)
+    
+    def _load_user_profile(self, user_id):
+        """Read a profile from storage"""
+        user = self.storage.users.get(user_id)
+        if not user:
             return None
         
-        cursor.execute('''
-            SELECT COUNT(*) as total, waste_type
-            FROM scan_history
-            WHERE user_id = ?
-            GROUP BY waste_type
-        ''', (user_id,))
-        
-        waste_breakdown = cursor.fetchall()
-        
-        cursor.execute('''
-            SELECT achievement_type, earned_at
-            FROM achievements
-            WHERE user_id = ?
-            ORDER BY earned_at DESC
-        ''', (user_id,))
-        
-        achievements = cursor.fetchall()
-        
-        conn.close()
+        waste_breakdown = self.storage.scans.waste_counts(user_id)
+        achievements = self.storage.achievements.for_user(user_id)
         
         return {
-            'username': user_data[0],
-            'email': user_data[1],
-            'total_scans': user_data[2],
-            'recycling_score': user_data[3],
-            'co2_saved': user_data[4],
-            'member_since': user_data[5],
-            'location': user_data[6],
-            'waste_breakdown': [{'type': w[1], 'count': w[0]} for w in waste_breakdown],
+            'username': user['username'],
+            'email': user['email'],
+            'total_scans': user['total_scans'],
+            'recycling_score': user['recycling_score'],
+            'co2_saved': user['co2_saved'],
+            'member_since': user['created_at'],
+            'location': user['location'],
+            'waste_breakdown': [{'type': w[0], 'count': w[1]} for w in waste_breakdown],
             'achievements': [{'type': a[0], 'earned_at': a[1]} for a in achievements]
         }
     
+    def set_location(self, user_id, location):
+        """Store a user's location with its canonical leaderboard key"""
+        location = (location or '').strip() or None
+        self.storage.users.set_location(user_id, location, normalize_location(location))
+        self.profile_cache.invalidate(user_id)
+        return location
+    
     def add_scan_record(self, user_id, waste_type, confidence, latitude=None, longitude=None):
-        """Add scan to history and update user stats"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO scan_history (user_id, waste_type, confidence, latitude, longitude)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_id, waste_type, confidence, latitude, longitude))
-        
-        # Update user statistics
-        cursor.execute('''
-            UPDATE users 
-            SET total_scans = total_scans + 1,
-                recycling_score = recycling_score + ?
-            WHERE id = ?
-        ''', (int(confidence * 10), user_id))
-        
-        # Check for achievements
-        self._check_achievements(cursor, user_id)
-        
-        conn.commit()
-        conn.close()
+        """Add scan to history and update user stats (via the write-behind recorder)"""
+        return self.scan_recorder.record(user_id, waste_type, confidence, latitude, longitude)
     
-    def _check_achievements(self, cursor, user_id):
-        """Check and award achievements"""
-        cursor.execute('SELECT total_scans FROM users WHERE id = ?', (user_id,))
-        total_scans = cursor.fetchone()[0]
-        
-        achievements_to_award = []
-        
-        if total_scans == 1:
-            achievements_to_award.append('first_scan')
-        elif total_scans == 10:
-            achievements_to_award.append('eco_novice')
-        elif total_scans == 50:
-            achievements_to_award.append('waste_warrior')
-        elif total_scans == 100:
-            achievements_to_award.append('recycling_champion')
-        
-        for achievement in achievements_to_award:
-            cursor.execute('''
-                INSERT OR IGNORE INTO achievements (user_id, achievement_type)
-                VALUES (?, ?)
-            ''', (user_id, achievement))
+    def _invalidate_scanned_profiles(self, events):
+        """Recorder listener: drop cached profiles once their scans are committed"""
+        self.profile_cache.invalidate_many({e.user_id for e in events})
+    
+    def _apply_scan_batch(self, events):
+        """Write a batch of ScanEvents; runs on the recorder thread"""
+        awarded = self.storage.scans.apply_batch(events, self.ACHIEVEMENT_THRESHOLDS)
+        if awarded:
+            self.profile_cache.invalidate_many({user_id for user_id, _ in awarded})
+    
+    def get_scan_summary(self, user_id):
+        """
+        A user's scans per waste type as count/confidence dicts, combining
+        daily rollups of compacted scans with the recent raw rows
+        """
+        return self.storage.scans.summary(user_id)
+    
+    ACHIEVEMENT_THRESHOLDS = [
+        (1, 'first_scan'),
+        (10, 'eco_novice'),
+        (50, 'waste_warrior'),
+        (100, 'recycling_champion'),
+    ]
 
 def token_required(f):
     """Decorator to protect routes with JWT"""
@@ -266,34 +210,17 @@ def token_required(f):
     def decorated(*args, **kwargs):
         token = request.headers.get('Authorization')
         
-        print("=" * 50)
-        print("DEBUG TOKEN VERIFICATION:")
-        print(f"Authorization header: {token}")
-        
         if not token:
-            print("ERROR: No Authorization header")
             return jsonify({'error': 'Token is missing'}), 401
         
         if token.startswith('Bearer '):
             token = token[7:]
-            print(f"Token after removing 'Bearer': {token[:50]}...")
-        else:
-            print(f"Token (no 'Bearer' prefix): {token[:50]}...")
-        
-       
-        auth_manager = get_auth_manager()
         
-        print(f"Auth manager secret key: {auth_manager.secret_key}")
-        
-        payload = auth_manager.verify_token(token)
+        payload = get_auth_manager().verify_token(token)
         
         if not payload:
-            print("ERROR: Token verification failed")
             return jsonify({'error': 'Invalid or expired token'}), 401
         
-        print(f"SUCCESS: Token verified for user_id: {payload['user_id']}, username: {payload['username']}")
-        print("=" * 50)
-        
         request.user_id = payload['user_id']
         request.username = payload['username']
         
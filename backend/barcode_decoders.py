@@ -0,0 +1,143 @@
+from collections import namedtuple
+import cv2
+
+try:
+    from pyzbar import pyzbar
+except ImportError:
+    pyzbar = None
+
+# Backend-neutral decode result; rect mirrors pyzbar's Rect so quality scoring works unchanged
+Rect = namedtuple('Rect', ['left', 'top', 'width', 'height'])
+DecodedBarcode = namedtuple('DecodedBarcode', ['data', 'type', 'rect'])
+
+class BarcodeDecoder:
+    """Base class for barcode decoder backends"""
+
+    name = 'base'
+
+    def is_available(self):
+        return True
+
+    def decode(self, image):
+        """Decode all barcodes in a grayscale or BGR image -> list of DecodedBarcode"""
+        raise NotImplementedError
+
+class PyzbarDecoder(BarcodeDecoder):
+    """ZBar via pyzbar: broad symbology support, the original decoder"""
+
+    name = 'pyzbar'
+
+    def is_available(self):
+        return pyzbar is not None
+
+    def decode(self, image):
+        results = []
+        for barcode in pyzbar.decode(image):
+            rect = barcode.rect
+            results.append(DecodedBarcode(
+                barcode.data.decode('utf-8'),
+                barcode.type,
+                Rect(rect.left, rect.top, rect.width, rect.height)
+            ))
+        return results
+
+class OpenCVDecoder(BarcodeDecoder):
+    """OpenCV's built-in 1D detector (EAN/UPC/Code128); no extra dependency"""
+
+    name = 'opencv'
+
+    # OpenCV symbology names -> the pyzbar names used everywhere else
+    TYPE_NAMES = {
+        'EAN_13': 'EAN13',
+        'EAN_8': 'EAN8',
+        'UPC_A': 'UPCA',
+        'UPC_E': 'UPCE',
+        'CODE_128': 'CODE128',
+        'CODE_39': 'CODE39',
+    }
+
+    def __init__(self):
+        self.detector = None
+        barcode_module = getattr(cv2, 'barcode', None)
+        if barcode_module is not None and hasattr(barcode_module, 'BarcodeDetector'):
+            self.detector = barcode_module.BarcodeDetector()
+
+    def is_available(self):
+        return self.detector is not None
+
+    def _type_name(self, decoded_type):
+        if isinstance(decoded_type, str):
+            return self.TYPE_NAMES.get(decoded_type, decoded_type)
+        # OpenCV < 4.8 reports integer enums
+        for name in self.TYPE_NAMES:
+            if getattr(cv2.barcode, name, None) == decoded_type:
+                return self.TYPE_NAMES[name]
+        return str(decoded_type)
+
+    def decode(self, image):
+        if hasattr(self.detector, 'detectAndDecodeWithType'):
+            ok, decoded_info, decoded_types, points = self.detector.detectAndDecodeWithType(image)
+        else:
+            ok, decoded_info, decoded_types, points = self.detector.detectAndDecode(image)
+
+        if not ok or points is None:
+            return []
+
+        results = []
+        for data, decoded_type, corners in zip(decoded_info, decoded_types, points):
+            if not data:
+                continue
+            x, y, w, h = cv2.boundingRect(corners.astype('float32'))
+            results.append(DecodedBarcode(data, self._type_name(decoded_type), Rect(x, y, w, h)))
+        return results
+
+class CascadeDecoder(BarcodeDecoder):
+    """
+    Try backends in order. In 'first' mode the cascade stops at the first
+    backend that decodes anything; in 'all' mode results are merged.
+    A backend that raises is skipped so the next one acts as a fallback.
+    """
+
+    name = 'cascade'
+
+    def __init__(self, decoders, mode='first'):
+        self.decoders = [decoder for decoder in decoders if decoder.is_available()]
+        self.mode = mode
+        if not self.decoders:
+            raise ValueError('No barcode decoder backend is available')
+        self.name = '>'.join(decoder.name for decoder in self.decoders)
+
+    def decode(self, image):
+        results = []
+        seen = set()
+        for decoder in self.decoders:
+            try:
+                decoded = decoder.decode(image)
+            except Exception as e:
+                print(f"Barcode backend {decoder.name} failed: {e}")
+                continue
+            for barcode in decoded:
+                if barcode.data not in seen:
+                    seen.add(barcode.data)
+                    results.append(barcode)
+            if results and self.mode == 'first':
+                break
+        return results
+
+DECODER_BACKENDS = {
+    'pyzbar': PyzbarDecoder,
+    'opencv': OpenCVDecoder,
+}
+
+def create_barcode_decoder(backends=('pyzbar',), mode='first'):
+    """Build a decoder from backend names, e.g. ('opencv', 'pyzbar')"""
+    if isinstance(backends, str):
+        backends = [name.strip() for name in backends.split(',')]
+    decoders = []
+    for name in backends:
+        if name not in DECODER_BACKENDS:
+            raise ValueError(f"Unknown barcode backend: {name}")
+        decoders.append(DECODER_BACKENDS[name]())
+    if len(decoders) == 1 and decoders[0].is_available():
+        return decoders[0]
+    return CascadeDecoder(decoders, mode)
@@ -0,0 +1,156 @@
+"""
+Barcode decoder benchmark.
+
+Generates synthetic EAN-13 / UPC-A images with rotation, blur and noise
+and measures decode rate and latency for every decoder backend and
+preprocessing variant used by ProductAnalyzer.
+
+    python bench_barcode_decoders.py --samples 200 --backends pyzbar,opencv
+"""
+import argparse
+import random
+import time
+import cv2
+import numpy as np
+from barcode_decoders import DECODER_BACKENDS, create_barcode_decoder
+from product_analyzer import ProductAnalyzer
+
+L_CODES = ['0001101', '0011001', '0010011', '0111101', '0100011',
+           '0110001', '0101111', '0111011', '0110111', '0001011']
+R_CODES = [''.join('1' if bit == '0' else '0' for bit in code) for code in L_CODES]
+G_CODES = [code[::-1] for code in R_CODES]
+PARITY = ['LLLLLL', 'LLGLGG', 'LLGGLG', 'LLGGGL', 'LGLLGG',
+          'LGGLLG', 'LGGGLL', 'LGLGLG', 'LGLGGL', 'LGGLGL']
+
+def ean13_check_digit(digits12):
+    total = sum(int(d) * (3 if i % 2 == 1 else 1) for i, d in enumerate(digits12))
+    return str((10 - total % 10) % 10)
+
+def random_code(rng, symbology):
+    """Random checksum-valid EAN-13 (or UPC-A, i.e. EAN-13 with a leading 0)"""
+    if symbology == 'UPC-A':
+        body = '0' + ''.join(str(rng.randint(0, 9)) for _ in range(11))
+    else:
+        body = str(rng.randint(1, 9)) + ''.join(str(rng.randint(0, 9)) for _ in range(11))
+    return body + ean13_check_digit(body)
+
+def ean13_modules(code):
+    """Module pattern (string of 0/1) for a 13-digit code"""
+    parity = PARITY[int(code[0])]
+    left = ''.join(
+        L_CODES[int(d)] if parity[i] == 'L' else G_CODES[int(d)]
+        for i, d in enumerate(code[1:7])
+    )
+    right = ''.join(R_CODES[int(d)] for d in code[7:])
+    return '101' + left + '01010' + right + '101'
+
+def render_barcode(code, module_px=3, height=120, quiet_modules=11):
+    """Render a clean black-on-white barcode image"""
+    modules = ean13_modules(code)
+    width = (len(modules) + 2 * quiet_modules) * module_px
+    image = np.full((height + 2 * quiet_modules * module_px, width), 255, dtype=np.uint8)
+    top = quiet_modules * module_px
+    for i, bit in enumerate(modules):
+        if bit == '1':
+            x = (quiet_modules + i) * module_px
+            image[top:top + height, x:x + module_px] = 0
+    return image
+
+def distort(image, rng, rotation=0.0, blur=0, noise=0.0, scale=1.0):
+    """Apply rotation (degrees), Gaussian blur (kernel), noise (sigma) and scale"""
+    if scale != 1.0:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    # Place the code on a larger canvas so it looks like a product photo
+    height, width = image.shape
+    canvas = np.full((height * 3, width * 2), 235, dtype=np.uint8)
+    y, x = height, width // 2
+    canvas[y:y + height, x:x + width] = image
+
+    if rotation:
+        center = (canvas.shape[1] / 2, canvas.shape[0] / 2)
+        matrix = cv2.getRotationMatrix2D(center, rotation, 1.0)
+        canvas = cv2.warpAffine(canvas, matrix, (canvas.shape[1], canvas.shape[0]),
+                                flags=cv2.INTER_LINEAR, borderValue=235)
+    if blur:
+        canvas = cv2.GaussianBlur(canvas, (blur, blur), 0)
+    if noise:
+        noisy = canvas.astype(np.float32) + np.random.default_rng(rng.randrange(2 ** 32)).normal(0, noise, canvas.shape)
+        canvas = np.clip(noisy, 0, 255).astype(np.uint8)
+    return canvas
+
+def generate_samples(count, seed=0):
+    """Synthetic (image, expected_code, symbology) samples with mixed distortions"""
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(count):
+        symbology = rng.choice(['EAN-13', 'UPC-A'])
+        code = random_code(rng, symbology)
+        image = render_barcode(code, module_px=rng.choice([2, 3, 4]))
+        image = distort(
+            image, rng,
+            rotation=rng.uniform(-20, 20),
+            blur=rng.choice([0, 0, 3, 5]),
+            noise=rng.choice([0.0, 8.0, 16.0, 24.0]),
+            scale=rng.uniform(0.6, 1.2)
+        )
+        samples.append((image, code, symbology))
+    return samples
+
+def matches(decoded, code):
+    # UPC-A may be reported as 12 digits or as EAN-13 with a leading zero
+    return decoded == code or (code.startswith('0') and decoded == code[1:])
+
+def run_benchmark(samples, backends, variants):
+    preprocess = ProductAnalyzer(barcode_backends=backends).preprocess_image_for_barcode
+
+    rows = []
+    for backend in backends:
+        decoder = create_barcode_decoder((backend,))
+        for variant in variants:
+            prepared = [(preprocess(image, [variant])[0][1], code) for image, code, _ in samples]
+            decoded_count = 0
+            latencies = []
+            for image, code in prepared:
+                start_time = time.perf_counter()
+                try:
+                    results = decoder.decode(image)
+                except Exception:
+                    results = []
+                latencies.append(time.perf_counter() - start_time)
+                if any(matches(result.data, code) for result in results):
+                    decoded_count += 1
+            latencies.sort()
+            rows.append({
+                'backend': backend,
+                'variant': variant,
+                'decode_rate': decoded_count / len(prepared),
+                'mean_ms': 1000 * sum(latencies) / len(latencies),
+                'p95_ms': 1000 * latencies[int(0.95 * (len(latencies) - 1))]
+            })
+    return rows
+
+def print_rows(rows):
+    print(f"{'backend':<10}{'variant':<12}{'decode rate':>12}{'mean ms':>10}{'p95 ms':>10}")
+    for row in rows:
+        print(f"{row['backend']:<10}{row['variant']:<12}{row['decode_rate']:>11.1%}"
+              f"{row['mean_ms']:>10.2f}{row['p95_ms']:>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark barcode decoder backends')
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backends', default=','.join(DECODER_BACKENDS))
+    parser.add_argument('--variants', default=','.join(ProductAnalyzer.BARCODE_VARIANTS))
+    args = parser.parse_args()
+
+    backends = [name for name in args.backends.split(',')
+                if DECODER_BACKENDS[name]().is_available()]
+    variants = args.variants.split(',')
+
+    print(f"Generating {args.samples} synthetic EAN-13/UPC-A images...")
+    samples = generate_samples(args.samples, args.seed)
+    print_rows(run_benchmark(samples, backends, variants))
+
+if __name__ == "__main__":
+    main()
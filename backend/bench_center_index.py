@@ -0,0 +1,76 @@
+"""
+Recycling center search benchmark: CenterIndex versus a full scan.
+
+Fills a scratch community database with N centers spread over the
+continental US, then times index reload, radius and k-nearest queries
+(including the row fetch from SQLite), against computing the distance to
+every center in Python as the old query effectively did.
+
+    python bench_center_index.py --centers 300000
+"""
+import argparse
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+from storage_sqlite import SQLiteStorage
+from center_index import CenterIndex
+
+def timed(fn, repeat):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return 1000 * (time.perf_counter() - start_time) / repeat
+
+def full_scan(coords, latitude, longitude, radius_km):
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    hits = []
+    for center_id, lat, lon, _ in coords:
+        lat2, lon2 = math.radians(lat), math.radians(lon)
+        a = (math.sin((lat2 - lat1) / 2) ** 2
+             + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+        distance = 6371 * 2 * math.asin(math.sqrt(a))
+        if distance <= radius_km:
+            hits.append((distance, center_id))
+    hits.sort()
+    return hits[:10]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the recycling center spatial index')
+    parser.add_argument('--centers', type=int, default=300000)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--scan-repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    scratch_dir = tempfile.mkdtemp(prefix='ecolife_bench_')
+    try:
+        storage = SQLiteStorage(os.path.join(scratch_dir, 'bench_users.db'),
+                                os.path.join(scratch_dir, 'bench_community.db'))
+        with storage.community_db.transaction() as cursor:
+            cursor.executemany('''
+                INSERT INTO recycling_centers (name, address, latitude, longitude,
+                                               accepts_types, verified)
+                VALUES (?, ?, ?, ?, ?, 1)
+            ''', [(f"Center {i}", f"{i} Main St", rng.uniform(25, 49), rng.uniform(-124, -67),
+                   'plastic,paper,glass') for i in range(args.centers)])
+
+        index = CenterIndex(storage.centers)
+        index.refresh(force=True)
+        coords = storage.centers.verified_coordinates()
+
+        def point():
+            return rng.uniform(25, 49), rng.uniform(-124, -67)
+
+        print(f"{len(index)} centers, index loaded in {index.stats()['last_reload_ms']:.1f} ms")
+        print(f"  index within 10 km:   {timed(lambda: index.within(*point(), 10), args.repeat):10.4f} ms")
+        print(f"  index within 50 km:   {timed(lambda: index.within(*point(), 50), args.repeat):10.4f} ms")
+        print(f"  index nearest 10:     {timed(lambda: index.nearest(*point(), 10), args.repeat):10.4f} ms")
+        print(f"  full scan 10 km:      {timed(lambda: full_scan(coords, *point(), 10), args.scan_repeat):10.2f} ms")
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Scan challenge progress benchmark: one add_progress call per scan and
+joined challenge versus ChallengeProgressEngine's set-based UPDATE per
+scan batch.
+
+Every user joins all C active scan challenges (plus some of other types
+and some already ended, which must be left alone); batches of random
+scans are then applied both ways to identical databases and the final
+progress and completions are compared.
+
+    python bench_challenge_progress.py --users 5000 --challenges 20
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from storage_sqlite import SQLiteStorage
+from scan_recorder import ScanEvent
+from challenge_progress import ChallengeProgressEngine, SCAN_CHALLENGE_TYPES
+
+def build(path, users, challenges, rng_seed):
+    """Community database with every user in every challenge"""
+    rng = random.Random(rng_seed)
+    storage = SQLiteStorage(os.path.join(path, 'bench_users.db'), os.path.join(path, 'bench_community.db'))
+    now = datetime.utcnow()
+    kinds = ([('scans', 7)] * challenges
+             + [('points', 7)] * (challenges // 4)
+             + [('scans', -1)] * (challenges // 4))
+    with storage.community_db.transaction() as cursor:
+        for i, (challenge_type, days_left) in enumerate(kinds):
+            cursor.execute('''
+                INSERT INTO challenges
+                (title, description, target_value, challenge_type, start_date, end_date, reward_points)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (f"Challenge {i}", '', rng.randint(1, 4), challenge_type,
+                  now - timedelta(days=3), now + timedelta(days=days_left), 50))
+        cursor.executemany(
+            'INSERT INTO challenge_participants (challenge_id, user_id) VALUES (?, ?)',
+            [(challenge_id, user_id) for challenge_id in range(1, len(kinds) + 1)
+             for user_id in range(1, users + 1)]
+        )
+    return storage
+
+def scan_challenges(storage):
+    return [row[0] for row in storage.community_db.connection().execute(f'''
+        SELECT id FROM challenges
+        WHERE challenge_type IN ({','.join('?' * len(SCAN_CHALLENGE_TYPES))})
+          AND start_date <= datetime('now') AND end_date > datetime('now')
+    ''', SCAN_CHALLENGE_TYPES)]
+
+def participations(storage):
+    return storage.community_db.connection().execute('''
+        SELECT challenge_id, user_id, progress, completed FROM challenge_participants
+        ORDER BY challenge_id, user_id
+    ''').fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark scan-to-challenge progress fan-out')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--challenges', type=int, default=20)
+    parser.add_argument('--batches', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    batches = [[ScanEvent(rng.randint(1, args.users), 'plastic', 0.9, None, None, '')
+                for _ in range(args.batch_size)] for _ in range(args.batches)]
+    scans = args.batches * args.batch_size
+
+    scratch_dir = tempfile.mkdtemp(prefix='ecolife_bench_')
+    try:
+        os.mkdir(os.path.join(scratch_dir, 'per_challenge'))
+        os.mkdir(os.path.join(scratch_dir, 'set_based'))
+        per_challenge = build(os.path.join(scratch_dir, 'per_challenge'), args.users, args.challenges, 0)
+        set_based = build(os.path.join(scratch_dir, 'set_based'), args.users, args.challenges, 0)
+        participants = args.users * (args.challenges + 2 * (args.challenges // 4))
+        print(f"{args.users} users x {args.challenges} active scan challenges "
+              f"({participants} participations), {args.batches} batches of {args.batch_size} scans")
+
+        # Old route: every scan looks up the user's challenges and bumps each one
+        challenge_ids = scan_challenges(per_challenge)
+        start_time = time.perf_counter()
+        calls = 0
+        for batch in batches:
+            for user_id, count in Counter(e.user_id for e in batch).items():
+                for challenge_id in challenge_ids:
+                    per_challenge.challenges.add_progress(user_id, challenge_id, count)
+                    calls += 1
+        per_challenge_s = time.perf_counter() - start_time
+
+        engine = ChallengeProgressEngine(set_based.challenges)
+        start_time = time.perf_counter()
+        for batch in batches:
+            engine.on_scans_committed(batch)
+        set_based_s = time.perf_counter() - start_time
+
+        print(f"  add_progress per challenge: {per_challenge_s:8.3f} s "
+              f"({calls} calls, {scans / per_challenge_s:9.0f} scans/s)")
+        print(f"  set-based UPDATE per batch: {set_based_s:8.3f} s "
+              f"({args.batches} batches, {scans / set_based_s:9.0f} scans/s)")
+        print(f"  speedup: {per_challenge_s / set_based_s:.1f}x")
+
+        # add_progress keeps counting past the target; the engine stops at completion
+        expected = [(c, u, p, int(done)) for c, u, p, done in participations(per_challenge)]
+        actual = participations(set_based)
+        mismatches = sum(1 for old, new in zip(expected, actual)
+                         if old[3] != new[3] or (not new[3] and old[2] != new[2]))
+        completed = sum(row[3] for row in actual)
+        print(f"  {engine.stats()['participations_advanced']} participations advanced, "
+              f"{completed} completed, {mismatches} mismatches")
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
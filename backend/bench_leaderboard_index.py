@@ -0,0 +1,99 @@
+"""
+Leaderboard benchmark: LeaderboardIndex versus the ROW_NUMBER() query.
+
+Builds N synthetic users, then times top-50, rank-of-user, neighbours
+and score updates on the index, and top-50 plus a rank-by-COUNT query
+on a scratch SQLite users table with the recycling_score index.
+
+    python bench_leaderboard_index.py --users 1000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from leaderboard_index import LeaderboardIndex
+
+def timed(fn, repeat):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return 1000 * (time.perf_counter() - start_time) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the in-memory leaderboard index')
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=1000)
+    parser.add_argument('--sql-repeat', type=int, default=5)
+    parser.add_argument('--skip-sql', action='store_true')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    rows = [{
+        'user_id': user_id,
+        'username': f"user_{user_id}",
+        'total_scans': rng.randint(1, 500),
+        'recycling_score': rng.randint(0, 5000),
+        'co2_saved': 0.0
+    } for user_id in range(1, args.users + 1)]
+
+    index = LeaderboardIndex()
+    start_time = time.perf_counter()
+    index.load(rows)
+    load_s = time.perf_counter() - start_time
+
+    def update():
+        row = dict(rows[rng.randrange(args.users)])
+        row['recycling_score'] += rng.randint(1, 10)
+        index.update(row)
+
+    def user():
+        return rng.randint(1, args.users)
+
+    print(f"{args.users} users, index loaded in {load_s:.2f}s ({index.stats()['blocks']} blocks)")
+    print(f"  index top-50:        {timed(lambda: index.top(50), args.repeat):10.4f} ms")
+    print(f"  index rank:          {timed(lambda: index.rank(user()), args.repeat):10.4f} ms")
+    print(f"  index around(5):     {timed(lambda: index.around(user(), 5), args.repeat):10.4f} ms")
+    print(f"  index update:        {timed(update, args.repeat):10.4f} ms")
+
+    if args.skip_sql:
+        return
+
+    scratch_dir = tempfile.mkdtemp(prefix='ecolife_bench_')
+    try:
+        conn = sqlite3.connect(os.path.join(scratch_dir, 'bench_users.db'))
+        conn.execute('''
+            CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, total_scans INTEGER,
+                                recycling_score INTEGER, co2_saved REAL)
+        ''')
+        conn.executemany('INSERT INTO users VALUES (?, ?, ?, ?, ?)', [
+            (r['user_id'], r['username'], r['total_scans'], r['recycling_score'], r['co2_saved'])
+            for r in rows
+        ])
+        conn.execute('CREATE INDEX idx_users_recycling_score ON users (recycling_score DESC)')
+        conn.commit()
+
+        def sql_top():
+            conn.execute('''
+                SELECT username, total_scans, recycling_score, co2_saved,
+                       ROW_NUMBER() OVER (ORDER BY recycling_score DESC) as rank
+                FROM users WHERE total_scans > 0
+                ORDER BY recycling_score DESC LIMIT 50
+            ''').fetchall()
+
+        def sql_rank():
+            conn.execute('''
+                SELECT COUNT(*) + 1 FROM users
+                WHERE recycling_score > (SELECT recycling_score FROM users WHERE id = ?)
+            ''', (user(),)).fetchone()
+
+        print(f"  SQL ROW_NUMBER top-50: {timed(sql_top, args.sql_repeat):8.2f} ms")
+        print(f"  SQL rank by COUNT:     {timed(sql_rank, args.sql_repeat):8.2f} ms")
+        conn.close()
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
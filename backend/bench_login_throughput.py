@@ -0,0 +1,93 @@
+"""
+Login throughput benchmark.
+
+Registers a handful of users in a scratch database, then hammers
+AuthManager.login_user from many client threads for each hashing pool
+size and reports logins/sec, latency percentiles and 503-style
+rejections (HashingQueueFull).
+
+    python bench_login_throughput.py --pool-sizes 1,2,4,8 --clients 32 --rounds 12
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from auth_manager import AuthManager
+from password_hasher import HashingQueueFull
+
+def run_pool_size(db_path, pool_size, args):
+    auth = AuthManager(db_path, bcrypt_rounds=args.rounds,
+                       hash_workers=pool_size, hash_queue=args.queue)
+    latencies = []
+    rejected = 0
+    lock = threading.Lock()
+    stop_at = time.monotonic() + args.seconds
+
+    def client(index):
+        nonlocal rejected
+        username = f"bench_user_{index % args.users}"
+        while time.monotonic() < stop_at:
+            start_time = time.perf_counter()
+            try:
+                auth.login_user(username, 'bench-password')
+                elapsed = time.perf_counter() - start_time
+                with lock:
+                    latencies.append(elapsed)
+            except HashingQueueFull:
+                with lock:
+                    rejected += 1
+                time.sleep(0.01)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    auth.password_hasher.shutdown()
+
+    latencies.sort()
+
+    def percentile(p):
+        return 1000 * latencies[int(p * (len(latencies) - 1))] if latencies else 0.0
+
+    return {
+        'pool_size': pool_size,
+        'logins_per_sec': len(latencies) / elapsed,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'rejected': rejected
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark login throughput by hashing pool size')
+    parser.add_argument('--pool-sizes', default='1,2,4,8')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--queue', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp(prefix='ecolife_bench_')
+    db_path = os.path.join(scratch_dir, 'bench_users.db')
+    try:
+        setup = AuthManager(db_path, bcrypt_rounds=args.rounds, hash_workers=4)
+        for i in range(args.users):
+            setup.register_user(f"bench_user_{i}", f"bench_user_{i}@example.com", 'bench-password')
+        setup.password_hasher.shutdown()
+
+        print(f"bcrypt cost {args.rounds}, {args.clients} client threads, {args.seconds:.0f}s per run")
+        print(f"{'pool':>6}{'logins/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'rejected':>10}")
+        for pool_size in [int(size) for size in args.pool_sizes.split(',')]:
+            row = run_pool_size(db_path, pool_size, args)
+            print(f"{row['pool_size']:>6}{row['logins_per_sec']:>12.1f}{row['p50_ms']:>10.1f}"
+                  f"{row['p95_ms']:>10.1f}{row['rejected']:>10}")
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
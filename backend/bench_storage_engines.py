@@ -0,0 +1,83 @@
+"""
+Storage engine benchmark.
+
+Runs the same request-path operations against the SQLite engine (in a
+scratch directory) and the in-memory engine, so the gap between them is
+the storage cost and what remains is compute.
+
+    python bench_storage_engines.py --users 2000 --scans 50000
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from auth_manager import AuthManager
+from community_manager import CommunityManager
+from impact_calculator import ImpactCalculator
+from storage import create_storage
+from waste_categories import ADVANCED_WASTE_CATEGORIES
+
+def timed(fn, repeat):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return 1000 * (time.perf_counter() - start_time) / repeat
+
+def run_engine(storage, args):
+    auth = AuthManager(bcrypt_rounds=4, storage=storage)
+    community = CommunityManager(storage=storage)
+    impact = ImpactCalculator()
+    rng = random.Random(0)
+    waste_types = list(ADVANCED_WASTE_CATEGORIES)
+
+    user_ids = [storage.users.create(f"user_{i}", f"user_{i}@example.com", 'x')
+                for i in range(args.users)]
+
+    start_time = time.perf_counter()
+    for _ in range(args.scans):
+        auth.add_scan_record(rng.choice(user_ids), rng.choice(waste_types), rng.random())
+    auth.scan_recorder.flush()
+    scans_per_sec = args.scans / (time.perf_counter() - start_time)
+    auth.scan_recorder.shutdown()
+
+    def profile():
+        auth._load_user_profile(rng.choice(user_ids))
+
+    def impact_summary():
+        impact.calculate_cumulative_impact(auth.get_scan_summary(rng.choice(user_ids)))
+
+    return {
+        'scans_per_sec': scans_per_sec,
+        'profile_ms': timed(profile, args.repeat),
+        'impact_ms': timed(impact_summary, args.repeat),
+        'leaderboard_ms': timed(lambda: community.get_leaderboard('all', 50), args.repeat),
+        'stats_ms': timed(community.get_impact_statistics, args.repeat)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark storage engines on the request path')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--scans', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    scratch_dir = tempfile.mkdtemp(prefix='ecolife_bench_')
+    try:
+        engines = {
+            'sqlite': create_storage('sqlite', os.path.join(scratch_dir, 'users.db'),
+                                     os.path.join(scratch_dir, 'community.db')),
+            'memory': create_storage('memory')
+        }
+        results = {name: run_engine(storage, args) for name, storage in engines.items()}
+
+        print(f"{args.users} users, {args.scans} scans")
+        print(f"{'':>16}{'sqlite':>12}{'memory':>12}")
+        for key in ('scans_per_sec', 'profile_ms', 'impact_ms', 'leaderboard_ms', 'stats_ms'):
+            print(f"{key:>16}{results['sqlite'][key]:>12.3f}{results['memory'][key]:>12.3f}")
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
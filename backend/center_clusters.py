@@ -0,0 +1,262 @@
+import threading
+import time
+import numpy as np
+from center_materials import MATERIAL_BITS
+
+MAX_MERCATOR_LAT = 85.05112878
+# A map tile is split into 2**CELL_BITS cells a side: 8x8 cells of 32 px on 256 px tiles
+CELL_BITS = 3
+# Finest precomputed grid; deeper zooms aggregate the centers in view on the fly
+MAX_GRID_LEVEL = 14
+MAX_ZOOM = 20
+MATERIAL_KEYS = list(MATERIAL_BITS)
+_MATERIAL_SHIFTS = np.arange(len(MATERIAL_KEYS), dtype=np.int64)
+_SUM_FIELDS = ('count', 'lat_sum', 'lon_sum', 'id_sum', 'materials')
+
+def cell_coordinates(level, lats, lons):
+    """Web Mercator cell column and row of points on a grid of 2**level cells a side"""
+    n = 1 << level
+    lats = np.radians(np.clip(np.asarray(lats, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    lons = np.asarray(lons, dtype=np.float64)
+    x = np.floor((lons + 180.0) / 360.0 * n).astype(np.int64)
+    y = np.floor((1.0 - np.log(np.tan(lats) + 1 / np.cos(lats)) / np.pi) / 2.0 * n).astype(np.int64)
+    return np.clip(x, 0, n - 1), np.clip(y, 0, n - 1)
+
+def _empty_grid():
+    return {
+        'keys': np.empty(0, dtype=np.int64),
+        'count': np.empty(0, dtype=np.int64),
+        'lat_sum': np.empty(0),
+        'lon_sum': np.empty(0),
+        'id_sum': np.empty(0, dtype=np.int64),
+        'materials': np.empty((0, len(MATERIAL_KEYS)), dtype=np.int32)
+    }
+
+def aggregate(level, ids, lats, lons, masks, signs=None):
+    """
+    Per-cell sums of points at one level, keyed by column << level | row.
+    signs (+1/-1 per point) turn this into a delta for merge_grid().
+    """
+    if len(ids) == 0:
+        return _empty_grid()
+    x, y = cell_coordinates(level, lats, lons)
+    keys = (x << level) | y
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    weights = np.ones(len(keys), dtype=np.int64) if signs is None else signs[order]
+    bits = ((masks[order, None] >> _MATERIAL_SHIFTS) & 1).astype(np.int32) * weights[:, None].astype(np.int32)
+    return {
+        'keys': keys[starts],
+        'count': np.add.reduceat(weights, starts),
+        'lat_sum': np.add.reduceat(lats[order] * weights, starts),
+        'lon_sum': np.add.reduceat(lons[order] * weights, starts),
+        'id_sum': np.add.reduceat(ids[order] * weights, starts),
+        'materials': np.add.reduceat(bits, starts, axis=0)
+    }
+
+def merge_grid(grid, delta):
+    """New grid with a signed delta applied; cells that reach zero centers are dropped"""
+    keys = grid['keys']
+    positions = np.searchsorted(keys, delta['keys'])
+    found = positions < len(keys)
+    found[found] = keys[positions[found]] == delta['keys'][found]
+    insert_at = positions[~found]
+
+    merged = {'keys': np.insert(keys, insert_at, delta['keys'][~found])}
+    for field in _SUM_FIELDS:
+        values = grid[field].copy()
+        values[positions[found]] += delta[field][found]
+        merged[field] = np.insert(values, insert_at, delta[field][~found], axis=0)
+
+    keep = merged['count'] > 0
+    if not keep.all():
+        merged = {field: values[keep] for field, values in merged.items()}
+    return merged
+
+class CenterClusterPyramid:
+    """
+    Map clusters of verified recycling centers for a bounding box and zoom.
+    Grids of Web Mercator cells (CELL_BITS finer than the map tiles of a
+    zoom) are precomputed for every level up to MAX_GRID_LEVEL, each cell
+    holding its center count, coordinate sums for the centroid and counts
+    per accepted material. A response never holds more than max_cells
+    clusters: larger boxes are served from a coarser level. Deeper zooms
+    cover small areas and aggregate the centers in view from the spatial
+    index instead.
+
+    Changes are read from the center change log and applied to every level
+    as signed deltas; large batches (an import) trigger a full rebuild.
+    """
+
+    def __init__(self, centers, center_index, max_cells=2048, refresh_interval=1.0,
+                 change_log_keep=100000):
+        self.centers = centers
+        self.center_index = center_index
+        self.max_cells = max_cells
+        self.refresh_interval = refresh_interval
+        self.change_log_keep = change_log_keep
+        self._lock = threading.Lock()
+        self._levels = [_empty_grid() for _ in range(MAX_GRID_LEVEL + 1)]
+        # Current contribution of each center id, to subtract when it changes
+        self._lat = np.empty(0)
+        self._lon = np.empty(0)
+        self._mask = np.empty(0, dtype=np.int64)
+        self._active = np.empty(0, dtype=bool)
+        self._position = None
+        self._checked_at = 0.0
+        self.rebuilds = 0
+        self.incremental_updates = 0
+        self.last_refresh_ms = 0.0
+
+    def refresh(self, force=False):
+        """Apply logged center changes, rebuilding from scratch when that is cheaper"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_interval:
+            return
+        if not self._lock.acquire(blocking=force):
+            return
+        try:
+            self._checked_at = now
+            start_time = time.perf_counter()
+            changes = None if force or self._position is None else self.centers.changes_since(self._position)
+            if changes is None:
+                self._rebuild()
+            else:
+                position, center_ids = changes
+                if not center_ids:
+                    self._position = position
+                    return
+                if len(center_ids) > max(1000, int(self._active.sum()) // 4):
+                    self._rebuild()
+                else:
+                    self._apply_changes(center_ids)
+                    self._position = position
+            self.centers.prune_changes(self.change_log_keep)
+            self.last_refresh_ms = 1000 * (time.perf_counter() - start_time)
+        finally:
+            self._lock.release()
+
+    def _ensure_capacity(self, max_id):
+        size = len(self._active)
+        if max_id < size:
+            return
+        grow = max(max_id + 1, 2 * size) - size
+        self._lat = np.concatenate([self._lat, np.zeros(grow)])
+        self._lon = np.concatenate([self._lon, np.zeros(grow)])
+        self._mask = np.concatenate([self._mask, np.zeros(grow, dtype=np.int64)])
+        self._active = np.concatenate([self._active, np.zeros(grow, dtype=bool)])
+
+    @staticmethod
+    def _columns(rows):
+        data = np.array(rows, dtype=np.float64).reshape(-1, 4)
+        return (data[:, 0].astype(np.int64), data[:, 1].copy(), data[:, 2].copy(),
+                data[:, 3].astype(np.int64))
+
+    def _rebuild(self):
+        # Read the log position first so changes made during the load are replayed
+        position = self.centers.change_position()
+        ids, lats, lons, masks = self._columns(self.centers.verified_coordinates())
+
+        self._active = np.zeros(0, dtype=bool)
+        self._lat, self._lon = np.empty(0), np.empty(0)
+        self._mask = np.empty(0, dtype=np.int64)
+        self._ensure_capacity(int(ids.max()) if len(ids) else 0)
+        self._lat[ids], self._lon[ids], self._mask[ids] = lats, lons, masks
+        self._active[ids] = True
+
+        self._levels = [aggregate(level, ids, lats, lons, masks) for level in range(MAX_GRID_LEVEL + 1)]
+        self._position = position
+        self.rebuilds += 1
+
+    def _apply_changes(self, center_ids):
+        changed = np.fromiter(center_ids, dtype=np.int64)
+        self._ensure_capacity(int(changed.max()))
+        old = changed[self._active[changed]]
+        new_ids, new_lats, new_lons, new_masks = self._columns(self.centers.verified_coordinates(center_ids))
+
+        ids = np.concatenate([old, new_ids])
+        lats = np.concatenate([self._lat[old], new_lats])
+        lons = np.concatenate([self._lon[old], new_lons])
+        masks = np.concatenate([self._mask[old], new_masks])
+        signs = np.concatenate([-np.ones(len(old), dtype=np.int64), np.ones(len(new_ids), dtype=np.int64)])
+
+        self._active[changed] = False
+        self._lat[new_ids], self._lon[new_ids], self._mask[new_ids] = new_lats, new_lons, new_masks
+        self._active[new_ids] = True
+
+        # Readers keep using the old list until the new one is complete
+        self._levels = [merge_grid(grid, aggregate(level, ids, lats, lons, masks, signs))
+                        for level, grid in enumerate(self._levels)]
+        self.incremental_updates += 1
+
+    def _column_ranges(self, level, min_lon, max_lon):
+        x_west, _ = cell_coordinates(level, 0.0, min_lon)
+        x_east, _ = cell_coordinates(level, 0.0, max_lon)
+        if min_lon <= max_lon:
+            return [(int(x_west), int(x_east))]
+        # Box crosses the antimeridian
+        return [(int(x_west), (1 << level) - 1), (0, int(x_east))]
+
+    def _box_cells(self, level, min_lat, min_lon, max_lat, max_lon):
+        _, y_top = cell_coordinates(level, max_lat, 0.0)
+        _, y_bottom = cell_coordinates(level, min_lat, 0.0)
+        columns = sum(east - west + 1 for west, east in self._column_ranges(level, min_lon, max_lon))
+        return columns * (int(y_bottom) - int(y_top) + 1), int(y_top), int(y_bottom)
+
+    def _select(self, grid, level, min_lon, max_lon, y_top, y_bottom):
+        """Positions of the grid cells inside the box"""
+        columns = np.concatenate([np.arange(west, east + 1, dtype=np.int64)
+                                  for west, east in self._column_ranges(level, min_lon, max_lon)])
+        starts = np.searchsorted(grid['keys'], (columns << level) | y_top, side='left')
+        ends = np.searchsorted(grid['keys'], (columns << level) | y_bottom, side='right')
+        lengths = ends - starts
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return np.arange(int(lengths.sum())) + offsets
+
+    def clusters(self, min_lat, min_lon, max_lat, max_lon, zoom):
+        """(grid level, clusters) covering a box at a map zoom level"""
+        self.refresh()
+        level = int(min(max(zoom, 0), MAX_ZOOM)) + CELL_BITS
+        while True:
+            cells, y_top, y_bottom = self._box_cells(level, min_lat, min_lon, max_lat, max_lon)
+            if cells <= self.max_cells or level == 0:
+                break
+            level -= 1
+
+        if level > MAX_GRID_LEVEL:
+            grid = aggregate(level, *self.center_index.in_bbox(min_lat, min_lon, max_lat, max_lon))
+            positions = np.arange(len(grid['keys']))
+        else:
+            grid = self._levels[level]
+            positions = self._select(grid, level, min_lon, max_lon, y_top, y_bottom)
+
+        counts = grid['count'][positions]
+        materials = grid['materials'][positions]
+        dominant = np.argsort(-materials, axis=1, kind='stable')[:, :3]
+        present = np.take_along_axis(materials, dominant, axis=1) > 0
+        latitudes = np.round(grid['lat_sum'][positions] / counts, 6).tolist()
+        longitudes = np.round(grid['lon_sum'][positions] / counts, 6).tolist()
+        id_sums = grid['id_sum'][positions].tolist()
+
+        clusters = []
+        for row, count in enumerate(counts.tolist()):
+            clusters.append({
+                'latitude': latitudes[row],
+                'longitude': longitudes[row],
+                'count': count,
+                'materials': [MATERIAL_KEYS[m] for m, shown in zip(dominant[row].tolist(), present[row]) if shown],
+                'center_id': id_sums[row] if count == 1 else None
+            })
+        return level, clusters
+
+    def stats(self):
+        levels = self._levels
+        return {
+            'levels': len(levels),
+            'cells': sum(len(grid['keys']) for grid in levels),
+            'position': self._position,
+            'rebuilds': self.rebuilds,
+            'incremental_updates': self.incremental_updates,
+            'last_refresh_ms': round(self.last_refresh_ms, 2)
+        }
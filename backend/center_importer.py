@@ -0,0 +1,235 @@
+"""
+Bulk import of recycling centers from municipal open-data files.
+
+CSV, GeoJSON FeatureCollections and line-delimited GeoJSON are streamed
+record by record, so memory stays flat whatever the file size. Rows are
+written with one executemany per batch, each batch in its own
+transaction, matched to existing centers by name and location (see
+repositories.center_dedupe_key). Accepted materials and opening hours are
+normalised on the way in. Each batch bumps the center version; running
+servers reload their spatial index at most once per refresh_interval.
+
+    python center_importer.py centers.csv
+    python center_importer.py centers.geojson --skip-existing --batch-size 10000
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from functools import lru_cache
+from center_materials import normalize_accepts_types
+from storage import get_storage
+
+# Lower-cased source column/property names -> recycling_centers fields
+FIELD_ALIASES = {
+    'name': 'name', 'facility_name': 'name', 'site_name': 'name', 'title': 'name',
+    'address': 'address', 'addr': 'address', 'street_address': 'address', 'location': 'address',
+    'latitude': 'latitude', 'lat': 'latitude', 'y': 'latitude',
+    'longitude': 'longitude', 'lon': 'longitude', 'lng': 'longitude', 'long': 'longitude', 'x': 'longitude',
+    'accepts_types': 'accepts_types', 'accepts': 'accepts_types', 'materials': 'accepts_types',
+    'accepted_materials': 'accepts_types', 'recycling_type': 'accepts_types',
+    'operating_hours': 'operating_hours', 'hours': 'operating_hours', 'opening_hours': 'operating_hours',
+    'contact': 'contact', 'phone': 'contact', 'telephone': 'contact', 'contact_phone': 'contact',
+    'rating': 'rating',
+}
+
+LINE_DELIMITED_EXTENSIONS = ('.geojsonl', '.geojsons', '.ndjson', '.jsonl')
+
+_DAY_NAMES = {
+    'monday': 'Mo', 'mon': 'Mo', 'tuesday': 'Tu', 'tues': 'Tu', 'tue': 'Tu',
+    'wednesday': 'We', 'wed': 'We', 'thursday': 'Th', 'thurs': 'Th', 'thur': 'Th', 'thu': 'Th',
+    'friday': 'Fr', 'fri': 'Fr', 'saturday': 'Sa', 'sat': 'Sa', 'sunday': 'Su', 'sun': 'Su',
+}
+_DAY = re.compile(r'\b(' + '|'.join(sorted(_DAY_NAMES, key=len, reverse=True)) + r')\b', re.IGNORECASE)
+_TWELVE_HOUR = re.compile(r'\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?m\.?', re.IGNORECASE)
+_RANGE = re.compile(r'\s*(?:-|–|—|\bto\b)\s*', re.IGNORECASE)
+_FEATURES_START = re.compile(r'"features"\s*:\s*\[')
+
+@lru_cache(maxsize=4096)
+def normalize_operating_hours(hours):
+    """Opening hours in OSM-like form: "Mon - Fri 8am to 5:30 pm" -> "Mo-Fr 08:00-17:30" """
+    if not hours:
+        return None
+    text = ' '.join(str(hours).split())
+
+    def twenty_four_hour(match):
+        hour = int(match.group(1)) % 12 + (12 if match.group(3).lower() == 'p' else 0)
+        return f"{hour:02d}:{match.group(2) or '00'}"
+
+    text = _TWELVE_HOUR.sub(twenty_four_hour, text)
+    text = _DAY.sub(lambda match: _DAY_NAMES[match.group(1).lower()], text)
+    return _RANGE.sub('-', text) or None
+
+def center_from_record(record, verified=True):
+    """Center fields from one source record, or None if it has no name or valid position"""
+    fields = {}
+    materials = []
+    for key, value in record.items():
+        if key is None or value is None or value == '':
+            continue
+        key = key.strip().lower()
+        # OpenStreetMap exports: recycling:batteries=yes
+        if key.startswith('recycling:') and str(value).lower() == 'yes':
+            materials.append(key.split(':', 1)[1])
+            continue
+        field = FIELD_ALIASES.get(key)
+        if field is not None and field not in fields:
+            fields[field] = value
+
+    name = str(fields.get('name', '')).strip()
+    try:
+        latitude = float(fields['latitude'])
+        longitude = float(fields['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not name or not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        return None
+
+    accepts = fields.get('accepts_types', '')
+    if isinstance(accepts, str):
+        accepts = [accepts]
+    try:
+        rating = float(fields.get('rating', 0.0))
+    except (TypeError, ValueError):
+        rating = 0.0
+
+    return {
+        'name': name,
+        'address': str(fields['address']).strip() if 'address' in fields else None,
+        'latitude': latitude,
+        'longitude': longitude,
+        'accepts_types': normalize_accepts_types(list(accepts) + materials),
+        'operating_hours': normalize_operating_hours(fields.get('operating_hours')),
+        'contact': str(fields['contact']).strip() if 'contact' in fields else None,
+        'rating': rating,
+        'verified': verified
+    }
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        yield from csv.DictReader(handle)
+
+def _feature_record(feature):
+    """Properties of a Point feature plus its coordinates; None for other geometries"""
+    geometry = feature.get('geometry') or {}
+    if geometry.get('type') != 'Point' or len(geometry.get('coordinates') or ()) < 2:
+        return None
+    record = dict(feature.get('properties') or {})
+    record['longitude'], record['latitude'] = geometry['coordinates'][:2]
+    return record
+
+def iter_geojson_features(handle, chunk_size=1 << 20):
+    """Features of a FeatureCollection, decoded one at a time from chunked reads"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    while True:
+        match = _FEATURES_START.search(buffer)
+        if match:
+            position = match.end()
+            break
+        chunk = handle.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position == len(buffer):
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                return
+            buffer, position = chunk, 0
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            feature, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # Feature cut off by the chunk boundary
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                raise
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield feature
+        if position > chunk_size:
+            buffer, position = buffer[position:], 0
+
+def read_geojson(path):
+    with open(path, encoding='utf-8-sig') as handle:
+        if path.lower().endswith(LINE_DELIMITED_EXTENSIONS):
+            features = (json.loads(line.lstrip('\x1e')) for line in handle if line.strip())
+        else:
+            features = iter_geojson_features(handle)
+        for feature in features:
+            yield _feature_record(feature)
+
+def read_records(path, file_format=None):
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'geojson')
+    return read_csv(path) if file_format == 'csv' else read_geojson(path)
+
+def import_centers(centers, records, batch_size=5000, update_existing=True, verified=True,
+                   progress_every=100000):
+    """Write source records through a CenterRepository; returns the import report"""
+    report = {'read': 0, 'invalid': 0, 'written': 0, 'skipped': 0}
+    start_time = time.perf_counter()
+    next_progress = progress_every
+    batch = []
+
+    def flush():
+        written = centers.upsert_many(batch, update_existing)
+        report['written'] += written
+        report['skipped'] += len(batch) - written
+        batch.clear()
+
+    for record in records:
+        report['read'] += 1
+        center = center_from_record(record, verified) if record is not None else None
+        if center is None:
+            report['invalid'] += 1
+            continue
+        batch.append(center)
+        if len(batch) >= batch_size:
+            flush()
+        if progress_every and report['read'] >= next_progress:
+            elapsed = time.perf_counter() - start_time
+            print(f"  {report['read']} rows read, {report['read'] / elapsed:.0f} rows/s")
+            next_progress += progress_every
+    if batch:
+        flush()
+
+    elapsed = time.perf_counter() - start_time
+    report['seconds'] = round(elapsed, 2)
+    report['rows_per_second'] = round(report['read'] / elapsed) if elapsed > 0 else 0
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Import recycling centers from CSV or GeoJSON')
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=('csv', 'geojson'), default=None,
+                        help='default: from the file extension')
+    parser.add_argument('--db', default='ecolife_community.db')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--skip-existing', action='store_true',
+                        help='leave centers that are already present untouched instead of updating them')
+    parser.add_argument('--unverified', action='store_true',
+                        help='import as unverified (hidden from search until reviewed)')
+    args = parser.parse_args()
+
+    storage = get_storage('sqlite', users_db_path=os.path.join(os.path.dirname(args.db), 'ecolife_users.db'),
+                          community_db_path=args.db)
+
+    print(f"Importing {args.path} into {args.db}")
+    report = import_centers(
+        storage.centers, read_records(args.path, args.format), args.batch_size,
+        update_existing=not args.skip_existing, verified=not args.unverified
+    )
+    print(f"{report['read']} rows read, {report['written']} written, "
+          f"{report['skipped']} existing skipped, {report['invalid']} invalid "
+          f"in {report['seconds']}s ({report['rows_per_second']} rows/s)")
+
+if __name__ == "__main__":
+    main()
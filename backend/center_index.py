@@ -0,0 +1,190 @@
+import threading
+import time
+import numpy as np
+from center_materials import MATERIAL_BITS
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+# Farthest any two points on the sphere can be apart
+MAX_DISTANCE_KM = np.pi * EARTH_RADIUS_KM
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance from one point to arrays of points, in km"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = (np.sin((lats - lat) / 2) ** 2 +
+         np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class CenterIndex:
+    """
+    In-process spatial index over verified recycling centers.
+    Coordinates are held as NumPy arrays sorted by latitude: a query takes
+    the latitude band with a binary search, keeps the longitude window
+    (wrapping at the antimeridian), and computes exact haversine distances
+    only for those candidates. Nearest-k queries grow the radius until k
+    centers fall inside it. A waste_type filter tests each candidate's
+    accepts_mask bit before any distance is computed. Only ids, coordinates,
+    masks and the parsed accepts_types lists (one shared tuple per distinct
+    string) are resident; the full rows of the results are read from the
+    repository and carry 'accepts' from the index.
+
+    The repository's version counter is bumped by triggers on every change
+    to recycling_centers, and is checked at most every refresh_interval
+    seconds before a query.
+    """
+
+    def __init__(self, centers, refresh_interval=1.0):
+        self.centers = centers
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._snapshot = (np.empty(0, dtype=np.int64), np.empty(0), np.empty(0),
+                          np.empty(0, dtype=np.int64))
+        self._accepts = {}
+        self._version = None
+        self._checked_at = 0.0
+        self.reloads = 0
+        self.last_reload_ms = 0.0
+
+    def refresh(self, force=False):
+        """Reload the arrays if centers changed since the last load"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_interval:
+            return
+        # Another thread is already reloading: serve the current snapshot meanwhile
+        if not self._lock.acquire(blocking=force):
+            return
+        try:
+            self._checked_at = now
+            version = self.centers.version()
+            if not force and version == self._version:
+                return
+            start_time = time.perf_counter()
+            rows = self.centers.verified_coordinates()
+            coords = np.array(rows, dtype=np.float64).reshape(-1, 4)
+            order = np.argsort(coords[:, 1], kind='stable')
+            coords = coords[order]
+            self._snapshot = (coords[:, 0].astype(np.int64), coords[:, 1].copy(),
+                              coords[:, 2].copy(), coords[:, 3].astype(np.int64))
+            self._accepts = self._parse_accepts(self.centers.verified_accepts_types())
+            self._version = version
+            self.reloads += 1
+            self.last_reload_ms = 1000 * (time.perf_counter() - start_time)
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _parse_accepts(rows):
+        """{id: tuple of accepts_types items}, parsing each distinct string once"""
+        parsed = {}
+        accepts = {}
+        for center_id, accepts_types in rows:
+            if accepts_types not in parsed:
+                parsed[accepts_types] = tuple(accepts_types.split(',')) if accepts_types else ()
+            accepts[center_id] = parsed[accepts_types]
+        return accepts
+
+    def _candidates(self, snapshot, latitude, longitude, radius_km, material_bit):
+        """Positions inside the bounding box of the search circle"""
+        ids, lats, lons, masks = snapshot
+        lat_delta = radius_km / KM_PER_DEGREE
+        lo = np.searchsorted(lats, latitude - lat_delta, side='left')
+        hi = np.searchsorted(lats, latitude + lat_delta, side='right')
+        positions = np.arange(lo, hi)
+
+        # The box spans every longitude when the circle reaches a pole
+        if abs(latitude) + lat_delta < 90:
+            lon_delta = np.degrees(np.arcsin(
+                np.sin(np.radians(lat_delta)) / np.cos(np.radians(latitude))))
+            offset = (lons[lo:hi] - longitude + 540.0) % 360.0 - 180.0
+            positions = positions[np.abs(offset) <= lon_delta]
+        if material_bit:
+            positions = positions[(masks[positions] & material_bit) != 0]
+        return positions
+
+    def _search(self, snapshot, latitude, longitude, radius_km, limit, material_bit=0):
+        ids, lats, lons, masks = snapshot
+        positions = self._candidates(snapshot, latitude, longitude, radius_km, material_bit)
+        distances = haversine_km(latitude, longitude, lats[positions], lons[positions])
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+
+        if limit is not None and len(distances) > limit:
+            keep = np.argpartition(distances, limit - 1)[:limit]
+            positions, distances = positions[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return ids[positions[order]], distances[order]
+
+    def _rows(self, ids, distances):
+        rows = {row['id']: row for row in self.centers.get_many([int(i) for i in ids])}
+        accepts = self._accepts
+        results = []
+        for center_id, distance in zip(ids, distances):
+            row = rows.get(int(center_id))
+            if row is not None:
+                # A reload can land mid-query; parse the row itself in that rare case
+                parsed = accepts.get(row['id'])
+                if parsed is None:
+                    parsed = self._parse_accepts([(row['id'], row['accepts_types'])])[row['id']]
+                results.append(dict(row, accepts=parsed, distance_km=float(distance)))
+        return results
+
+    def within(self, latitude, longitude, radius_km, limit=10, waste_type=None):
+        """Centers within radius_km, nearest first, with distance_km"""
+        self.refresh()
+        ids, distances = self._search(self._snapshot, latitude, longitude, radius_km, limit,
+                                      self._material_bit(waste_type))
+        return self._rows(ids, distances)
+
+    def nearest(self, latitude, longitude, k=10, max_radius_km=None, waste_type=None):
+        """The k nearest centers, optionally no farther than max_radius_km"""
+        self.refresh()
+        snapshot = self._snapshot
+        material_bit = self._material_bit(waste_type)
+        if material_bit:
+            total = int(np.count_nonzero(snapshot[3] & material_bit))
+        else:
+            total = len(snapshot[0])
+        max_radius_km = min(max_radius_km or MAX_DISTANCE_KM, MAX_DISTANCE_KM)
+
+        # Any circle holding k centers holds the k nearest; grow until one does
+        radius_km = min(10.0, max_radius_km)
+        while True:
+            ids, distances = self._search(snapshot, latitude, longitude, radius_km, None,
+                                          material_bit)
+            if len(ids) >= min(k, total) or radius_km >= max_radius_km:
+                break
+            radius_km = min(radius_km * 4, max_radius_km)
+        return self._rows(ids[:k], distances[:k])
+
+    def _material_bit(self, waste_type):
+        if waste_type is None:
+            return 0
+        if waste_type not in MATERIAL_BITS:
+            raise ValueError(f"Unknown waste type: {waste_type}")
+        return MATERIAL_BITS[waste_type]
+
+    def in_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """(ids, latitudes, longitudes, masks) inside a box; min_lon > max_lon crosses the antimeridian"""
+        self.refresh()
+        ids, lats, lons, masks = self._snapshot
+        lo = np.searchsorted(lats, min_lat, side='left')
+        hi = np.searchsorted(lats, max_lat, side='right')
+        band = lons[lo:hi]
+        if min_lon <= max_lon:
+            inside = (band >= min_lon) & (band <= max_lon)
+        else:
+            inside = (band >= min_lon) | (band <= max_lon)
+        positions = np.arange(lo, hi)[inside]
+        return ids[positions], lats[positions], lons[positions], masks[positions]
+
+    def __len__(self):
+        return len(self._snapshot[0])
+
+    def stats(self):
+        return {
+            'centers': len(self),
+            'version': self._version,
+            'reloads': self.reloads,
+            'last_reload_ms': round(self.last_reload_ms, 2)
+        }
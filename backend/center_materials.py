@@ -0,0 +1,110 @@
+"""
+Accepted materials of recycling centers as a bitmask over the
+ADVANCED_WASTE_CATEGORIES keys.
+
+Free-text accepts_types ("Plastic, batteries, E-Waste") is normalised
+once on write into recycling_centers.accepts_mask, so "who accepts X near
+me" is a bitwise test instead of string parsing. Bits follow the
+category order; new categories must be appended to the end of
+ADVANCED_WASTE_CATEGORIES so existing masks keep their meaning.
+"""
+import re
+from functools import lru_cache
+from waste_categories import ADVANCED_WASTE_CATEGORIES
+
+MATERIAL_BITS = {key: 1 << position for position, key in enumerate(ADVANCED_WASTE_CATEGORIES)}
+
+# Common words used for accepted materials, beyond category keys and subcategories
+MATERIAL_ALIASES = {
+    'paper': 'recyclable_paper',
+    'cardboard': 'recyclable_paper',
+    'plastic': 'recyclable_plastic',
+    'plastics': 'recyclable_plastic',
+    'glass': 'recyclable_glass',
+    'metal': 'recyclable_metal',
+    'metals': 'recyclable_metal',
+    'aluminum': 'recyclable_metal',
+    'aluminium': 'recyclable_metal',
+    'cans': 'recyclable_metal',
+    'food': 'organic_food',
+    'compost': 'organic_food',
+    'organic': 'organic_food',
+    'organics': 'organic_food',
+    'yard': 'organic_yard',
+    'garden': 'organic_yard',
+    'green_waste': 'organic_yard',
+    'general': 'landfill_general',
+    'landfill': 'landfill_general',
+    'trash': 'landfill_general',
+    'hazardous_waste': 'hazardous',
+    'hhw': 'hazardous',
+    'paint': 'hazardous',
+    'chemical': 'hazardous',
+    'ewaste': 'e_waste',
+    'electronic': 'e_waste',
+    'computers': 'e_waste',
+    'phone': 'e_waste',
+}
+
+def _build_lookup():
+    lookup = {}
+    for key, category in ADVANCED_WASTE_CATEGORIES.items():
+        lookup[key] = MATERIAL_BITS[key]
+        # "batteries" is listed under both hazardous and e_waste and sets both bits
+        for subcategory in category['subcategories']:
+            lookup[subcategory] = lookup.get(subcategory, 0) | MATERIAL_BITS[key]
+    for alias, key in MATERIAL_ALIASES.items():
+        lookup.setdefault(alias, MATERIAL_BITS[key])
+    return lookup
+
+_MATERIAL_LOOKUP = _build_lookup()
+_SEPARATOR = re.compile(r'[^a-z0-9]+')
+_LIST_SEPARATOR = re.compile(r'[,;|]')
+
+def material_mask(material):
+    """Bits for one free-text material, 0 if unknown"""
+    token = _SEPARATOR.sub('_', (material or '').lower()).strip('_')
+    return _MATERIAL_LOOKUP.get(token, 0)
+
+def _items(accepts_types):
+    if not accepts_types:
+        return ()
+    return (accepts_types,) if isinstance(accepts_types, str) else accepts_types
+
+# Imports repeat the same few material strings; parse each one once
+@lru_cache(maxsize=4096)
+def _text_mask(text):
+    mask = 0
+    for material in _LIST_SEPARATOR.split(text):
+        mask |= material_mask(material)
+    return mask
+
+@lru_cache(maxsize=4096)
+def _text_materials(text):
+    materials = []
+    for material in _LIST_SEPARATOR.split(text):
+        token = _SEPARATOR.sub('_', material.lower()).strip('_')
+        mask = _MATERIAL_LOOKUP.get(token)
+        materials.extend(materials_from_mask(mask) if mask else [token] if token else [])
+    return tuple(materials)
+
+def accepts_mask(accepts_types):
+    """Bitmask for a comma-separated accepts_types string or a list of materials"""
+    mask = 0
+    for item in _items(accepts_types):
+        if item:
+            mask |= _text_mask(str(item))
+    return mask
+
+def normalize_accepts_types(accepts_types):
+    """Comma-joined category keys for known materials, cleaned words for the rest"""
+    normalized = []
+    for item in _items(accepts_types):
+        for name in (_text_materials(str(item)) if item else ()):
+            if name not in normalized:
+                normalized.append(name)
+    return ','.join(normalized)
+
+def materials_from_mask(mask):
+    """Category keys set in a mask, in category order"""
+    return [key for key, bit in MATERIAL_BITS.items() if mask & bit]
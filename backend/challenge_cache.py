@@ -0,0 +1,72 @@
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+
+def _as_datetime(value):
+    """Challenge dates are timestamp text from either engine; datetimes are accepted too"""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+class ActiveChallengeCache:
+    """
+    The active challenge listing and its ETag, built once and shared by
+    every request. It is dropped on create/join, when the earliest listed
+    challenge ends (end dates are UTC, as in the repositories' queries),
+    and after max_age_seconds so joins made by other processes show up.
+    """
+
+    def __init__(self, loader, max_age_seconds=60):
+        self.loader = loader
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._entry = None
+        self._generation = 0
+        self.hits = 0
+        self.loads = 0
+
+    def get(self):
+        """(challenges, etag)"""
+        entry = self._entry
+        if entry is not None and datetime.utcnow() < entry[2]:
+            self.hits += 1
+            return entry[0], entry[1]
+
+        with self._lock:
+            generation = self._generation
+        challenges = self.loader()
+        etag = hashlib.sha1(json.dumps(challenges, sort_keys=True, default=str).encode()).hexdigest()
+
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.max_age_seconds)
+        end_dates = [_as_datetime(c['end_date']) for c in challenges]
+        end_dates = [end_date for end_date in end_dates if end_date is not None]
+        if end_dates:
+            # datetime('now') has whole seconds, so a challenge can outlive its end_date by up to one
+            expires_at = min(expires_at, max(min(end_dates), now) + timedelta(seconds=1))
+
+        with self._lock:
+            # An invalidation during the load means this listing may already be stale
+            if generation == self._generation:
+                self._entry = (challenges, etag, expires_at)
+            self.loads += 1
+        return challenges, etag
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._entry = None
+
+    def stats(self):
+        entry = self._entry
+        return {
+            'cached': entry is not None,
+            'challenges': len(entry[0]) if entry else 0,
+            'expires_at': entry[2].isoformat() if entry else None,
+            'hits': self.hits,
+            'loads': self.loads
+        }
@@ -0,0 +1,48 @@
+import threading
+import time
+from collections import Counter
+
+# Challenge types whose progress is the number of scans
+SCAN_CHALLENGE_TYPES = ('scans',)
+
+class ChallengeProgressEngine:
+    """
+    Scan challenges advanced from the scan write path.
+    Registered as a ScanRecorder listener, it gets each committed batch,
+    counts scans per user and applies them with set-based UPDATEs (one per
+    distinct count, usually one or two) across every active scan challenge
+    those users have joined, marking completions in the same statements.
+    Completed participations stop counting.
+    """
+
+    def __init__(self, challenges, challenge_types=SCAN_CHALLENGE_TYPES):
+        self.challenges = challenges
+        self.challenge_types = tuple(challenge_types)
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.scans = 0
+        self.participations_advanced = 0
+        self.last_batch_ms = 0.0
+
+    def on_scans_committed(self, events):
+        """ScanRecorder listener"""
+        increments = Counter(e.user_id for e in events)
+        if not increments:
+            return 0
+        start_time = time.perf_counter()
+        advanced = self.challenges.apply_scan_progress(increments, self.challenge_types)
+        with self._lock:
+            self.batches += 1
+            self.scans += len(events)
+            self.participations_advanced += advanced
+            self.last_batch_ms = 1000 * (time.perf_counter() - start_time)
+        return advanced
+
+    def stats(self):
+        return {
+            'challenge_types': list(self.challenge_types),
+            'batches': self.batches,
+            'scans': self.scans,
+            'participations_advanced': self.participations_advanced,
+            'last_batch_ms': round(self.last_batch_ms, 2)
+        }
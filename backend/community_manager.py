@@ -1,345 +1,250 @@
-import sqlite3
 from datetime import datetime, timedelta
 import json
+import threading
+import time
+from storage import get_storage
+from leaderboard_index import LeaderboardIndex
+from windowed_leaderboard import WindowedLeaderboard
+from local_leaderboards import LocalLeaderboards
+from locations import normalize_location
+from center_index import CenterIndex
+from center_clusters import CenterClusterPyramid
+from tip_catalog import DailyTipCatalog
+from challenge_cache import ActiveChallengeCache
+from challenge_progress import ChallengeProgressEngine
 
 class CommunityManager:
-    def __init__(self, db_path='ecolife_community.db'):
+    def __init__(self, db_path='ecolife_community.db', users_db_path='ecolife_users.db', storage=None):
         self.db_path = db_path
-        self.init_database()
+        # Challenges, centers and tips; leaderboards and global stats read the user repositories
+        self.storage = storage or get_storage(users_db_path=users_db_path, community_db_path=db_path)
+        # All-time ranking, loaded once and kept current from the scan write path
+        self.leaderboard = LeaderboardIndex()
+        # Week/month rankings by recent activity, from daily score buckets
+        self.windowed_leaderboards = {
+            timeframe: WindowedLeaderboard(days) for timeframe, days in self.LEADERBOARD_WINDOWS.items()
+        }
+        # City pages: bounded top-K per canonical location, cold cities evicted
+        self.local_leaderboards = LocalLeaderboards(self.storage.users)
+        # Writes from other processes (workers, CLIs, retention) show up as a
+        # new leaderboard version; the boards are reloaded when it moves
+        self._leaderboard_reload_lock = threading.Lock()
+        self._leaderboard_version = None
+        self._leaderboard_checked_at = 0.0
+        self.leaderboard_reloads = 0
+        self.refresh_leaderboards(force=True)
+        # Center search: lat-sorted NumPy arrays, reloaded when the centers version moves
+        self.center_index = CenterIndex(self.storage.centers)
+        self.center_index.refresh(force=True)
+        # Map clusters per zoom level, kept current from the center change log
+        self.center_clusters = CenterClusterPyramid(self.storage.centers, self.center_index)
+        self.center_clusters.refresh(force=True)
+        # Tip of the day: catalog loaded once per day, picks cached until midnight UTC
+        self.tip_catalog = DailyTipCatalog(self.storage.tips)
+        # /challenges listing, shared until a create/join or the next challenge ends
+        self.challenge_cache = ActiveChallengeCache(self._load_active_challenges)
+        # Scan challenges, advanced per committed scan batch in one statement
+        self.challenge_progress = ChallengeProgressEngine(self.storage.challenges)
     
-    def init_database(self):
-        """Initialize community database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS leaderboard (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                total_scans INTEGER,
-                recycling_score INTEGER,
-                co2_saved REAL,
-                rank INTEGER,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Community challenges
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS challenges (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                description TEXT,
-                target_value INTEGER,
-                challenge_type TEXT,
-                start_date TIMESTAMP,
-                end_date TIMESTAMP,
-                reward_points INTEGER,
-                created_by INTEGER
-            )
-        ''')
-        
-        # Challenge participation
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS challenge_participants (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                challenge_id INTEGER,
-                user_id INTEGER,
-                progress INTEGER DEFAULT 0,
-                completed BOOLEAN DEFAULT 0,
-                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (challenge_id) REFERENCES challenges (id)
-            )
-        ''')
+    LEADERBOARD_WINDOWS = {'week': 7, 'month': 30}
+    # Seconds between leaderboard version checks; a reload costs one full read of the users
+    LEADERBOARD_RELOAD_INTERVAL = 30.0
     
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS eco_tips (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tip_text TEXT NOT NULL,
-                category TEXT,
-                difficulty TEXT,
-                impact_score INTEGER,
-                likes INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+    def refresh_leaderboards(self, force=False):
+        """Reload the in-memory boards if the stored leaderboard data changed"""
+        now = time.monotonic()
+        if not force and now - self._leaderboard_checked_at < self.LEADERBOARD_RELOAD_INTERVAL:
+            return
+        if not self._leaderboard_reload_lock.acquire(blocking=force):
+            return
+        try:
+            self._leaderboard_checked_at = now
+            # Read the version first so changes made during the load trigger the next reload
+            version = self.storage.users.leaderboard_version()
+            if not force and version == self._leaderboard_version:
+                return
+            self.leaderboard.load(self.storage.users.leaderboard_rows())
+            self._load_windowed_leaderboards()
+            self.local_leaderboards.invalidate()
+            self._leaderboard_version = version
+            self.leaderboard_reloads += 1
+        finally:
+            self._leaderboard_reload_lock.release()
     
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_contributions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                contribution_type TEXT,
-                content TEXT,
-                upvotes INTEGER DEFAULT 0,
-                verified BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
+    def leaderboard_sync_stats(self):
+        return {
+            'version': self._leaderboard_version,
+            'reloads': self.leaderboard_reloads,
+            'reload_interval': self.LEADERBOARD_RELOAD_INTERVAL
+        }
     
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS recycling_centers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                address TEXT,
-                latitude REAL,
-                longitude REAL,
-                accepts_types TEXT,
-                operating_hours TEXT,
-                contact TEXT,
-                rating REAL DEFAULT 0.0,
-                verified BOOLEAN DEFAULT 0
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+    def _load_windowed_leaderboards(self):
+        longest = max(self.windowed_leaderboards.values(), key=lambda board: board.days)
+        buckets = self.storage.scans.daily_scores(longest.first_day())
+        user_rows = self.storage.users.leaderboard_rows({bucket[0] for bucket in buckets})
+        for board in self.windowed_leaderboards.values():
+            board.load(buckets, user_rows)
+    
+    def refresh_users(self, user_ids):
+        """Re-rank users in the all-time and local boards from their stored rows"""
+        user_rows = self.storage.users.leaderboard_rows(user_ids)
+        for row in user_rows:
+            self.leaderboard.update(row)
+            self.local_leaderboards.update(row)
+        return user_rows
+    
+    def on_scans_committed(self, events):
+        """ScanRecorder listener: re-rank the users whose scores just changed"""
+        user_ids = {e.user_id for e in events}
+        user_rows = self.refresh_users(user_ids)
+        
+        buckets = self.storage.scans.daily_scores(min(e.timestamp[:10] for e in events), user_ids)
+        for board in self.windowed_leaderboards.values():
+            board.apply(buckets, user_rows)
+    
+    def _leaderboard_entry(self, row, rank):
+        return {
+            'username': row['username'],
+            'total_scans': row['total_scans'],
+            'recycling_score': row['recycling_score'],
+            'co2_saved': round(row['co2_saved'], 2),
+            'rank': rank
+        }
     
     def get_leaderboard(self, timeframe='all', limit=50):
         """Get global leaderboard"""
-        conn = sqlite3.connect('ecolife_users.db')
-        cursor = conn.cursor()
-        
+        self.refresh_leaderboards()
+        board = self.windowed_leaderboards.get(timeframe, self.leaderboard)
+        return [self._leaderboard_entry(row, row['rank']) for row in board.top(limit)]
     
-        date_filter = ''
-        if timeframe == 'week':
-            date_filter = f"AND created_at >= datetime('now', '-7 days')"
-        elif timeframe == 'month':
-            date_filter = f"AND created_at >= datetime('now', '-30 days')"
-        
-        query = f'''
-            SELECT username, total_scans, recycling_score, co2_saved,
-                   ROW_NUMBER() OVER (ORDER BY recycling_score DESC) as rank
-            FROM users
-            WHERE total_scans > 0 {date_filter}
-            ORDER BY recycling_score DESC
-            LIMIT ?
-        '''
+    def get_user_rank(self, user_id, radius=5, timeframe='all'):
+        """A user's rank with the neighbours just above and below"""
+        self.refresh_leaderboards()
+        board = self.windowed_leaderboards.get(timeframe, self.leaderboard)
+        result = board.around(user_id, radius)
+        if result is None:
+            return None
         
-        cursor.execute(query, (limit,))
-        results = cursor.fetchall()
-        conn.close()
-        
-        return [{
-            'username': r[0],
-            'total_scans': r[1],
-            'recycling_score': r[2],
-            'co2_saved': round(r[3], 2),
-            'rank': r[4]
-        } for r in results]
+        return {
+            'rank': result['rank'],
+            'total_ranked': result['total'],
+            'neighbours': [
+                dict(self._leaderboard_entry(row, row['rank']), is_me=row['user_id'] == user_id)
+                for row in result['entries']
+            ]
+        }
     
     def get_local_leaderboard(self, location, limit=20):
         """Get location-based leaderboard"""
-        conn = sqlite3.connect('ecolife_users.db')
-        cursor = conn.cursor()
+        location_key = normalize_location(location)
+        if location_key is None:
+            return []
         
-        cursor.execute('''
-            SELECT username, total_scans, recycling_score, co2_saved
-            FROM users
-            WHERE location = ? AND total_scans > 0
-            ORDER BY recycling_score DESC
-            LIMIT ?
-        ''', (location, limit))
-        
-        results = cursor.fetchall()
-        conn.close()
-        
-        return [{
-            'username': r[0],
-            'total_scans': r[1],
-            'recycling_score': r[2],
-            'co2_saved': round(r[3], 2),
-            'rank': idx + 1
-        } for idx, r in enumerate(results)]
+        self.refresh_leaderboards()
+        results = self.local_leaderboards.top(location_key, limit)
+        return [self._leaderboard_entry(r, idx + 1) for idx, r in enumerate(results)]
+    
+    def get_active_locations(self, limit=20):
+        """Locations ranked by total scans of their users"""
+        self.refresh_leaderboards()
+        return self.local_leaderboards.active_locations(limit)
     
     def create_challenge(self, title, description, target_value, 
                         challenge_type, duration_days, reward_points):
         """Create new community challenge"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        start_date = datetime.now()
+        # UTC text in SQLite's datetime('now') format, which the active filters compare against
+        start_date = datetime.utcnow()
         end_date = start_date + timedelta(days=duration_days)
         
-        cursor.execute('''
-            INSERT INTO challenges 
-            (title, description, target_value, challenge_type, start_date, end_date, reward_points)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (title, description, target_value, challenge_type, 
-              start_date, end_date, reward_points))
-        
-        challenge_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
+        challenge_id = self.storage.challenges.create(
+            title, description, target_value, challenge_type,
+            start_date.strftime('%Y-%m-%d %H:%M:%S'), end_date.strftime('%Y-%m-%d %H:%M:%S'),
+            reward_points
+        )
+        self.challenge_cache.invalidate()
         return challenge_id
     
     def get_active_challenges(self):
         """Get all active challenges"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, title, description, target_value, challenge_type,
-                   start_date, end_date, reward_points,
-                   (SELECT COUNT(*) FROM challenge_participants WHERE challenge_id = challenges.id) as participants
-            FROM challenges
-            WHERE end_date > datetime('now')
-            ORDER BY start_date DESC
-        ''')
-        
-        results = cursor.fetchall()
-        conn.close()
-        
+        return self.challenge_cache.get()[0]
+    
+    def get_active_challenges_with_etag(self):
+        """Active challenges and the ETag of that listing"""
+        return self.challenge_cache.get()
+    
+    def _load_active_challenges(self):
         return [{
-            'id': r[0],
-            'title': r[1],
-            'description': r[2],
-            'target': r[3],
-            'type': r[4],
-            'start_date': r[5],
-            'end_date': r[6],
-            'reward_points': r[7],
-            'participants': r[8]
-        } for r in results]
+            'id': c['id'],
+            'title': c['title'],
+            'description': c['description'],
+            'target': c['target_value'],
+            'type': c['challenge_type'],
+            'start_date': c['start_date'],
+            'end_date': c['end_date'],
+            'reward_points': c['reward_points'],
+            'participants': c['participants']
+        } for c in self.storage.challenges.active()]
     
     def join_challenge(self, user_id, challenge_id):
         """User joins a challenge"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('''
-                INSERT INTO challenge_participants (challenge_id, user_id)
-                VALUES (?, ?)
-            ''', (challenge_id, user_id))
-            conn.commit()
-            success = True
-        except sqlite3.IntegrityError:
-            success = False
-        
-        conn.close()
-        return success
+        joined = self.storage.challenges.join(user_id, challenge_id)
+        if joined:
+            self.challenge_cache.invalidate()
+        return joined
     
     def update_challenge_progress(self, user_id, challenge_id, progress_increment):
         """Update user's challenge progress"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE challenge_participants
-            SET progress = progress + ?
-            WHERE user_id = ? AND challenge_id = ?
-        ''', (progress_increment, user_id, challenge_id))
-        
-        # Check if challenge is completed
-        cursor.execute('''
-            SELECT cp.progress, c.target_value
-            FROM challenge_participants cp
-            JOIN challenges c ON cp.challenge_id = c.id
-            WHERE cp.user_id = ? AND cp.challenge_id = ?
-        ''', (user_id, challenge_id))
-        
-        result = cursor.fetchone()
-        if result and result[0] >= result[1]:
-            cursor.execute('''
-                UPDATE challenge_participants
-                SET completed = 1
-                WHERE user_id = ? AND challenge_id = ?
-            ''', (user_id, challenge_id))
-        
-        conn.commit()
-        conn.close()
+        self.storage.challenges.add_progress(user_id, challenge_id, progress_increment)
     
-    def get_daily_eco_tip(self):
-        """Get random eco tip of the day"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT tip_text, category, impact_score
-            FROM eco_tips
-            ORDER BY RANDOM()
-            LIMIT 1
-        ''')
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result:
-            return {
-                'tip': result[0],
-                'category': result[1],
-                'impact_score': result[2]
-            }
-        return None
+    def get_daily_eco_tip(self, category=None):
+        """Get the eco tip of the day, from category (e.g. a waste type) when it has tips"""
+        return self.tip_catalog.tip_of_the_day(category)
     
-    def find_nearby_recycling_centers(self, latitude, longitude, radius_km=10):
-        """Find recycling centers near location"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-       
-        cursor.execute('''
-            SELECT id, name, address, latitude, longitude, accepts_types, 
-                   operating_hours, contact, rating,
-                   (6371 * acos(cos(radians(?)) * cos(radians(latitude)) * 
-                   cos(radians(longitude) - radians(?)) + 
-                   sin(radians(?)) * sin(radians(latitude)))) AS distance
-            FROM recycling_centers
-            WHERE verified = 1
-            HAVING distance <= ?
-            ORDER BY distance
-            LIMIT 10
-        ''', (latitude, longitude, latitude, radius_km))
-        
-        results = cursor.fetchall()
-        conn.close()
-        
+    def find_nearby_recycling_centers(self, latitude, longitude, radius_km=10, limit=10,
+                                      waste_type=None):
+        """Find recycling centers near location, optionally only those accepting waste_type"""
+        results = self.center_index.within(latitude, longitude, radius_km, limit, waste_type)
+        return self._center_entries(results)
+    
+    def find_nearest_recycling_centers(self, latitude, longitude, k=5, max_radius_km=None,
+                                       waste_type=None):
+        """The k closest recycling centers, however far away"""
+        results = self.center_index.nearest(latitude, longitude, k, max_radius_km, waste_type)
+        return self._center_entries(results)
+    
+    def get_center_clusters(self, min_lat, min_lon, max_lat, max_lon, zoom):
+        """Pre-aggregated recycling center clusters for a map viewport"""
+        level, clusters = self.center_clusters.clusters(min_lat, min_lon, max_lat, max_lon, zoom)
+        return {
+            'zoom': zoom,
+            'grid_level': level,
+            'clusters': clusters
+        }
+    
+    def _center_entries(self, results):
         return [{
-            'id': r[0],
-            'name': r[1],
-            'address': r[2],
-            'latitude': r[3],
-            'longitude': r[4],
-            'accepts': r[5].split(',') if r[5] else [],
-            'hours': r[6],
-            'contact': r[7],
-            'rating': r[8],
-            'distance_km': round(r[9], 2)
+            'id': r['id'],
+            'name': r['name'],
+            'address': r['address'],
+            'latitude': r['latitude'],
+            'longitude': r['longitude'],
+            'accepts': list(r['accepts']),
+            'hours': r['operating_hours'],
+            'contact': r['contact'],
+            'rating': r['rating'],
+            'distance_km': round(r['distance_km'], 2)
         } for r in results]
     
     def get_impact_statistics(self):
         """Get global community impact statistics"""
-        conn = sqlite3.connect('ecolife_users.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_users,
-                SUM(total_scans) as total_scans,
-                SUM(co2_saved) as total_co2_saved,
-                AVG(recycling_score) as avg_score
-            FROM users
-        ''')
-        
-        stats = cursor.fetchone()
-        
-        cursor.execute('''
-            SELECT waste_type, COUNT(*) as count
-            FROM scan_history
-            GROUP BY waste_type
-            ORDER BY count DESC
-        ''')
-        
-        waste_breakdown = cursor.fetchall()
-        conn.close()
+        stats = self.storage.users.totals()
+        waste_breakdown = self.storage.scans.global_breakdown()
         
         return {
-            'total_users': stats[0],
-            'total_scans': stats[1] or 0,
-            'co2_saved_kg': round(stats[2] or 0, 2),
-            'avg_recycling_score': round(stats[3] or 0, 2),
+            'total_users': stats['total_users'],
+            'total_scans': stats['total_scans'],
+            'co2_saved_kg': round(stats['co2_saved'], 2),
+            'avg_recycling_score': round(stats['avg_score'], 2),
             'waste_breakdown': [{'type': w[0], 'count': w[1]} for w in waste_breakdown]
         }
 
@@ -0,0 +1,155 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# One manager per database file, shared by every component in the process
+_connection_managers = {}
+_connection_managers_lock = threading.Lock()
+
+def get_connection_manager(db_path):
+    """Get or create the ConnectionManager for a database file"""
+    key = os.path.abspath(db_path)
+    with _connection_managers_lock:
+        manager = _connection_managers.get(key)
+        if manager is None:
+            manager = ConnectionManager(db_path)
+            _connection_managers[key] = manager
+        return manager
+
+class ConnectionManager:
+    """
+    Pool of reusable SQLite connections, leased to threads.
+    Every connection runs in WAL mode, so readers never wait for a writer,
+    with tuned pragmas and a per-connection prepared-statement cache.
+    A thread keeps its connection for its lifetime. When it exits (e.g.
+    the per-request threads of app.run(threaded=True)), the connection
+    goes back to an idle pool of at most pool_size, pragmas and statement
+    cache intact, and the next new thread takes it instead of opening one.
+    """
+
+    def __init__(self, db_path, synchronous='NORMAL', cache_size_kb=16384,
+                 mmap_size=256 * 1024 * 1024, busy_timeout_ms=5000, cached_statements=256,
+                 pool_size=16):
+        self.db_path = db_path
+        self.synchronous = synchronous
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self.pool_size = pool_size
+
+        self._local = threading.local()
+        self._connections = {}
+        self._idle = []
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.connections_reused = 0
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def connection(self):
+        """This thread's connection, taken from the idle pool or opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+
+        with self._lock:
+            self._reclaim_dead_threads()
+            conn = self._idle.pop() if self._idle else None
+            if conn is not None:
+                self.connections_reused += 1
+        if conn is None:
+            conn = self._open()
+            with self._lock:
+                self.connections_opened += 1
+
+        self._local.conn = conn
+        thread = threading.current_thread()
+        with self._lock:
+            self._connections[thread.ident] = (thread, conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Yield a cursor; commit on success, roll back on error"""
+        conn = self.connection()
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _reclaim_dead_threads(self):
+        """Return connections of exited threads to the idle pool, closing any surplus (lock held)"""
+        for ident, (thread, conn) in list(self._connections.items()):
+            if thread.is_alive():
+                continue
+            del self._connections[ident]
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                if len(self._idle) < self.pool_size:
+                    self._idle.append(conn)
+                else:
+                    conn.close()
+            except sqlite3.Error:
+                pass
+
+    def close_thread_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            self._connections.pop(threading.get_ident(), None)
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            for conn in [conn for _, conn in self._connections.values()] + self._idle:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+            self._idle.clear()
+        self._local = threading.local()
+
+    def health_check(self):
+        """Round-trip a query on this thread's connection"""
+        try:
+            conn = self.connection()
+            conn.execute('SELECT 1').fetchone()
+            journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+            with self._lock:
+                self._reclaim_dead_threads()
+                open_connections = len(self._connections)
+                idle_connections = len(self._idle)
+            return {
+                'status': 'ok',
+                'journal_mode': journal_mode,
+                'open_connections': open_connections,
+                'idle_connections': idle_connections,
+                'connections_opened': self.connections_opened,
+                'connections_reused': self.connections_reused
+            }
+        except sqlite3.Error as e:
+            return {'status': 'error', 'error': str(e)}
@@ -75,16 +75,19 @@ class ImpactCalculator:
     def calculate_cumulative_impact(self, scan_history):
         """
         Calculate cumulative environmental impact
-        scan_history: list of dicts with 'waste_type' and 'confidence'
+        scan_history: list of dicts with 'waste_type' and 'confidence'; an
+        aggregated entry may add 'count', with 'confidence' as the sum
         """
         total_co2 = 0
         total_water = 0
         total_energy = 0
+        total_items = 0
         waste_counts = {}
         
         for scan in scan_history:
             waste_type = scan.get('waste_type')
-            confidence = scan.get('confidence', 1.0)
+            count = scan.get('count', 1)
+            confidence = scan.get('confidence', float(count))
             
             impact = self.calculate_single_item_impact(waste_type, confidence)
             
@@ -92,7 +95,8 @@ class ImpactCalculator:
             total_water += impact.get('water_saved_liters', 0)
             total_energy += impact.get('energy_saved_kwh', 0)
             
-            waste_counts[waste_type] = waste_counts.get(waste_type, 0) + 1
+            waste_counts[waste_type] = waste_counts.get(waste_type, 0) + count
+            total_items += count
         
         
         equivalents = self.calculate_equivalents(total_co2, total_energy)
@@ -101,7 +105,7 @@ class ImpactCalculator:
             'total_co2_saved_kg': round(total_co2, 2),
             'total_water_saved_liters': round(total_water, 2),
             'total_energy_saved_kwh': round(total_energy, 2),
-            'total_items_recycled': len(scan_history),
+            'total_items_recycled': total_items,
             'waste_breakdown': waste_counts,
             'equivalents': equivalents,
             'environmental_rank': self.get_environmental_rank(total_co2)
@@ -0,0 +1,178 @@
+import threading
+from bisect import bisect_left, insort
+
+class _Fenwick:
+    """Prefix sums over block lengths: rank -> block and block -> rank in O(log blocks)"""
+
+    def __init__(self, sizes):
+        self.n = len(sizes)
+        self.tree = [0] * (self.n + 1)
+        for i, size in enumerate(sizes, 1):
+            self.tree[i] += size
+            parent = i + (i & -i)
+            if parent <= self.n:
+                self.tree[parent] += self.tree[i]
+
+    def add(self, index, delta):
+        index += 1
+        while index <= self.n:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index):
+        """Sum of sizes of blocks [0, index)"""
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, position):
+        """(block, offset) holding the 0-based position"""
+        index = 0
+        step = 1 << self.n.bit_length()
+        while step:
+            nxt = index + step
+            if nxt <= self.n and self.tree[nxt] <= position:
+                index = nxt
+                position -= self.tree[nxt]
+            step >>= 1
+        return index, position
+
+class LeaderboardIndex:
+    """
+    Order-statistic index of users by recycling_score.
+    Keys are (-score, user_id) kept in sorted blocks of at most block_size,
+    with a Fenwick tree over the block lengths, so updates, rank-of-user
+    and position lookups are O(log n) plus a short list shift. Rows carry
+    the fields the leaderboard shows, keyed by user_id.
+    """
+
+    def __init__(self, block_size=512):
+        self.block_size = block_size
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._blocks = []
+        self._maxes = []
+        self._fenwick = _Fenwick([])
+        self._keys = {}
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def load(self, rows):
+        """Replace the contents with rows of user_id/username/total_scans/recycling_score/co2_saved"""
+        with self._lock:
+            self._clear()
+            for row in rows:
+                self._keys[row['user_id']] = (-row['recycling_score'], row['user_id'])
+                self._rows[row['user_id']] = row
+            keys = sorted(self._keys.values())
+            half = self.block_size // 2 or 1
+            self._blocks = [keys[i:i + half] for i in range(0, len(keys), half)]
+            self._rebuild()
+
+    def _rebuild(self):
+        self._maxes = [block[-1] for block in self._blocks]
+        self._fenwick = _Fenwick([len(block) for block in self._blocks])
+
+    def update(self, row):
+        """Insert or move one user; rows without scans drop out of the board"""
+        user_id = row['user_id']
+        with self._lock:
+            old_key = self._keys.pop(user_id, None)
+            if old_key is not None:
+                self._remove(old_key)
+                self._rows.pop(user_id, None)
+            if row.get('total_scans', 1) <= 0:
+                return
+            key = (-row['recycling_score'], user_id)
+            self._keys[user_id] = key
+            self._rows[user_id] = row
+            self._insert(key)
+
+    def _insert(self, key):
+        if not self._blocks:
+            self._blocks.append([key])
+            self._rebuild()
+            return
+        block_index = bisect_left(self._maxes, key)
+        if block_index == len(self._blocks):
+            block_index -= 1
+        block = self._blocks[block_index]
+        insort(block, key)
+        self._maxes[block_index] = block[-1]
+        if len(block) > self.block_size:
+            half = len(block) // 2
+            self._blocks[block_index:block_index + 1] = [block[:half], block[half:]]
+            self._rebuild()
+        else:
+            self._fenwick.add(block_index, 1)
+
+    def _remove(self, key):
+        block_index = bisect_left(self._maxes, key)
+        block = self._blocks[block_index]
+        del block[bisect_left(block, key)]
+        if block:
+            self._maxes[block_index] = block[-1]
+            self._fenwick.add(block_index, -1)
+        else:
+            del self._blocks[block_index]
+            self._rebuild()
+
+    def _position(self, key):
+        block_index = bisect_left(self._maxes, key)
+        return self._fenwick.prefix(block_index) + bisect_left(self._blocks[block_index], key)
+
+    def _entries(self, start, stop):
+        """Rows with their 1-based rank for positions [start, stop)"""
+        stop = min(stop, len(self._keys))
+        if start >= stop:
+            return []
+        block_index, offset = self._fenwick.find(start)
+        entries = []
+        position = start
+        while position < stop:
+            block = self._blocks[block_index]
+            for key in block[offset:offset + stop - position]:
+                entries.append(dict(self._rows[key[1]], rank=position + 1))
+                position += 1
+            block_index += 1
+            offset = 0
+        return entries
+
+    def top(self, limit, offset=0):
+        with self._lock:
+            return self._entries(offset, offset + limit)
+
+    def rank(self, user_id):
+        """1-based rank, or None if the user is not on the board"""
+        with self._lock:
+            key = self._keys.get(user_id)
+            if key is None:
+                return None
+            return self._position(key) + 1
+
+    def around(self, user_id, radius=5):
+        """The user's entry with up to radius neighbours above and below"""
+        with self._lock:
+            key = self._keys.get(user_id)
+            if key is None:
+                return None
+            position = self._position(key)
+            return {
+                'rank': position + 1,
+                'total': len(self._keys),
+                'entries': self._entries(max(0, position - radius), position + radius + 1)
+            }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._keys),
+                'blocks': len(self._blocks),
+                'block_size': self.block_size
+            }
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+class LocalLeaderboards:
+    """
+    Per-location top-K leaderboards.
+    Each resident partition holds the best k users of one location key,
+    loaded from users.top_by_location() on first use and kept current from
+    committed scans. Scores only grow, so a user outside the top k can only
+    enter it through an update; a user moving away is the one case that
+    leaves a gap, and that partition is reloaded on its next read. At most
+    max_locations partitions stay resident, least recently read first out.
+    """
+
+    def __init__(self, users, k=100, max_locations=500, activity_ttl=60):
+        self.users = users
+        self.k = k
+        self.max_locations = max_locations
+        self.activity_ttl = activity_ttl
+        self._lock = threading.Lock()
+        self._partitions = OrderedDict()
+        self._member_of = {}
+        self._activity = []
+        self._activity_limit = 0
+        self._activity_expires = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def _sort_key(self, row):
+        return (-row['recycling_score'], row['user_id'])
+
+    def _partition(self, key):
+        """Resident partition for key (lock held), loading it if cold or stale"""
+        partition = self._partitions.get(key)
+        if partition is not None and not partition['stale']:
+            self._partitions.move_to_end(key)
+            return partition
+
+        rows = self.users.top_by_location(key, self.k)
+        if partition is not None:
+            for row in partition['rows']:
+                self._member_of.pop(row['user_id'], None)
+        partition = {'rows': rows, 'stale': False}
+        for row in rows:
+            self._member_of[row['user_id']] = key
+        self._partitions[key] = partition
+        self._partitions.move_to_end(key)
+        self.loads += 1
+
+        while len(self._partitions) > self.max_locations:
+            _, evicted = self._partitions.popitem(last=False)
+            for row in evicted['rows']:
+                self._member_of.pop(row['user_id'], None)
+            self.evictions += 1
+        return partition
+
+    def update(self, row):
+        """Apply one user's current row (user_id, location_key, score fields)"""
+        user_id = row['user_id']
+        key = row.get('location_key')
+        with self._lock:
+            old_key = self._member_of.get(user_id)
+            if old_key is not None and old_key != key:
+                # Moved away: the old partition's (k+1)th user is unknown
+                old = self._partitions.get(old_key)
+                if old is not None:
+                    old['rows'] = [r for r in old['rows'] if r['user_id'] != user_id]
+                    old['stale'] = True
+                del self._member_of[user_id]
+
+            partition = self._partitions.get(key) if key else None
+            if partition is None or partition['stale'] or row['total_scans'] <= 0:
+                return
+
+            rows = [r for r in partition['rows'] if r['user_id'] != user_id]
+            if len(rows) < self.k or self._sort_key(row) < self._sort_key(rows[-1]):
+                rows.append(row)
+                rows.sort(key=self._sort_key)
+                for dropped in rows[self.k:]:
+                    self._member_of.pop(dropped['user_id'], None)
+                rows = rows[:self.k]
+                self._member_of[user_id] = key
+            else:
+                self._member_of.pop(user_id, None)
+            partition['rows'] = rows
+
+    def top(self, key, limit):
+        """Up to limit rows for a location key, best first"""
+        if limit > self.k:
+            return self.users.top_by_location(key, limit)
+        with self._lock:
+            return list(self._partition(key)['rows'][:limit])
+
+    def active_locations(self, limit=20):
+        """Locations with the most scans, cached for activity_ttl seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._activity_expires or limit > self._activity_limit:
+                self._activity_limit = max(limit, 50)
+                self._activity = self.users.location_activity(self._activity_limit)
+                self._activity_expires = now + self.activity_ttl
+            return self._activity[:limit]
+
+    def invalidate(self):
+        """Reload every partition and the activity list on their next read"""
+        with self._lock:
+            for partition in self._partitions.values():
+                partition['stale'] = True
+            self._activity_expires = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'k': self.k,
+                'resident_locations': len(self._partitions),
+                'max_locations': self.max_locations,
+                'loads': self.loads,
+                'evictions': self.evictions
+            }
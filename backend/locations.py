@@ -0,0 +1,46 @@
+"""
+Canonical location keys for location-partitioned leaderboards.
+
+Free-text locations are lowercased, stripped of punctuation and trailing
+country/state parts, then mapped through LOCATION_ALIASES, so "NYC",
+"New York, NY" and "new york city" all become "new york".
+"""
+import re
+
+LOCATION_ALIASES = {
+    'nyc': 'new york',
+    'ny': 'new york',
+    'new york city': 'new york',
+    'manhattan': 'new york',
+    'brooklyn': 'new york',
+    'la': 'los angeles',
+    'l a': 'los angeles',
+    'sf': 'san francisco',
+    'san fran': 'san francisco',
+    'dc': 'washington',
+    'washington dc': 'washington',
+    'chi': 'chicago',
+    'philly': 'philadelphia',
+    'vegas': 'las vegas',
+    'nola': 'new orleans',
+    'bombay': 'mumbai',
+    'bengaluru': 'bangalore',
+    'calcutta': 'kolkata',
+    'madras': 'chennai',
+    'new delhi': 'delhi',
+    'ldn': 'london',
+    'greater london': 'london',
+}
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+def normalize_location(location):
+    """Canonical partition key for a free-text location, or None if empty"""
+    if not location:
+        return None
+    # "Austin, TX, USA" -> "Austin": the city part carries the partition
+    city = location.split(',')[0]
+    key = _NON_ALNUM.sub(' ', city.lower()).strip()
+    if not key:
+        return None
+    return LOCATION_ALIASES.get(key, key)
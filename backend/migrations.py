@@ -0,0 +1,464 @@
+"""
+Versioned schema migrations.
+
+Each database keeps a schema_version table; pending migrations are
+applied in order at startup, each in its own IMMEDIATE transaction so
+concurrent workers cannot apply the same version twice. A migration can
+ship plan checks: queries whose EXPLAIN QUERY PLAN is captured before
+and after the migration and must use the expected index afterwards.
+
+    python migrations.py              # migrate both databases and print plan checks
+"""
+import sqlite3
+from collections import namedtuple
+from locations import normalize_location
+from center_materials import accepts_mask
+from repositories import center_dedupe_key
+
+PlanCheck = namedtuple('PlanCheck', ['query', 'params', 'expected_index'])
+
+class Migration:
+    def __init__(self, version, description, statements=(), plan_checks=(), apply=None):
+        self.version = version
+        self.description = description
+        self.statements = list(statements)
+        self.plan_checks = list(plan_checks)
+        # Optional callable(cursor) for changes that are not plain SQL
+        self.apply = apply
+
+def backfill_location_keys(cursor):
+    """Fill users.location_key from the free-text location"""
+    rows = cursor.execute('SELECT id, location FROM users WHERE location IS NOT NULL').fetchall()
+    cursor.executemany(
+        'UPDATE users SET location_key = ? WHERE id = ?',
+        [(normalize_location(location), user_id) for user_id, location in rows]
+    )
+
+def backfill_accepts_masks(cursor):
+    """Fill recycling_centers.accepts_mask from the free-text accepts_types"""
+    rows = cursor.execute('SELECT id, accepts_types FROM recycling_centers').fetchall()
+    cursor.executemany(
+        'UPDATE recycling_centers SET accepts_mask = ? WHERE id = ?',
+        [(accepts_mask(accepts_types), center_id) for center_id, accepts_types in rows]
+    )
+
+def backfill_center_dedupe_keys(cursor):
+    """Key existing centers; later duplicates of a key are left unkeyed"""
+    rows = cursor.execute(
+        'SELECT id, name, latitude, longitude FROM recycling_centers ORDER BY id'
+    ).fetchall()
+    seen = set()
+    updates = []
+    for center_id, name, latitude, longitude in rows:
+        if name is None or latitude is None or longitude is None:
+            continue
+        key = center_dedupe_key(name, latitude, longitude)
+        if key not in seen:
+            seen.add(key)
+            updates.append((key, center_id))
+    cursor.executemany('UPDATE recycling_centers SET dedupe_key = ? WHERE id = ?', updates)
+    cursor.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_recycling_centers_dedupe_key
+                      ON recycling_centers (dedupe_key)''')
+
+USERS_MIGRATIONS = [
+    Migration(
+        1, 'Index scan_history by user for profile breakdown and impact',
+        [
+            '''CREATE INDEX IF NOT EXISTS idx_scan_history_user_type
+               ON scan_history (user_id, waste_type, confidence)''',
+        ],
+        [
+            PlanCheck('''SELECT COUNT(*) as total, waste_type FROM scan_history
+                         WHERE user_id = ? GROUP BY waste_type''',
+                      (1,), 'idx_scan_history_user_type'),
+            PlanCheck('SELECT waste_type, confidence FROM scan_history WHERE user_id = ?',
+                      (1,), 'idx_scan_history_user_type'),
+        ]
+    ),
+    Migration(
+        2, 'Index users by recycling_score for leaderboards',
+        [
+            '''CREATE INDEX IF NOT EXISTS idx_users_recycling_score
+               ON users (recycling_score DESC)''',
+            '''CREATE INDEX IF NOT EXISTS idx_users_location_score
+               ON users (location, recycling_score DESC)''',
+        ],
+        [
+            PlanCheck('''SELECT username FROM users WHERE total_scans > 0
+                         ORDER BY recycling_score DESC LIMIT ?''',
+                      (50,), 'idx_users_recycling_score'),
+            PlanCheck('''SELECT username FROM users WHERE location = ? AND total_scans > 0
+                         ORDER BY recycling_score DESC LIMIT ?''',
+                      ('NYC', 20), 'idx_users_location_score'),
+        ]
+    ),
+    Migration(
+        3, 'Index achievements by user and earned_at',
+        [
+            '''CREATE INDEX IF NOT EXISTS idx_achievements_user_earned
+               ON achievements (user_id, earned_at DESC)''',
+        ],
+        [
+            PlanCheck('''SELECT achievement_type, earned_at FROM achievements
+                         WHERE user_id = ? ORDER BY earned_at DESC''',
+                      (1,), 'idx_achievements_user_earned'),
+        ]
+    ),
+    Migration(
+        4, 'Denormalized per-user waste-type counters',
+        [
+            '''CREATE TABLE IF NOT EXISTS user_waste_counts (
+                   user_id INTEGER NOT NULL,
+                   waste_type TEXT NOT NULL,
+                   scan_count INTEGER NOT NULL DEFAULT 0,
+                   PRIMARY KEY (user_id, waste_type)
+               ) WITHOUT ROWID''',
+            # Backfill from existing history
+            '''INSERT OR REPLACE INTO user_waste_counts (user_id, waste_type, scan_count)
+               SELECT user_id, waste_type, COUNT(*) FROM scan_history
+               WHERE user_id IS NOT NULL AND waste_type IS NOT NULL
+               GROUP BY user_id, waste_type''',
+        ],
+        [
+            PlanCheck('''SELECT waste_type, scan_count FROM user_waste_counts
+                         WHERE user_id = ?''',
+                      (1,), 'PRIMARY KEY'),
+        ]
+    ),
+    Migration(
+        5, 'Daily scan rollups for retention',
+        [
+            '''CREATE TABLE IF NOT EXISTS scan_rollups (
+                   user_id INTEGER NOT NULL,
+                   day TEXT NOT NULL,
+                   waste_type TEXT NOT NULL,
+                   scan_count INTEGER NOT NULL DEFAULT 0,
+                   confidence_sum REAL NOT NULL DEFAULT 0.0,
+                   PRIMARY KEY (user_id, day, waste_type)
+               ) WITHOUT ROWID''',
+            # The retention sweep walks scan_history from its oldest row
+            '''CREATE INDEX IF NOT EXISTS idx_scan_history_timestamp
+               ON scan_history (timestamp)''',
+        ],
+        [
+            PlanCheck('SELECT MIN(timestamp) FROM scan_history',
+                      (), 'idx_scan_history_timestamp'),
+            PlanCheck('DELETE FROM scan_history WHERE timestamp >= ? AND timestamp < ?',
+                      ('2025-01-01 00:00:00', '2025-01-02 00:00:00'), 'idx_scan_history_timestamp'),
+        ]
+    ),
+    Migration(
+        6, 'Daily per-user score buckets for windowed leaderboards',
+        [
+            '''CREATE TABLE IF NOT EXISTS user_daily_scores (
+                   user_id INTEGER NOT NULL,
+                   day TEXT NOT NULL,
+                   score INTEGER NOT NULL DEFAULT 0,
+                   scan_count INTEGER NOT NULL DEFAULT 0,
+                   PRIMARY KEY (user_id, day)
+               ) WITHOUT ROWID''',
+            '''CREATE INDEX IF NOT EXISTS idx_user_daily_scores_day
+               ON user_daily_scores (day)''',
+            # Backfill the longest window from raw history (score = int(confidence * 10))
+            '''INSERT OR REPLACE INTO user_daily_scores (user_id, day, score, scan_count)
+               SELECT user_id, date(timestamp), SUM(CAST(confidence * 10 AS INTEGER)), COUNT(*)
+               FROM scan_history
+               WHERE user_id IS NOT NULL AND timestamp >= date('now', '-31 days')
+               GROUP BY user_id, date(timestamp)''',
+        ],
+        [
+            PlanCheck('SELECT user_id, day, score, scan_count FROM user_daily_scores WHERE day >= ?',
+                      ('2025-01-01',), 'idx_user_daily_scores_day'),
+        ]
+    ),
+    Migration(
+        7, 'Canonical location keys for local leaderboards',
+        [
+            'ALTER TABLE users ADD COLUMN location_key TEXT',
+            '''CREATE INDEX IF NOT EXISTS idx_users_location_key_score
+               ON users (location_key, recycling_score DESC)''',
+        ],
+        [
+            PlanCheck('''SELECT id FROM users WHERE location_key = ? AND total_scans > 0
+                         ORDER BY recycling_score DESC, id LIMIT ?''',
+                      ('new york', 100), 'idx_users_location_key_score'),
+        ],
+        apply=backfill_location_keys
+    ),
+    Migration(
+        8, 'Version counter for leaderboard data, bumped by triggers',
+        [
+            '''CREATE TABLE IF NOT EXISTS leaderboard_version (
+                   id INTEGER PRIMARY KEY CHECK (id = 1),
+                   version INTEGER NOT NULL
+               )''',
+            'INSERT OR IGNORE INTO leaderboard_version (id, version) VALUES (1, 0)',
+        ] + [
+            f'''CREATE TRIGGER IF NOT EXISTS trg_leaderboard_{table}_{event.split()[0].lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE leaderboard_version SET version = version + 1 WHERE id = 1;
+                END'''
+            for table, event in (
+                ('users', 'INSERT'),
+                ('users', 'UPDATE OF username, total_scans, recycling_score, co2_saved, location_key'),
+                ('users', 'DELETE'),
+                ('user_daily_scores', 'INSERT'),
+                ('user_daily_scores', 'UPDATE'),
+                ('user_daily_scores', 'DELETE'),
+            )
+        ]
+    ),
+]
+
+COMMUNITY_MIGRATIONS = [
+    Migration(
+        1, 'Unique challenge participation per user',
+        [
+            # Keep the earliest row of any duplicate joins before enforcing uniqueness
+            '''DELETE FROM challenge_participants WHERE id NOT IN (
+                   SELECT MIN(id) FROM challenge_participants GROUP BY challenge_id, user_id
+               )''',
+            '''CREATE UNIQUE INDEX IF NOT EXISTS idx_challenge_participants_unique
+               ON challenge_participants (challenge_id, user_id)''',
+        ],
+        [
+            PlanCheck('SELECT COUNT(*) FROM challenge_participants WHERE challenge_id = ?',
+                      (1,), 'idx_challenge_participants_unique'),
+        ]
+    ),
+    Migration(
+        2, 'Index challenges by end_date for the active listing',
+        [
+            'CREATE INDEX IF NOT EXISTS idx_challenges_end_date ON challenges (end_date)',
+        ],
+        [
+            PlanCheck("SELECT id FROM challenges WHERE end_date > datetime('now')",
+                      (), 'idx_challenges_end_date'),
+        ]
+    ),
+    Migration(
+        3, 'Version counter for recycling_centers, bumped by triggers',
+        [
+            '''CREATE TABLE IF NOT EXISTS recycling_centers_version (
+                   id INTEGER PRIMARY KEY CHECK (id = 1),
+                   version INTEGER NOT NULL
+               )''',
+            'INSERT OR IGNORE INTO recycling_centers_version (id, version) VALUES (1, 0)',
+        ] + [
+            f'''CREATE TRIGGER IF NOT EXISTS trg_recycling_centers_{event.lower()}
+                AFTER {event} ON recycling_centers
+                BEGIN
+                    UPDATE recycling_centers_version SET version = version + 1 WHERE id = 1;
+                END'''
+            for event in ('INSERT', 'UPDATE', 'DELETE')
+        ]
+    ),
+    Migration(
+        4, 'Accepted materials as a bitmask over the waste categories',
+        [
+            'ALTER TABLE recycling_centers ADD COLUMN accepts_mask INTEGER NOT NULL DEFAULT 0',
+        ],
+        apply=backfill_accepts_masks
+    ),
+    Migration(
+        5, 'Dedupe key for center imports; version triggers can be paused for bulk loads',
+        [
+            'ALTER TABLE recycling_centers ADD COLUMN dedupe_key TEXT',
+            'ALTER TABLE recycling_centers_version ADD COLUMN paused INTEGER NOT NULL DEFAULT 0',
+        ] + [
+            statement
+            for event in ('INSERT', 'UPDATE', 'DELETE')
+            for statement in (
+                f'DROP TRIGGER IF EXISTS trg_recycling_centers_{event.lower()}',
+                f'''CREATE TRIGGER trg_recycling_centers_{event.lower()}
+                    AFTER {event} ON recycling_centers
+                    WHEN (SELECT paused FROM recycling_centers_version WHERE id = 1) = 0
+                    BEGIN
+                        UPDATE recycling_centers_version SET version = version + 1 WHERE id = 1;
+                    END'''
+            )
+        ],
+        [
+            PlanCheck('SELECT id FROM recycling_centers WHERE dedupe_key = ?',
+                      ('x',), 'idx_recycling_centers_dedupe_key'),
+        ],
+        apply=backfill_center_dedupe_keys
+    ),
+    Migration(
+        6, 'Change log of recycling center ids for incremental map clustering',
+        [
+            '''CREATE TABLE IF NOT EXISTS recycling_center_changes (
+                   seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                   center_id INTEGER NOT NULL
+               )''',
+        ] + [
+            f'''CREATE TRIGGER IF NOT EXISTS trg_recycling_center_changes_{event.lower()}
+                AFTER {event} ON recycling_centers
+                BEGIN
+                    INSERT INTO recycling_center_changes (center_id) VALUES ({row}.id);
+                END'''
+            for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD'))
+        ]
+    ),
+    Migration(
+        7, 'Participant count kept on challenges by join',
+        [
+            'ALTER TABLE challenges ADD COLUMN participant_count INTEGER NOT NULL DEFAULT 0',
+            '''UPDATE challenges SET participant_count = (
+                   SELECT COUNT(*) FROM challenge_participants WHERE challenge_id = challenges.id
+               )''',
+        ]
+    ),
+    Migration(
+        8, 'Version triggers always fire; a pause flag left set by a killed import froze them',
+        [
+            'UPDATE recycling_centers_version SET paused = 0 WHERE id = 1',
+        ] + [
+            statement
+            for event in ('INSERT', 'UPDATE', 'DELETE')
+            for statement in (
+                f'DROP TRIGGER IF EXISTS trg_recycling_centers_{event.lower()}',
+                f'''CREATE TRIGGER trg_recycling_centers_{event.lower()}
+                    AFTER {event} ON recycling_centers
+                    BEGIN
+                        UPDATE recycling_centers_version SET version = version + 1 WHERE id = 1;
+                    END'''
+            )
+        ]
+    ),
+    Migration(
+        9, 'Version counter for eco_tips, bumped by triggers',
+        [
+            '''CREATE TABLE IF NOT EXISTS eco_tips_version (
+                   id INTEGER PRIMARY KEY CHECK (id = 1),
+                   version INTEGER NOT NULL
+               )''',
+            'INSERT OR IGNORE INTO eco_tips_version (id, version) VALUES (1, 0)',
+        ] + [
+            f'''CREATE TRIGGER IF NOT EXISTS trg_eco_tips_{event.lower()}
+                AFTER {event} ON eco_tips
+                BEGIN
+                    UPDATE eco_tips_version SET version = version + 1 WHERE id = 1;
+                END'''
+            for event in ('INSERT', 'UPDATE', 'DELETE')
+        ]
+    ),
+]
+
+def query_plan(cursor, query, params=()):
+    """EXPLAIN QUERY PLAN detail lines for a query"""
+    try:
+        cursor.execute('EXPLAIN QUERY PLAN ' + query, params)
+    except sqlite3.OperationalError as e:
+        # e.g. the table is created by this very migration
+        return [f"not plannable: {e}"]
+    return [row[-1] for row in cursor.fetchall()]
+
+def plan_uses_index(plan, index_name):
+    return any(index_name in detail for detail in plan)
+
+def current_version(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('SELECT MAX(version) FROM schema_version')
+    return cursor.fetchone()[0] or 0
+
+def run_migrations(db, migrations, name='database'):
+    """Apply pending migrations; returns a report per applied migration"""
+    conn = db.connection()
+    cursor = conn.cursor()
+    report = []
+
+    try:
+        for migration in sorted(migrations, key=lambda m: m.version):
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                if migration.version <= current_version(cursor):
+                    conn.commit()
+                    continue
+
+                before = [query_plan(cursor, check.query, check.params)
+                          for check in migration.plan_checks]
+
+                for statement in migration.statements:
+                    cursor.execute(statement)
+                if migration.apply is not None:
+                    migration.apply(cursor)
+
+                cursor.execute('ANALYZE')
+                after = [query_plan(cursor, check.query, check.params)
+                         for check in migration.plan_checks]
+
+                cursor.execute(
+                    'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                    (migration.version, migration.description)
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+            checks = []
+            for check, plan_before, plan_after in zip(migration.plan_checks, before, after):
+                passed = plan_uses_index(plan_after, check.expected_index)
+                checks.append({
+                    'expected_index': check.expected_index,
+                    'before': plan_before,
+                    'after': plan_after,
+                    'passed': passed
+                })
+                if not passed:
+                    print(f"WARNING: {name} migration {migration.version}: query does not use "
+                          f"{check.expected_index}: {plan_after}")
+
+            print(f"Applied {name} migration {migration.version}: {migration.description}")
+            report.append({
+                'version': migration.version,
+                'description': migration.description,
+                'plan_checks': checks
+            })
+    finally:
+        cursor.close()
+
+    return report
+
+def check_plans(db, migrations):
+    """Re-run every applied migration's plan checks against the current schema"""
+    cursor = db.connection().cursor()
+    applied = current_version(cursor)
+    results = []
+    for migration in migrations:
+        if migration.version > applied:
+            continue
+        for check in migration.plan_checks:
+            plan = query_plan(cursor, check.query, check.params)
+            results.append({
+                'version': migration.version,
+                'expected_index': check.expected_index,
+                'plan': plan,
+                'passed': plan_uses_index(plan, check.expected_index)
+            })
+    cursor.close()
+    return results
+
+if __name__ == "__main__":
+    from storage import get_storage
+
+    storage = get_storage('sqlite')
+
+    for name, db, migrations in (('users', storage.users_db, USERS_MIGRATIONS),
+                                 ('community', storage.community_db, COMMUNITY_MIGRATIONS)):
+        cursor = db.connection().cursor()
+        print(f"{name}: schema version {current_version(cursor)}")
+        cursor.close()
+        for result in check_plans(db, migrations):
+            status = 'ok' if result['passed'] else 'MISSING'
+            print(f"  v{result['version']} {result['expected_index']}: {status}")
+            for detail in result['plan']:
+                print(f"      {detail}")
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import OrderedDict
+import easyocr
+
+# Create a SINGLE registry per process so every component shares the same readers
+_ocr_registry = None
+_ocr_registry_lock = threading.Lock()
+
+def get_ocr_registry():
+    """Get or create the process-wide OCRModelRegistry"""
+    global _ocr_registry
+    if _ocr_registry is None:
+        with _ocr_registry_lock:
+            if _ocr_registry is None:
+                _ocr_registry = OCRModelRegistry()
+    return _ocr_registry
+
+class OCRModelRegistry:
+    """
+    Lazily loads EasyOCR readers once per process and shares them.
+    Readers are keyed by language tuple and evicted least-recently-used
+    when the estimated model memory exceeds the budget. The default
+    languages are pinned and never evicted. A failed load is recorded with
+    its error and fails fast until retry_interval has passed, then the
+    next caller retries it.
+    """
+
+    def __init__(self, default_languages=('en',), memory_budget_mb=1024,
+                 default_reader_mb=250, gpu=False, retry_interval=30.0):
+        self.default_languages = tuple(default_languages)
+        self.memory_budget_mb = memory_budget_mb
+        self.default_reader_mb = default_reader_mb
+        self.gpu = gpu
+        self.retry_interval = retry_interval
+
+        self._readers = OrderedDict()
+        self._info = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._warmup_thread = None
+
+    def _key(self, languages):
+        if languages is None:
+            return self.default_languages
+        if isinstance(languages, str):
+            return (languages,)
+        return tuple(languages)
+
+    def _cached_reader(self, key):
+        """Loaded reader for key, or raise if its last load failed recently (lock held)"""
+        reader = self._readers.get(key)
+        if reader is not None:
+            self._readers.move_to_end(key)
+            return reader
+        info = self._info.get(key)
+        if (info is not None and info['state'] == 'failed'
+                and time.monotonic() - info['failed_at'] < self.retry_interval):
+            raise RuntimeError(f"OCR reader {list(key)} failed to load: {info['error']}")
+        return None
+
+    def get_reader(self, languages=None):
+        """Return the reader for the given languages, loading it on first use"""
+        key = self._key(languages)
+
+        with self._lock:
+            reader = self._cached_reader(key)
+            if reader is not None:
+                return reader
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given reader; others wait for it
+        with load_lock:
+            try:
+                with self._lock:
+                    reader = self._cached_reader(key)
+                    if reader is not None:
+                        return reader
+                    self._info[key] = {'state': 'loading', 'size_mb': None, 'load_seconds': None}
+
+                start_time = time.monotonic()
+                try:
+                    reader = easyocr.Reader(list(key), gpu=self.gpu)
+                except BaseException as e:
+                    with self._lock:
+                        self._info[key] = {'state': 'failed', 'error': str(e) or type(e).__name__,
+                                           'failed_at': time.monotonic(),
+                                           'size_mb': None, 'load_seconds': None}
+                    print(f"OCR reader {list(key)} failed to load: {e}")
+                    raise
+
+                load_seconds = time.monotonic() - start_time
+                size_mb = self._estimate_size_mb(reader)
+
+                with self._lock:
+                    self._readers[key] = reader
+                    self._info[key] = {
+                        'state': 'loaded',
+                        'size_mb': round(size_mb, 1),
+                        'load_seconds': round(load_seconds, 2)
+                    }
+                    self._evict_over_budget()
+            finally:
+                # Waiters already hold this lock; later callers find the reader or the failure
+                with self._lock:
+                    if self._load_locks.get(key) is load_lock:
+                        del self._load_locks[key]
+
+            print(f"OCR reader {list(key)} loaded in {load_seconds:.1f}s (~{size_mb:.0f} MB)")
+            return reader
+
+    def _estimate_size_mb(self, reader):
+        """Estimate reader memory from its model parameters"""
+        try:
+            total_bytes = 0
+            for model in (reader.detector, reader.recognizer):
+                for param in model.parameters():
+                    total_bytes += param.numel() * param.element_size()
+            return total_bytes / (1024 * 1024)
+        except Exception:
+            return self.default_reader_mb
+
+    def _memory_used_mb(self):
+        return sum(self._info[key]['size_mb'] or 0 for key in self._readers)
+
+    def _evict_over_budget(self):
+        """Drop least-recently-used readers until memory fits the budget (lock held)"""
+        for key in list(self._readers.keys()):
+            if self._memory_used_mb() <= self.memory_budget_mb:
+                break
+            if key == self.default_languages or len(self._readers) <= 1:
+                continue
+            del self._readers[key]
+            self._info[key] = {'state': 'evicted', 'size_mb': None, 'load_seconds': None}
+            print(f"OCR reader {list(key)} evicted to stay within {self.memory_budget_mb} MB")
+
+    def warm_up(self, languages=None, background=True):
+        """Load a reader ahead of the first request, optionally on a background thread"""
+        key = self._key(languages)
+
+        def load():
+            try:
+                self.get_reader(key)
+            except Exception as e:
+                print(f"OCR warm-up failed for {list(key)}: {e}")
+
+        if not background:
+            load()
+            return None
+
+        self._warmup_thread = threading.Thread(target=load, name='ocr-warmup', daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+
+    def is_loaded(self, languages=None):
+        with self._lock:
+            return self._key(languages) in self._readers
+
+    def load_state(self, languages=None):
+        """'loaded', 'loading', 'failed', 'evicted' or 'not_loaded'"""
+        key = self._key(languages)
+        with self._lock:
+            if key in self._readers:
+                return 'loaded'
+            info = self._info.get(key)
+            return info['state'] if info else 'not_loaded'
+
+    def status(self):
+        """Load state of every known reader, for /health"""
+        with self._lock:
+            return {
+                'readers': {
+                    '+'.join(key): {name: value for name, value in info.items() if name != 'failed_at'}
+                    for key, info in self._info.items()
+                },
+                'memory_used_mb': round(self._memory_used_mb(), 1),
+                'memory_budget_mb': self.memory_budget_mb
+            }
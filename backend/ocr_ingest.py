@@ -0,0 +1,200 @@
+"""
+Bulk OCR ingestion.
+
+Streams product label photos from a directory tree or a manifest (one
+path per line) through a process pool, one OCR reader per worker, and
+appends one JSON line per image to the output. Progress is checkpointed
+after every chunk so an interrupted run resumes where it stopped.
+Images that cannot be read or whose OCR fails get an "error" field
+instead of "text", so they can be collected into a manifest and re-run.
+
+    python ocr_ingest.py photos/ --output labels.jsonl --workers 4
+    python ocr_ingest.py --manifest paths.txt --output labels.jsonl --resume
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+_processor = None
+_max_side = None
+_batch_size = None
+
+def _init_worker(languages, max_side, batch_size):
+    """Each worker process owns exactly one OCR reader"""
+    global _processor, _max_side, _batch_size
+    from ocr_processor import OCRProcessor
+    _processor = OCRProcessor(languages)
+    _processor.reader  # load the model before the first chunk arrives
+    _max_side = max_side
+    _batch_size = batch_size
+
+def _load_image(path):
+    import cv2
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    height, width = image.shape[:2]
+    scale = _max_side / max(height, width)
+    if scale < 1.0:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return image
+
+def _ocr_chunk(paths):
+    """OCR one chunk of paths inside a worker; images are released when it returns"""
+    records = [{'path': path} for path in paths]
+    images = []
+    loaded = []
+    for record in records:
+        try:
+            image = _load_image(record['path'])
+        except Exception as e:
+            image = None
+            record['error'] = str(e)
+        if image is None:
+            record.setdefault('error', 'unreadable image')
+            continue
+        images.append(image)
+        loaded.append(record)
+
+    texts = _processor.extract_text_batch(images, batch_size=_batch_size)
+    for record, text in zip(loaded, texts):
+        if text is None:
+            record['error'] = 'OCR failed'
+            continue
+        analysis = _processor.analyze_product_impact(text)
+        record['text'] = text
+        record['found_keywords'] = analysis['found_keywords']
+        record['sustainability_score'] = analysis['sustainability_score']
+    return records
+
+def iter_directory(root):
+    """Image paths under root in a stable order, one directory listing at a time"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(dirpath, filename)
+
+def iter_manifest(manifest_path):
+    with open(manifest_path, 'r', encoding='utf-8') as manifest:
+        for line in manifest:
+            path = line.strip()
+            if path and not path.startswith('#'):
+                yield path
+
+def iter_chunks(paths, chunk_size, skip=0):
+    chunk = []
+    for index, path in enumerate(paths):
+        if index < skip:
+            continue
+        chunk.append(path)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def load_checkpoint(checkpoint_path):
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as checkpoint:
+            return json.load(checkpoint)
+    except (OSError, ValueError):
+        return {'processed': 0, 'output_offset': 0}
+
+def save_checkpoint(checkpoint_path, processed, output_offset):
+    """Atomically record how many inputs are done and where the output ends"""
+    temp_path = checkpoint_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as checkpoint:
+        json.dump({'processed': processed, 'output_offset': output_offset}, checkpoint)
+    os.replace(temp_path, checkpoint_path)
+
+def run_ingestion(paths, output_path, workers=2, chunk_size=16, batch_size=16,
+                  languages=('en',), max_side=1600, resume=False, report_every=10.0):
+    """Run OCR over paths, writing JSONL to output_path; returns (images, seconds)"""
+    checkpoint_path = output_path + '.checkpoint'
+    state = load_checkpoint(checkpoint_path) if resume else {'processed': 0, 'output_offset': 0}
+    processed = state['processed']
+
+    # Drop any lines written after the last checkpoint so nothing is duplicated
+    output = open(output_path, 'a+b')
+    output.truncate(state['output_offset'])
+    output.seek(state['output_offset'])
+
+    if processed:
+        print(f"Resuming after {processed} images")
+
+    start_time = time.monotonic()
+    last_report = start_time
+    done_this_run = 0
+    in_flight = deque()
+    max_in_flight = workers * 2
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(tuple(languages), max_side, batch_size)) as pool:
+
+        def drain_one():
+            nonlocal processed, done_this_run, last_report
+            records = in_flight.popleft().result()
+            for record in records:
+                output.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+            output.flush()
+            processed += len(records)
+            done_this_run += len(records)
+            save_checkpoint(checkpoint_path, processed, output.tell())
+
+            now = time.monotonic()
+            if now - last_report >= report_every:
+                rate = done_this_run / (now - start_time)
+                print(f"{processed} images done ({rate:.1f} images/sec)")
+                last_report = now
+
+        # Bounded window of submitted chunks keeps memory flat for any corpus size
+        for chunk in iter_chunks(paths, chunk_size, skip=processed):
+            in_flight.append(pool.submit(_ocr_chunk, chunk))
+            if len(in_flight) >= max_in_flight:
+                drain_one()
+        while in_flight:
+            drain_one()
+
+    output.close()
+    elapsed = time.monotonic() - start_time
+    return done_this_run, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk OCR ingestion for product label photos')
+    parser.add_argument('directory', nargs='?', help='Directory of images to walk')
+    parser.add_argument('--manifest', help='File with one image path per line')
+    parser.add_argument('--output', required=True, help='JSONL output file')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--chunk-size', type=int, default=16)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--languages', default='en')
+    parser.add_argument('--max-side', type=int, default=1600)
+    parser.add_argument('--resume', action='store_true', help='Continue from the last checkpoint')
+    args = parser.parse_args()
+
+    if bool(args.directory) == bool(args.manifest):
+        parser.error('give either a directory or --manifest')
+
+    paths = iter_manifest(args.manifest) if args.manifest else iter_directory(args.directory)
+
+    images, elapsed = run_ingestion(
+        paths, args.output,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        languages=args.languages.split(','),
+        max_side=args.max_side,
+        resume=args.resume
+    )
+
+    rate = images / elapsed if elapsed else 0
+    print(f"OCR ingestion complete: {images} images in {elapsed:.1f}s ({rate:.1f} images/sec)")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
-import easyocr
 import re
+import numpy as np
+from model_registry import get_ocr_registry
 
 class OCRProcessor:
-    def __init__(self):
-        self.reader = easyocr.Reader(['en'])
+    def __init__(self, languages=('en',)):
+        # Readers are shared per process and loaded on first use
+        self.ocr_registry = get_ocr_registry()
+        self.languages = tuple(languages)
+    
+    @property
+    def reader(self):
+        return self.ocr_registry.get_reader(self.languages)
         
     def extract_text(self, image_path):
         """Extract text from image using OCR"""
@@ -15,6 +22,46 @@ class OCRProcessor:
             print(f"OCR Error: {e}")
             return ""
     
+    @staticmethod
+    def _pad_to(image, height, width):
+        """Pad an image with black on the bottom/right; text positions are unchanged"""
+        padding = [(0, height - image.shape[0]), (0, width - image.shape[1])]
+        padding += [(0, 0)] * (image.ndim - 2)
+        return np.pad(image, padding)
+    
+    def extract_text_batch(self, images, batch_size=16):
+        """
+        Extract text from several images (numpy arrays) at once.
+        readtext_batched needs equal shapes, so images are grouped by
+        orientation and channel count and padded to the largest size in
+        their group, letting photos of mixed sizes share one batch. Returns
+        one string per image, or None for images whose OCR raised (so they
+        differ from blank labels).
+        """
+        texts = [None] * len(images)
+        groups = {}
+        for index, image in enumerate(images):
+            portrait = image.shape[0] > image.shape[1]
+            groups.setdefault((portrait, image.shape[2:]), []).append(index)
+        
+        for indices in groups.values():
+            try:
+                if len(indices) == 1:
+                    batch_results = [self.reader.readtext(images[indices[0]], batch_size=batch_size)]
+                else:
+                    height = max(images[index].shape[0] for index in indices)
+                    width = max(images[index].shape[1] for index in indices)
+                    batch_results = self.reader.readtext_batched(
+                        [self._pad_to(images[index], height, width) for index in indices],
+                        batch_size=batch_size
+                    )
+                for index, results in zip(indices, batch_results):
+                    texts[index] = ' '.join([result[1] for result in results])
+            except Exception as e:
+                print(f"OCR Error: {e}")
+        
+        return texts
+    
     def analyze_product_impact(self, text):
         """Simple analysis of product environmental impact"""
         text_lower = text.lower()
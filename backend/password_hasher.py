@@ -0,0 +1,94 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+class HashingQueueFull(Exception):
+    """Raised when the hashing executor has no room; callers should answer 503"""
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool instead of the request thread.
+    At most max_workers hashes run at once and at most max_queue wait; beyond
+    that submissions fail fast with HashingQueueFull so a login burst cannot
+    starve every other endpoint. bcrypt releases the GIL while hashing.
+    """
+
+    COST_PATTERN = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+    def __init__(self, rounds=12, max_workers=2, max_queue=32, timeout=10.0):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingQueueFull('Password hashing queue is full')
+
+        with self._lock:
+            self.in_flight += 1
+
+        def done(_future):
+            self._slots.release()
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(done)
+        return future
+
+    def submit(self, fn, *args):
+        """Run fn on the hashing pool without waiting (raises HashingQueueFull)"""
+        return self._run(fn, *args)
+
+    def hash_password(self, password):
+        """Hash password using bcrypt at the configured cost"""
+        future = self._run(self.hash_blocking, password)
+        return future.result(timeout=self.timeout)
+
+    def verify_password(self, password, password_hash):
+        """Verify password against hash"""
+        future = self._run(self.verify_blocking, password, password_hash)
+        return future.result(timeout=self.timeout)
+
+    def hash_blocking(self, password):
+        """Hash on the calling thread (for code already running on the pool)"""
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify_blocking(self, password, password_hash):
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def hash_cost(self, password_hash):
+        match = self.COST_PATTERN.match(password_hash or '')
+        return int(match.group(1)) if match else None
+
+    def needs_rehash(self, password_hash):
+        """True if the stored hash was made with a different work factor"""
+        return self.hash_cost(password_hash) != self.rounds
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rounds': self.rounds,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,83 @@
+import threading
+import time
+
+class Deadline:
+    """Overall latency budget for one request, shared by every stage"""
+
+    def __init__(self, budget_seconds):
+        self.budget_seconds = budget_seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_seconds
+
+    @classmethod
+    def coerce(cls, deadline, default_seconds):
+        """Accept a Deadline, a number of seconds, or None (use the default)"""
+        if isinstance(deadline, Deadline):
+            return deadline
+        return cls(default_seconds if deadline is None else deadline)
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def allows(self, estimated_seconds):
+        """True if a stage expected to take estimated_seconds still fits"""
+        return self.remaining() >= estimated_seconds
+
+class CircuitBreaker:
+    """
+    Short-circuits calls to an external source after repeated failures.
+    closed -> open after failure_threshold consecutive failures;
+    open -> half_open after reset_timeout, letting one trial call through;
+    a success closes it again, a failure re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    print(f"Circuit breaker {self.name} opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+    def to_dict(self):
+        return {'state': self.state, 'failures': self.failures}
@@ -1,16 +1,70 @@
-import easyocr
 import cv2
 import numpy as np
-from pyzbar import pyzbar
 import requests
 import re
+from easyocr.utils import get_paragraph
+from model_registry import get_ocr_registry
+from barcode_decoders import Rect, create_barcode_decoder
+from pipeline_budget import Deadline, CircuitBreaker
 
 class ProductAnalyzer:
-    def __init__(self):
-        self.reader = easyocr.Reader(['en'])
+    def __init__(self, ocr_mode='regions', ocr_target_text_height=16,
+                 ocr_min_text_fraction=0.02, ocr_batch_size=16,
+                 ocr_text_budget=400, ocr_deadline=2.0,
+                 ocr_detect_seconds=0.4, ocr_batch_seconds=0.2,
+                 ocr_min_confidence=0.3, ocr_paragraph=False, ocr_languages=('en',),
+                 barcode_backends=('pyzbar',), barcode_cascade_mode='first',
+                 analysis_budget=8.0, lookup_timeout=10, min_lookup_seconds=0.5,
+                 min_ocr_seconds=1.0, barcode_variant_seconds=0.15,
+                 breaker_failure_threshold=3, breaker_reset_timeout=30.0):
+        # Readers are shared per process and loaded on first use
+        self.ocr_registry = get_ocr_registry()
+        self.ocr_languages = tuple(ocr_languages)
         self.barcode_api_key = None
         
-    def preprocess_image_for_barcode(self, image):
+        # Decoder backend(s); see bench_barcode_decoders.py for choosing an order
+        self.barcode_decoder = create_barcode_decoder(barcode_backends, barcode_cascade_mode)
+        
+        # OCR options. 'regions' detects text on a downsampled frame and only
+        # recognises the detected boxes; 'full' is the original whole-frame readtext,
+        # a single call that ignores ocr_text_budget and ocr_deadline (unbounded).
+        self.ocr_mode = ocr_mode
+        self.ocr_target_text_height = ocr_target_text_height
+        self.ocr_min_text_fraction = ocr_min_text_fraction
+        self.ocr_batch_size = ocr_batch_size
+        self.ocr_text_budget = ocr_text_budget
+        self.ocr_deadline = ocr_deadline
+        # Expected cost of text detection and of one recognition batch; each
+        # only starts if the OCR deadline still has that much left
+        self.ocr_detect_seconds = ocr_detect_seconds
+        self.ocr_batch_seconds = ocr_batch_seconds
+        self.ocr_min_confidence = ocr_min_confidence
+        self.ocr_paragraph = ocr_paragraph
+        
+        # Latency budget for analyze_product. Stages that no longer fit the
+        # remaining budget are skipped and reported in 'skipped_stages'.
+        self.analysis_budget = analysis_budget
+        self.lookup_timeout = lookup_timeout
+        self.min_lookup_seconds = min_lookup_seconds
+        self.min_ocr_seconds = min_ocr_seconds
+        self.barcode_variant_seconds = barcode_variant_seconds
+        
+        self.lookup_sources = [
+            ('open_food_facts', self.fetch_from_open_food_facts),
+            ('barcode_lookup', self.fetch_from_barcode_lookup),
+        ]
+        self.source_breakers = {
+            name: CircuitBreaker(name, breaker_failure_threshold, breaker_reset_timeout)
+            for name, _ in self.lookup_sources
+        }
+    
+    @property
+    def reader(self):
+        return self.ocr_registry.get_reader(self.ocr_languages)
+        
+    BARCODE_VARIANTS = ('gray', 'clahe', 'blur', 'sharpen', 'threshold')
+    
+    def preprocess_image_for_barcode(self, image, variants=None):
         """Enhanced image preprocessing for better barcode detection"""
         try:
             if len(image.shape) == 3:
@@ -20,64 +74,93 @@ class ProductAnalyzer:
             
             processed_images = []
             
-         
-            processed_images.append(gray)
-            
-           
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            enhanced = clahe.apply(gray)
-            processed_images.append(enhanced)
-            
-        
-            blurred = cv2.GaussianBlur(gray, (3, 3), 0)
-            processed_images.append(blurred)
-            
-        
-            kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-            sharpened = cv2.filter2D(gray, -1, kernel)
-            processed_images.append(sharpened)
-            
-    
-            thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                         cv2.THRESH_BINARY, 11, 2)
-            processed_images.append(thresh)
+            for variant in variants or self.BARCODE_VARIANTS:
+                if variant == 'gray':
+                    processed_images.append((variant, gray))
+                
+                elif variant == 'clahe':
+                    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+                    enhanced = clahe.apply(gray)
+                    processed_images.append((variant, enhanced))
+                
+                elif variant == 'blur':
+                    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+                    processed_images.append((variant, blurred))
+                
+                elif variant == 'sharpen':
+                    kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
+                    sharpened = cv2.filter2D(gray, -1, kernel)
+                    processed_images.append((variant, sharpened))
+                
+                elif variant == 'threshold':
+                    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                                                 cv2.THRESH_BINARY, 11, 2)
+                    processed_images.append((variant, thresh))
             
             return processed_images
             
         except Exception as e:
             print(f"Image preprocessing error: {e}")
-            return [gray] if 'gray' in locals() else [image]
+            return [('gray', gray)] if 'gray' in locals() else [('original', image)]
     
-    def detect_and_decode_barcode(self, image):
-        """Enhanced barcode detection with multiple preprocessing techniques"""
+    def detect_and_decode_barcode(self, image, roi=None, variants=None, stop_on_first=False,
+                                  deadline=None, skipped_stages=None):
+        """
+        Enhanced barcode detection with multiple preprocessing techniques.
+        roi: optional (x, y, w, h) region to search; returned rects stay in full-image coordinates.
+        stop_on_first: return as soon as one preprocessing variant yields a valid code.
+        deadline: optional Deadline; variants after the first are skipped once it runs short
+        and their names are appended to skipped_stages.
+        """
         try:
-            processed_images = self.preprocess_image_for_barcode(image)
+            offset_x, offset_y = 0, 0
+            if roi is not None:
+                x, y, w, h = roi
+                image = image[y:y + h, x:x + w]
+                offset_x, offset_y = x, y
+                if image.size == 0:
+                    return []
+            
+            processed_images = self.preprocess_image_for_barcode(image, variants)
             
             all_barcodes = []
             
-            for i, processed_img in enumerate(processed_images):
+            for index, (method, processed_img) in enumerate(processed_images):
+                if (index > 0 and deadline is not None
+                        and not deadline.allows(self.barcode_variant_seconds)):
+                    if skipped_stages is not None:
+                        skipped_stages.extend(
+                            f"barcode_variant:{name}" for name, _ in processed_images[index:]
+                        )
+                    break
+                
                 try:
             
-                    barcodes = pyzbar.decode(processed_img)
+                    barcodes = self.barcode_decoder.decode(processed_img)
                     
                     for barcode in barcodes:
-                        barcode_data = barcode.data.decode('utf-8')
+                        barcode_data = barcode.data
                         barcode_type = barcode.type
                         
                      
                         if self.validate_barcode_format(barcode_data, barcode_type):
+                            rect = barcode.rect
                             barcode_info = {
                                 'data': barcode_data,
                                 'type': barcode_type,
-                                'rect': barcode.rect,
-                                'preprocessing_method': i,
+                                'rect': Rect(rect.left + offset_x, rect.top + offset_y,
+                                             rect.width, rect.height),
+                                'preprocessing_method': method,
                                 'quality_score': self.calculate_barcode_quality(barcode, processed_img)
                             }
                             all_barcodes.append(barcode_info)
                             
                 except Exception as e:
-                    print(f"Barcode detection attempt {i} failed: {e}")
+                    print(f"Barcode detection attempt {method} failed: {e}")
                     continue
+                
+                if stop_on_first and all_barcodes:
+                    break
             
            
             unique_barcodes = self.remove_duplicate_barcodes(all_barcodes)
@@ -90,6 +173,55 @@ class ProductAnalyzer:
             print(f"Barcode detection error: {e}")
             return []
     
+    def locate_barcode_region(self, image, margin=0.15):
+        """
+        Cheap barcode localisation: 1D codes are dense vertical edges, so
+        take the largest blob of strong horizontal gradient. Returns (x, y, w, h) or None.
+        """
+        try:
+            if len(image.shape) == 3:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            else:
+                gray = image
+            
+            grad_x = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=-1)
+            grad_y = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=-1)
+            gradient = cv2.convertScaleAbs(cv2.subtract(np.abs(grad_x), np.abs(grad_y)))
+            
+            blurred = cv2.blur(gradient, (9, 9))
+            _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (21, 7))
+            closed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
+            closed = cv2.erode(closed, None, iterations=4)
+            closed = cv2.dilate(closed, None, iterations=4)
+            
+            contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            if not contours:
+                return None
+            
+            largest = max(contours, key=cv2.contourArea)
+            x, y, w, h = cv2.boundingRect(largest)
+            
+            # Ignore specks; a readable barcode covers a noticeable part of the frame
+            if w * h < 0.01 * gray.shape[0] * gray.shape[1]:
+                return None
+            
+            return self.expand_region((x, y, w, h), gray.shape, margin)
+            
+        except Exception as e:
+            print(f"Barcode localisation error: {e}")
+            return None
+    
+    def expand_region(self, region, shape, margin=0.15):
+        """Grow an (x, y, w, h) region by a margin, clipped to the image"""
+        x, y, w, h = region
+        pad_x, pad_y = int(w * margin), int(h * margin)
+        left, top = max(0, x - pad_x), max(0, y - pad_y)
+        right = min(shape[1], x + w + pad_x)
+        bottom = min(shape[0], y + h + pad_y)
+        return (left, top, right - left, bottom - top)
+    
     def validate_barcode_format(self, barcode_data, barcode_type):
         """Validate barcode format and checksum"""
         try:
@@ -99,12 +231,24 @@ class ProductAnalyzer:
                     return False
                 return self.validate_ean13_checksum(barcode_data)
                 
-            elif barcode_type == 'UPC-A':
+            elif barcode_type in ('UPC-A', 'UPCA'):
             
                 if len(barcode_data) != 12 or not barcode_data.isdigit():
                     return False
                 return self.validate_upca_checksum(barcode_data)
                 
+            elif barcode_type in ('EAN8', 'EAN-8'):
+                
+                if len(barcode_data) != 8 or not barcode_data.isdigit():
+                    return False
+                return self.validate_ean8_checksum(barcode_data)
+                
+            elif barcode_type in ('UPC-E', 'UPCE'):
+                
+                if len(barcode_data) != 8 or not barcode_data.isdigit():
+                    return False
+                return self.validate_upce_checksum(barcode_data)
+                
             elif barcode_type == 'CODE128':
              
                 return len(barcode_data) >= 4 and len(barcode_data) <= 50
@@ -144,6 +288,35 @@ class ProductAnalyzer:
         except Exception:
             return False
     
+    def validate_ean8_checksum(self, barcode):
+        """Validate EAN-8 checksum"""
+        try:
+            digits = [int(d) for d in barcode]
+            checksum = sum(digits[i] * (3 if i % 2 == 0 else 1) for i in range(7))
+            checksum = (10 - (checksum % 10)) % 10
+            return checksum == digits[7]
+        except Exception:
+            return False
+    
+    def validate_upce_checksum(self, barcode):
+        """Validate UPC-E (number system, six digits, check) via its UPC-A expansion"""
+        try:
+            number_system, body, check = barcode[0], barcode[1:7], barcode[7]
+            if number_system not in '01':
+                return False
+            last = int(body[5])
+            if last <= 2:
+                expanded = body[:2] + body[5] + '0000' + body[2:5]
+            elif last == 3:
+                expanded = body[:3] + '00000' + body[3:5]
+            elif last == 4:
+                expanded = body[:4] + '00000' + body[4]
+            else:
+                expanded = body[:5] + '0000' + body[5]
+            return self.validate_upca_checksum(number_system + expanded + check)
+        except Exception:
+            return False
+    
     def calculate_barcode_quality(self, barcode, image):
         """Calculate barcode quality score"""
         try:
@@ -206,17 +379,39 @@ class ProductAnalyzer:
         
         return list(unique_barcodes.values())
     
-    def fetch_product_info_from_barcode(self, barcode):
-        """Enhanced product information fetching with multiple data sources"""
+    def fetch_product_info_from_barcode(self, barcode, deadline=None, skipped_stages=None):
+        """
+        Enhanced product information fetching with multiple data sources.
+        Sources are tried in order within the remaining deadline; a source
+        whose circuit breaker is open, or that no longer fits the budget,
+        is skipped and named in skipped_stages.
+        """
         try:
-            product_info = self.fetch_from_open_food_facts(barcode)
-            if product_info['found']:
-                return product_info
-            
-
-            product_info = self.fetch_from_barcode_lookup(barcode)
-            if product_info['found']:
-                return product_info
+            for name, fetch in self.lookup_sources:
+                breaker = self.source_breakers[name]
+                
+                timeout = self.lookup_timeout
+                if deadline is not None:
+                    if not deadline.allows(self.min_lookup_seconds):
+                        if skipped_stages is not None:
+                            skipped_stages.append(f"lookup:{name}")
+                        continue
+                    timeout = min(timeout, deadline.remaining())
+                
+                if not breaker.allow():
+                    if skipped_stages is not None:
+                        skipped_stages.append(f"lookup:{name}:circuit_open")
+                    continue
+                
+                product_info = fetch(barcode, timeout=timeout)
+                
+                if product_info.get('error'):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                
+                if product_info['found']:
+                    return product_info
             
             return {'found': False, 'source': 'none'}
             
@@ -224,11 +419,11 @@ class ProductAnalyzer:
             print(f"Product info fetch error: {e}")
             return {'found': False, 'error': str(e)}
     
-    def fetch_from_open_food_facts(self, barcode):
+    def fetch_from_open_food_facts(self, barcode, timeout=10):
         """Fetch from Open Food Facts API"""
         try:
             url = f"https://world.openfoodfacts.org/api/v0/product/{barcode}.json"
-            response = requests.get(url, timeout=10)
+            response = requests.get(url, timeout=timeout)
             
             if response.status_code == 200:
                 data = response.json()
@@ -248,16 +443,19 @@ class ProductAnalyzer:
                         'image_url': product.get('image_url', ''),
                         'allergens': product.get('allergens', ''),
                     }
+            if response.status_code >= 500 or response.status_code == 429:
+                return {'found': False, 'source': 'open_food_facts',
+                        'error': f"HTTP {response.status_code}"}
             return {'found': False, 'source': 'open_food_facts'}
         except Exception as e:
             print(f"Open Food Facts API error: {e}")
-            return {'found': False, 'source': 'open_food_facts'}
+            return {'found': False, 'source': 'open_food_facts', 'error': str(e)}
     
-    def fetch_from_barcode_lookup(self, barcode):
+    def fetch_from_barcode_lookup(self, barcode, timeout=10):
         """Alternative barcode lookup service"""
         try:
             url = f"https://api.barcodelookup.com/v3/products?barcode={barcode}&formatted=y&key=demo"
-            response = requests.get(url, timeout=10)
+            response = requests.get(url, timeout=timeout)
             
             if response.status_code == 200:
                 data = response.json()
@@ -271,13 +469,22 @@ class ProductAnalyzer:
                         'categories': product.get('category', ''),
                         'description': product.get('description', ''),
                     }
+            if response.status_code >= 500 or response.status_code == 429:
+                return {'found': False, 'source': 'barcode_lookup',
+                        'error': f"HTTP {response.status_code}"}
             return {'found': False, 'source': 'barcode_lookup'}
         except Exception as e:
             print(f"Barcode lookup API error: {e}")
-            return {'found': False, 'source': 'barcode_lookup'}
+            return {'found': False, 'source': 'barcode_lookup', 'error': str(e)}
     
-    def extract_text(self, image):
-        """Extract text from image using OCR"""
+    def extract_text(self, image, mode=None, text_budget=None, deadline=None,
+                     paragraph=None, min_confidence=None, languages=None, skipped_stages=None):
+        """
+        Extract text from image using OCR.
+        text_budget and deadline (Deadline or seconds) only apply to the
+        'regions' mode; 'full' is one readtext call over the whole frame and
+        runs to completion. OCR steps cut by the deadline go to skipped_stages.
+        """
         try:
             if len(image.shape) == 3:
                 gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
@@ -287,13 +494,122 @@ class ProductAnalyzer:
             clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
             enhanced = clahe.apply(gray)
             
-            results = self.reader.readtext(enhanced)
-            extracted_text = ' '.join([result[1] for result in results])
-            return extracted_text
+            # Extra languages are loaded on demand by the shared registry
+            reader = self.ocr_registry.get_reader(languages or self.ocr_languages)
+            
+            mode = mode or self.ocr_mode
+            if mode == 'full':
+                results = reader.readtext(enhanced)
+                extracted_text = ' '.join([result[1] for result in results])
+                return extracted_text
+            
+            return self.extract_text_from_regions(
+                enhanced,
+                text_budget=self.ocr_text_budget if text_budget is None else text_budget,
+                deadline=self.ocr_deadline if deadline is None else deadline,
+                paragraph=self.ocr_paragraph if paragraph is None else paragraph,
+                min_confidence=self.ocr_min_confidence if min_confidence is None else min_confidence,
+                reader=reader,
+                skipped_stages=skipped_stages
+            )
         except Exception as e:
             print(f"OCR Error: {e}")
             return ""
     
+    def detection_scale(self, gray):
+        """Scale factor that brings the smallest text of interest to the target height"""
+        min_text_height = gray.shape[0] * self.ocr_min_text_fraction
+        if min_text_height <= 0:
+            return 1.0
+        return min(1.0, self.ocr_target_text_height / min_text_height)
+    
+    def detect_text_regions(self, gray, reader=None):
+        """Detect text boxes on a downsampled frame, mapped back to full resolution"""
+        reader = reader or self.reader
+        scale = self.detection_scale(gray)
+        if scale < 1.0:
+            small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            small = gray
+        
+        horizontal_list, free_list = reader.detect(small)
+        horizontal_list = horizontal_list[0] if horizontal_list else []
+        free_list = free_list[0] if free_list else []
+        
+        height, width = gray.shape[:2]
+        regions = []
+        
+        for x_min, x_max, y_min, y_max in horizontal_list:
+            box = [
+                max(0, int(x_min / scale)), min(width, int(np.ceil(x_max / scale))),
+                max(0, int(y_min / scale)), min(height, int(np.ceil(y_max / scale)))
+            ]
+            area = (box[1] - box[0]) * (box[3] - box[2])
+            if area > 0:
+                regions.append((area, 'horizontal', box))
+        
+        for points in free_list:
+            box = [[int(x / scale), int(y / scale)] for x, y in points]
+            area = cv2.contourArea(np.array(box, dtype=np.float32))
+            if area > 0:
+                regions.append((area, 'free', box))
+        
+        # Largest regions first: headline text carries most of the keywords
+        regions.sort(key=lambda region: region[0], reverse=True)
+        return regions
+    
+    def extract_text_from_regions(self, gray, text_budget=400, deadline=2.0,
+                                  paragraph=False, min_confidence=0.3, reader=None,
+                                  skipped_stages=None):
+        """Recognise detected text regions in batches until the text budget or deadline is met"""
+        reader = reader or self.reader
+        if deadline is not None:
+            deadline = Deadline.coerce(deadline, self.ocr_deadline)
+            if not deadline.allows(self.ocr_detect_seconds):
+                print(f"OCR skipped: {deadline.remaining():.2f}s left, detection needs {self.ocr_detect_seconds}s")
+                if skipped_stages is not None:
+                    skipped_stages.append('ocr:detect')
+                return ""
+        regions = self.detect_text_regions(gray, reader)
+        
+        results = []
+        text_length = 0
+        batch_size = max(1, self.ocr_batch_size)
+        
+        for i in range(0, len(regions), batch_size):
+            if deadline is not None and not deadline.allows(self.ocr_batch_seconds):
+                print(f"OCR deadline reached after {i}/{len(regions)} regions")
+                if skipped_stages is not None:
+                    skipped_stages.append('ocr:recognize')
+                break
+            if text_budget is not None and text_length >= text_budget:
+                break
+            
+            batch = regions[i:i + batch_size]
+            horizontal_list = [box for _, kind, box in batch if kind == 'horizontal']
+            free_list = [box for _, kind, box in batch if kind == 'free']
+            
+            batch_results = reader.recognize(
+                gray,
+                horizontal_list=horizontal_list,
+                free_list=free_list,
+                batch_size=len(batch)
+            )
+            
+            for box, text, confidence in batch_results:
+                if confidence < min_confidence or not text.strip():
+                    continue
+                results.append((box, text, confidence))
+                text_length += len(text) + 1
+        
+        if paragraph:
+            merged = get_paragraph(results)
+            return ' '.join([result[1] for result in merged])
+        
+        # Restore reading order (top-to-bottom, left-to-right)
+        results.sort(key=lambda result: (min(p[1] for p in result[0]), min(p[0] for p in result[0])))
+        return ' '.join([result[1] for result in results])
+    
     def analyze_sustainability_from_text(self, text):
         """Analyze sustainability based on extracted text"""
         text_lower = text.lower()
@@ -407,9 +723,9 @@ class ProductAnalyzer:
         
         return recommendations
     
-    def analyze_product(self, image):
-        """Main analysis function combining barcode and OCR"""
-        result = {
+    def new_analysis_result(self):
+        """Empty analysis result shared by image and barcode-only analysis"""
+        return {
             'barcode_detected': False,
             'product_info': {},
             'sustainability_score': 0,
@@ -418,55 +734,89 @@ class ProductAnalyzer:
             'packaging_score': 0,
             'packaging_materials': [],
             'recommendations': [],
-            'confidence': 0
+            'confidence': 0,
+            'skipped_stages': []
         }
+    
+    def apply_barcode_analysis(self, result, best_barcode, deadline=None):
+        """Look up a decoded barcode and score the product into result"""
+        result['barcode_detected'] = True
+        barcode_data = best_barcode['data']
         
-        print("Starting barcode detection...")
-        barcodes = self.detect_and_decode_barcode(image)
+        print(f"Barcode detected: {barcode_data} (Type: {best_barcode['type']})")
         
-        if barcodes:
-            result['barcode_detected'] = True
-            best_barcode = barcodes[0] 
-            barcode_data = best_barcode['data']
+        product_info = self.fetch_product_info_from_barcode(
+            barcode_data, deadline, result['skipped_stages']
+        )
+        
+        if product_info['found']:
+            result['product_info'] = product_info
+            result['confidence'] = 0.9
             
-            print(f"Barcode detected: {barcode_data} (Type: {best_barcode['type']})")
+            base_score = 5
             
-            product_info = self.fetch_product_info_from_barcode(barcode_data)
+            nutriscore = product_info.get('nutriscore_grade', '').upper()
+            nutriscore_map = {'A': 2, 'B': 1, 'C': 0, 'D': -1, 'E': -2}
+            base_score += nutriscore_map.get(nutriscore, 0)
             
-            if product_info['found']:
-                result['product_info'] = product_info
-                result['confidence'] = 0.9
-                
-                base_score = 5
-                
-                nutriscore = product_info.get('nutriscore_grade', '').upper()
-                nutriscore_map = {'A': 2, 'B': 1, 'C': 0, 'D': -1, 'E': -2}
-                base_score += nutriscore_map.get(nutriscore, 0)
-                
-                ecoscore = product_info.get('ecoscore_grade', '').upper()
-                ecoscore_map = {'A': 3, 'B': 2, 'C': 0, 'D': -2, 'E': -3}
-                base_score += ecoscore_map.get(ecoscore, 0)
-                
-                packaging_score, materials = self.analyze_packaging(
-                    product_info.get('packaging', '')
-                )
-                result['packaging_score'] = packaging_score
-                result['packaging_materials'] = materials
-                base_score = (base_score + packaging_score) / 2
-                
-                labels_text = product_info.get('labels', '') + ' ' + product_info.get('categories', '')
-                text_score, keywords = self.analyze_sustainability_from_text(labels_text)
-                result['found_keywords'] = keywords
-                
-                result['sustainability_score'] = round(
-                    min(10, max(0, (base_score + text_score) / 2)), 1
-                )
-            else:
-                result['confidence'] = 0.5
-                result['sustainability_score'] = 5
+            ecoscore = product_info.get('ecoscore_grade', '').upper()
+            ecoscore_map = {'A': 3, 'B': 2, 'C': 0, 'D': -2, 'E': -3}
+            base_score += ecoscore_map.get(ecoscore, 0)
+            
+            packaging_score, materials = self.analyze_packaging(
+                product_info.get('packaging', '')
+            )
+            result['packaging_score'] = packaging_score
+            result['packaging_materials'] = materials
+            base_score = (base_score + packaging_score) / 2
+            
+            labels_text = product_info.get('labels', '') + ' ' + product_info.get('categories', '')
+            text_score, keywords = self.analyze_sustainability_from_text(labels_text)
+            result['found_keywords'] = keywords
+            
+            result['sustainability_score'] = round(
+                min(10, max(0, (base_score + text_score) / 2)), 1
+            )
+        else:
+            result['confidence'] = 0.5
+            result['sustainability_score'] = 5
         
-        print("Extracting text via OCR...")
-        extracted_text = self.extract_text(image)
+        return result
+    
+    def analyze_barcode(self, barcode_info, deadline=None):
+        """Analyze a product from an already decoded barcode (no OCR)"""
+        deadline = Deadline.coerce(deadline, self.analysis_budget)
+        result = self.new_analysis_result()
+        self.apply_barcode_analysis(result, barcode_info, deadline)
+        result['recommendations'] = self.generate_recommendations(result)
+        return result
+    
+    def analyze_product(self, image, deadline=None):
+        """
+        Main analysis function combining barcode and OCR.
+        deadline: Deadline or seconds (defaults to analysis_budget). Each stage
+        gets the remaining budget; stages that no longer fit are skipped.
+        """
+        deadline = Deadline.coerce(deadline, self.analysis_budget)
+        result = self.new_analysis_result()
+        
+        print("Starting barcode detection...")
+        barcodes = self.detect_and_decode_barcode(
+            image, deadline=deadline, skipped_stages=result['skipped_stages']
+        )
+        
+        if barcodes:
+            self.apply_barcode_analysis(result, barcodes[0], deadline)
+        
+        extracted_text = ''
+        if deadline.allows(max(self.min_ocr_seconds, self.ocr_detect_seconds)):
+            print("Extracting text via OCR...")
+            extracted_text = self.extract_text(
+                image, deadline=Deadline(min(self.ocr_deadline, deadline.remaining())),
+                skipped_stages=result['skipped_stages']
+            )
+        else:
+            result['skipped_stages'].append('ocr')
         result['extracted_text'] = extracted_text
         
         if not result['barcode_detected'] or not result['product_info'].get('found'):
@@ -477,7 +827,9 @@ class ProductAnalyzer:
         
         result['recommendations'] = self.generate_recommendations(result)
         
-        print(f"Analysis complete. Sustainability score: {result['sustainability_score']}/10")
+        result['elapsed_ms'] = int(deadline.elapsed() * 1000)
+        print(f"Analysis complete in {result['elapsed_ms']} ms. "
+              f"Sustainability score: {result['sustainability_score']}/10")
         return result
 
 
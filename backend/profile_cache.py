@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+class ProfileCache:
+    """
+    Bounded LRU cache of user profiles with a TTL per entry. Writers call
+    invalidate(user_id) once their change is committed; a per-user
+    generation counter stops a load that raced with the write from storing
+    its stale result afterwards.
+    """
+
+    def __init__(self, max_entries=5000, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_load(self, user_id, loader):
+        """Cached profile for user_id, calling loader(user_id) on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            generation = self._generations.get(user_id, 0)
+
+        profile = loader(user_id)
+
+        if profile is not None:
+            with self._lock:
+                if self._generations.get(user_id, 0) == generation:
+                    self._entries[user_id] = (profile, time.monotonic() + self.ttl_seconds)
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+        return profile
+
+    def invalidate(self, user_id):
+        self.invalidate_many((user_id,))
+
+    def invalidate_many(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
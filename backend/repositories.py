@@ -0,0 +1,191 @@
+"""
+Repository interfaces for EcoLife's persistent data.
+
+AuthManager and CommunityManager talk to these instead of SQL, so the
+storage engine (storage_sqlite, storage_memory) can be swapped without
+touching the managers or the routes. Rows come back as plain dicts.
+"""
+import re
+
+class DuplicateRecordError(Exception):
+    """A unique key (username, email, challenge membership, ...) already exists"""
+
+_NAME_SEPARATOR = re.compile(r'[\W_]+')
+
+def center_dedupe_key(name, latitude, longitude):
+    """Identity of a recycling center: normalised name at ~10 m precision"""
+    normalized = _NAME_SEPARATOR.sub(' ', name.lower()).strip()
+    return f"{normalized}|{latitude:.4f}|{longitude:.4f}"
+
+class UserRepository:
+    def create(self, username, email, password_hash):
+        """Insert a user -> user_id; DuplicateRecordError if username/email is taken"""
+        raise NotImplementedError
+
+    def find_login(self, identifier):
+        """(id, username, password_hash) for a username or email, or None"""
+        raise NotImplementedError
+
+    def replace_password_hash(self, user_id, old_hash, new_hash):
+        """Swap the hash only if it is still old_hash"""
+        raise NotImplementedError
+
+    def get(self, user_id):
+        """username, email, total_scans, recycling_score, co2_saved, created_at, location"""
+        raise NotImplementedError
+
+    def set_location(self, user_id, location, location_key):
+        raise NotImplementedError
+
+    def top_by_location(self, location_key, limit):
+        """Leaderboard rows for one location key, best recycling_score first"""
+        raise NotImplementedError
+
+    def location_activity(self, limit):
+        """[{'location', 'users', 'total_scans'}] for the busiest location keys"""
+        raise NotImplementedError
+
+    def leaderboard_version(self):
+        """Counter that changes whenever user scores, names, locations or daily scores change"""
+        raise NotImplementedError
+
+    def leaderboard_rows(self, user_ids=None):
+        """
+        user_id, username, total_scans, recycling_score, co2_saved, location,
+        location_key for the given users, or for every user with scans
+        """
+        raise NotImplementedError
+
+    def totals(self):
+        """total_users, total_scans, co2_saved, avg_score"""
+        raise NotImplementedError
+
+class ScanRepository:
+    def apply_batch(self, events, achievement_thresholds):
+        """
+        Atomically store ScanEvents, bump user totals and waste-type counters
+        and award crossed achievements -> list of (user_id, achievement_type)
+        """
+        raise NotImplementedError
+
+    def waste_counts(self, user_id):
+        """[(waste_type, count)] for one user, by waste_type"""
+        raise NotImplementedError
+
+    def summary(self, user_id):
+        """[{'waste_type', 'count', 'confidence'}] with confidence summed"""
+        raise NotImplementedError
+
+    def daily_scores(self, since_day, user_ids=None):
+        """[(user_id, day, score, scan_count)] for days >= since_day ('YYYY-MM-DD')"""
+        raise NotImplementedError
+
+    def global_breakdown(self):
+        """[(waste_type, count)] over all users, most common first"""
+        raise NotImplementedError
+
+class AchievementRepository:
+    def for_user(self, user_id):
+        """[(achievement_type, earned_at)], newest first"""
+        raise NotImplementedError
+
+class ChallengeRepository:
+    def create(self, title, description, target_value, challenge_type,
+               start_date, end_date, reward_points):
+        raise NotImplementedError
+
+    def active(self):
+        """Challenges that have not ended, newest first, with a participant count"""
+        raise NotImplementedError
+
+    def join(self, user_id, challenge_id):
+        """Join and bump the participant count; False if already joined or no such challenge"""
+        raise NotImplementedError
+
+    def add_progress(self, user_id, challenge_id, increment):
+        """Bump progress and mark completion once the target is reached"""
+        raise NotImplementedError
+
+    def apply_scan_progress(self, increments, challenge_types):
+        """
+        Add {user_id: count} to every unfinished participation of those users
+        in challenges of challenge_types that have started and not ended,
+        marking completions as it goes; returns the number advanced
+        """
+        raise NotImplementedError
+
+class CenterRepository:
+    def add(self, name, address, latitude, longitude, accepts_types='',
+            operating_hours=None, contact=None, rating=0.0, verified=True):
+        """Insert a center -> id; DuplicateRecordError if its dedupe key exists"""
+        raise NotImplementedError
+
+    def upsert_many(self, centers, update_existing=True):
+        """
+        Write center dicts (the add() fields) in one transaction, matched to
+        existing centers by center_dedupe_key -> number of rows written.
+        Matches are overwritten when update_existing, else skipped.
+        """
+        raise NotImplementedError
+
+    def version(self):
+        """Counter that changes whenever any center is added, edited or removed"""
+        raise NotImplementedError
+
+    def verified_coordinates(self, center_ids=None):
+        """
+        (id, latitude, longitude, accepts_mask) of every verified center with
+        coordinates, or only of those among center_ids
+        """
+        raise NotImplementedError
+
+    def verified_accepts_types(self):
+        """(id, accepts_types) of every verified center with coordinates"""
+        raise NotImplementedError
+
+    def change_position(self):
+        """Sequence number of the latest entry in the center change log"""
+        raise NotImplementedError
+
+    def changes_since(self, position):
+        """
+        (latest position, ids of centers changed after position), or None if
+        the log no longer reaches back to position
+        """
+        raise NotImplementedError
+
+    def prune_changes(self, keep):
+        """Drop all but the newest keep change log entries"""
+        raise NotImplementedError
+
+    def get_many(self, center_ids):
+        """Center rows for the given ids, in no particular order"""
+        raise NotImplementedError
+
+class TipRepository:
+    def add(self, tip_text, category=None, difficulty=None, impact_score=0):
+        raise NotImplementedError
+
+    def all(self):
+        """Every tip as id/tip_text/category/impact_score, oldest first"""
+        raise NotImplementedError
+
+    def version(self):
+        """Counter that changes whenever any tip is added, edited or removed"""
+        raise NotImplementedError
+
+class Storage:
+    """The repositories of one storage engine"""
+
+    engine = 'base'
+
+    def __init__(self, users, scans, achievements, challenges, centers, tips):
+        self.users = users
+        self.scans = scans
+        self.achievements = achievements
+        self.challenges = challenges
+        self.centers = centers
+        self.tips = tips
+
+    def health(self):
+        return {'engine': self.engine}
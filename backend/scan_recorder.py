@@ -0,0 +1,206 @@
+import atexit
+import queue
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+ScanEvent = namedtuple('ScanEvent', ['user_id', 'waste_type', 'confidence',
+                                     'latitude', 'longitude', 'timestamp'])
+
+class ScanQueueFull(Exception):
+    """Raised when the scan queue stays full for enqueue_timeout; callers should answer 503"""
+
+class _Ticket:
+    """Lets a flush-on-ack caller wait for the batch containing its event"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+class ScanRecorder:
+    """
+    Write-behind queue for scan records.
+    Request handlers enqueue ScanEvents; one writer thread drains the queue
+    and hands batches to apply_batch(events), which must store a batch
+    atomically. durability='ack' makes record() wait until its batch is
+    committed; 'async' returns as soon as the event is queued. The queue is
+    drained on shutdown (registered with atexit). Listeners added with
+    add_listener(callback) get each batch's events after it commits.
+
+    A full queue makes record() raise ScanQueueFull after enqueue_timeout
+    instead of blocking the request. Async events whose batch fails are
+    retained (up to max_retained, oldest dropped first) and retried with
+    the next batch or every retry_interval; 'ack' callers get the error.
+    """
+
+    def __init__(self, apply_batch, durability='async', max_batch=500,
+                 flush_interval=0.05, max_queue=10000, ack_timeout=10.0,
+                 enqueue_timeout=1.0, max_retained=10000, retry_interval=1.0):
+        if durability not in ('async', 'ack'):
+            raise ValueError("durability must be 'async' or 'ack'")
+        self.apply_batch = apply_batch
+        self.durability = durability
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.ack_timeout = ack_timeout
+        self.enqueue_timeout = enqueue_timeout
+        self.max_retained = max_retained
+        self.retry_interval = retry_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._listeners = []
+        # Async events from failed batches, waiting to be retried (writer thread only)
+        self._retained = []
+        self._failed_at = 0.0
+        self.batches_committed = 0
+        self.events_committed = 0
+        self.events_failed = 0
+        self.batches_failed = 0
+        self.events_dropped = 0
+        self.last_error = None
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='scan-recorder', daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def add_listener(self, callback):
+        """Call callback(events) on the writer thread after every committed batch"""
+        self._listeners.append(callback)
+
+    def record(self, user_id, waste_type, confidence, latitude=None, longitude=None):
+        """Queue a scan; with durability='ack' wait until it is committed"""
+        self.start()
+        event = ScanEvent(
+            user_id, waste_type, confidence, latitude, longitude,
+            datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        )
+
+        if self.durability == 'async':
+            self._enqueue(event, None)
+            return True
+
+        ticket = _Ticket()
+        self._enqueue(event, ticket)
+        if not ticket.done.wait(self.ack_timeout):
+            raise TimeoutError('Scan record was not committed in time')
+        if ticket.error is not None:
+            raise ticket.error
+        return True
+
+    def _enqueue(self, event, ticket):
+        try:
+            self._queue.put((event, ticket), timeout=self.enqueue_timeout)
+        except queue.Full:
+            raise ScanQueueFull('Scan queue is full')
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far is committed"""
+        self.start()
+        ticket = _Ticket()
+        self._queue.put((None, ticket))
+        return ticket.done.wait(timeout)
+
+    def shutdown(self, timeout=10.0):
+        """Stop accepting work after draining the queue"""
+        if self._thread is None or self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._queue.put((None, None))
+        self._thread.join(timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._retained and (self._stopping.is_set()
+                                       or time.monotonic() - self._failed_at >= self.retry_interval):
+                    self._commit([])
+                if self._stopping.is_set():
+                    return
+                continue
+
+            items = [item]
+            while len(items) < self.max_batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._commit(items)
+
+            if self._stopping.is_set() and self._queue.empty():
+                return
+
+    def _commit(self, items):
+        retained, self._retained = self._retained, []
+        events = retained + [event for event, _ in items if event is not None]
+        error = None
+
+        if events:
+            for attempt in range(2):
+                try:
+                    self.apply_batch(events)
+                    error = None
+                    break
+                except Exception as e:
+                    error = e
+                    time.sleep(0.05)
+
+            if error is None:
+                self.batches_committed += 1
+                self.events_committed += len(events)
+                self._notify(events)
+            else:
+                self.events_failed += len(events) - len(retained)
+                self._retain(retained + [event for event, ticket in items
+                                         if event is not None and ticket is None], error)
+
+        for event, ticket in items:
+            if ticket is not None:
+                if event is not None:
+                    ticket.error = error
+                ticket.done.set()
+
+    def _retain(self, kept, error):
+        """Keep a failed batch's async events for the next attempt, within max_retained"""
+        self.batches_failed += 1
+        self.last_error = str(error)
+        self._failed_at = time.monotonic()
+        overflow = max(0, len(kept) - self.max_retained)
+        if overflow:
+            self.events_dropped += overflow
+            kept = kept[overflow:]
+        self._retained = kept
+        print(f"Scan recorder batch failed ({len(kept)} scans kept for retry, "
+              f"{overflow} dropped): {error}")
+
+    def _notify(self, events):
+        for callback in self._listeners:
+            try:
+                callback(events)
+            except Exception as e:
+                print(f"Scan recorder listener error: {e}")
+
+    def stats(self):
+        return {
+            'durability': self.durability,
+            'pending': self.pending(),
+            'batches_committed': self.batches_committed,
+            'events_committed': self.events_committed,
+            'events_failed': self.events_failed,
+            'batches_failed': self.batches_failed,
+            'events_retained': len(self._retained),
+            'events_dropped': self.events_dropped,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,208 @@
+"""
+Retention for scan_history.
+
+Raw scans older than the horizon are folded into scan_rollups (one row per
+user, day and waste type, keeping the scan count and confidence sum), copied
+to an archive database file and deleted from the hot table. Readers union
+scan_rollups with the remaining raw rows, so their cost follows recent
+activity rather than account age. Impact math is linear in confidence, so
+count plus confidence sum gives the same totals as the raw rows.
+
+    python scan_retention.py [--horizon-days 90] [--archive ecolife_users_archive.db]
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+ARCHIVE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS archive.scan_history_archive (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        waste_type TEXT,
+        confidence REAL,
+        timestamp TIMESTAMP,
+        image_path TEXT,
+        latitude REAL,
+        longitude REAL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+def default_archive_path(db_path):
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_archive{ext or '.db'}"
+
+class ScanRetention:
+    """
+    Compacts scan_history one day at a time, each day in its own IMMEDIATE
+    transaction so the scan writer is never blocked for long. start() runs
+    compact() periodically on a daemon thread.
+    """
+
+    def __init__(self, db, archive_path, horizon_days=90, interval_seconds=6 * 3600):
+        self.db = db
+        self.archive_path = archive_path
+        self.horizon_days = horizon_days
+        self.interval_seconds = interval_seconds
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+        self.runs = 0
+        self.rows_compacted = 0
+        self.days_compacted = 0
+        self.last_run = None
+        self.last_error = None
+
+    def cutoff(self, now=None):
+        """Start of the oldest day that stays raw"""
+        now = now or datetime.utcnow()
+        day = (now - timedelta(days=self.horizon_days)).date()
+        return day.strftime('%Y-%m-%d 00:00:00')
+
+    def compact(self, now=None):
+        """Roll up, archive and delete raw scans older than the horizon; returns rows moved"""
+        with self._lock:
+            cutoff = self.cutoff(now)
+            conn = self.db.connection()
+            # Daily leaderboard buckets are only read for the last month
+            with self.db.transaction() as cursor:
+                cursor.execute('DELETE FROM user_daily_scores WHERE day < ?', (cutoff[:10],))
+
+            oldest = conn.execute('SELECT MIN(timestamp) FROM scan_history').fetchone()[0]
+            if oldest is None or oldest >= cutoff:
+                self._finish_run(0, 0)
+                return 0
+
+            conn.execute('ATTACH DATABASE ? AS archive', (self.archive_path,))
+            moved = 0
+            days = 0
+            try:
+                conn.execute(ARCHIVE_SCHEMA)
+                conn.commit()
+                while oldest is not None and oldest < cutoff:
+                    day_start = oldest[:10] + ' 00:00:00'
+                    day_end = (datetime.strptime(oldest[:10], '%Y-%m-%d')
+                               + timedelta(days=1)).strftime('%Y-%m-%d 00:00:00')
+                    moved += self._compact_range(conn, day_start, min(day_end, cutoff))
+                    days += 1
+                    oldest = conn.execute('SELECT MIN(timestamp) FROM scan_history').fetchone()[0]
+            finally:
+                conn.execute('DETACH DATABASE archive')
+
+            # Hand the freed pages back to the filesystem
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+                conn.execute('PRAGMA incremental_vacuum')
+            self._finish_run(moved, days)
+            print(f"Scan retention: compacted {moved} scans over {days} days before {cutoff}")
+            return moved
+
+    def _compact_range(self, conn, start, end):
+        """One transaction: fold [start, end) into rollups, archive it, delete it"""
+        cursor = conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('''
+                INSERT INTO scan_rollups (user_id, day, waste_type, scan_count, confidence_sum)
+                SELECT user_id, date(timestamp), waste_type, COUNT(*), SUM(confidence)
+                FROM scan_history
+                WHERE timestamp >= ? AND timestamp < ?
+                  AND user_id IS NOT NULL AND waste_type IS NOT NULL
+                GROUP BY user_id, date(timestamp), waste_type
+                ON CONFLICT (user_id, day, waste_type) DO UPDATE SET
+                    scan_count = scan_count + excluded.scan_count,
+                    confidence_sum = confidence_sum + excluded.confidence_sum
+            ''', (start, end))
+            # The archive file commits separately in WAL mode; OR IGNORE makes a
+            # retry after a partial commit harmless, and rollups + delete are atomic
+            cursor.execute('''
+                INSERT OR IGNORE INTO archive.scan_history_archive
+                    (id, user_id, waste_type, confidence, timestamp, image_path, latitude, longitude)
+                SELECT id, user_id, waste_type, confidence, timestamp, image_path, latitude, longitude
+                FROM scan_history
+                WHERE timestamp >= ? AND timestamp < ?
+            ''', (start, end))
+            cursor.execute(
+                'DELETE FROM scan_history WHERE timestamp >= ? AND timestamp < ?', (start, end)
+            )
+            moved = cursor.rowcount
+            conn.commit()
+            return moved
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def enable_incremental_vacuum(self):
+        """
+        Switch the database to auto_vacuum=INCREMENTAL. This needs a one-off
+        full VACUUM, so it is left to the CLI rather than the background run.
+        """
+        conn = self.db.connection()
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return False
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        conn.execute('VACUUM')
+        print("Scan retention: enabled incremental vacuum")
+        return True
+
+    def _finish_run(self, moved, days):
+        self.runs += 1
+        self.rows_compacted += moved
+        self.days_compacted += days
+        self.last_run = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+    def start(self):
+        """Run compact() every interval_seconds on a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='scan-retention', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.compact()
+                self.last_error = None
+            except Exception as e:
+                # Anything else (e.g. an unparseable timestamp) must not kill the thread
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Scan retention failed: {e}")
+            self._stopping.wait(self.interval_seconds)
+
+    def stats(self):
+        return {
+            'horizon_days': self.horizon_days,
+            'archive_path': self.archive_path,
+            'runs': self.runs,
+            'rows_compacted': self.rows_compacted,
+            'days_compacted': self.days_compacted,
+            'last_run': self.last_run,
+            'last_error': self.last_error
+        }
+
+if __name__ == "__main__":
+    from auth_manager import get_auth_manager
+
+    parser = argparse.ArgumentParser(description='Compact old scans into daily rollups')
+    parser.add_argument('--horizon-days', type=int)
+    parser.add_argument('--archive')
+    args = parser.parse_args()
+
+    auth = get_auth_manager()
+    auth.scan_recorder.flush()
+    retention = auth.scan_retention
+    if args.horizon_days is not None:
+        retention.horizon_days = args.horizon_days
+    if args.archive:
+        retention.archive_path = args.archive
+
+    start_time = time.perf_counter()
+    retention.enable_incremental_vacuum()
+    moved = retention.compact()
+    print(f"Moved {moved} scans in {time.perf_counter() - start_time:.2f}s")
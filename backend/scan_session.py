@@ -0,0 +1,170 @@
+import threading
+import time
+import uuid
+import cv2
+
+class BarcodeScanSession:
+    """State for one multi-frame barcode scan"""
+
+    def __init__(self, user_id, max_frames):
+        self.session_id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.max_frames = max_frames
+        self.created_at = time.monotonic()
+        self.last_activity = self.created_at
+        self.frames_processed = 0
+        self.last_region = None
+        self.barcode = None
+        # Frames each checksum-less code has decoded in, keyed by (data, type)
+        self.candidates = {}
+        self.lock = threading.Lock()
+
+    @property
+    def status(self):
+        if self.barcode is not None:
+            return 'found'
+        if self.frames_processed >= self.max_frames:
+            return 'exhausted'
+        return 'scanning'
+
+    def to_dict(self):
+        return {
+            'session_id': self.session_id,
+            'status': self.status,
+            'frames_processed': self.frames_processed,
+            'max_frames': self.max_frames,
+            'region': list(self.last_region) if self.last_region else None
+        }
+
+class ScanSessionManager:
+    """
+    Multi-frame barcode scanning on top of ProductAnalyzer.
+    Frames are downscaled, the barcode region found in one frame is
+    searched first in the next, and the session stops as soon as a
+    checksum-valid code decodes. Symbologies without a check digit (Code
+    128, QR, ...) only pass a length check, so one misread frame could end
+    the session; they must decode identically in confirm_frames frames.
+    Sessions live in this worker's memory.
+    """
+
+    # Cheap variants for tracked regions; the full five-variant set is never used here
+    ROI_VARIANTS = ('gray', 'clahe')
+    FULL_FRAME_VARIANTS = ('gray',)
+    # validate_barcode_format verifies a check digit for these
+    CHECKSUM_TYPES = ('EAN13', 'EAN8', 'EAN-8', 'UPCA', 'UPC-A', 'UPCE', 'UPC-E')
+
+    def __init__(self, product_analyzer, max_frames=30, frame_max_side=960,
+                 session_ttl=120, max_sessions=1000, full_frame_every=5, confirm_frames=2):
+        self.product_analyzer = product_analyzer
+        self.max_frames = max_frames
+        self.frame_max_side = frame_max_side
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.full_frame_every = full_frame_every
+        self.confirm_frames = confirm_frames
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create_session(self, user_id):
+        """Start a new scan session for a user"""
+        with self._lock:
+            self._expire_sessions()
+            if len(self._sessions) >= self.max_sessions:
+                oldest = min(self._sessions.values(), key=lambda s: s.last_activity)
+                del self._sessions[oldest.session_id]
+            session = BarcodeScanSession(user_id, self.max_frames)
+            self._sessions[session.session_id] = session
+        return session
+
+    def get_session(self, session_id, user_id):
+        """Return the caller's session, or None if unknown, expired or not theirs"""
+        with self._lock:
+            self._expire_sessions()
+            session = self._sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            return None
+        return session
+
+    def close_session(self, session_id, user_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.user_id != user_id:
+                return False
+            del self._sessions[session_id]
+        return True
+
+    def _expire_sessions(self):
+        """Drop idle sessions (lock held)"""
+        now = time.monotonic()
+        expired = [session_id for session_id, session in self._sessions.items()
+                   if now - session.last_activity > self.session_ttl]
+        for session_id in expired:
+            del self._sessions[session_id]
+
+    def _downscale(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.frame_max_side / max(height, width)
+        if scale >= 1.0:
+            return frame
+        return cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    def process_frames(self, session, frames):
+        """Decode frames in order, stopping at the first valid barcode"""
+        with session.lock:
+            for frame in frames:
+                if session.status != 'scanning':
+                    break
+                self._process_frame(session, frame)
+            session.last_activity = time.monotonic()
+        return session
+
+    def _process_frame(self, session, frame):
+        analyzer = self.product_analyzer
+        frame = self._downscale(frame)
+        session.frames_processed += 1
+
+        if len(frame.shape) == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # 1. Region tracked from the previous frame, else a fresh cheap localisation
+        region = session.last_region or analyzer.locate_barcode_region(frame)
+        if region is not None:
+            barcodes = analyzer.detect_and_decode_barcode(
+                frame, roi=region, variants=self.ROI_VARIANTS, stop_on_first=True
+            )
+            if barcodes:
+                return self._found(session, barcodes[0], frame.shape)
+
+            if session.last_region is not None:
+                # Tracked region went stale; re-localise on this frame
+                region = analyzer.locate_barcode_region(frame)
+                if region is not None and region != session.last_region:
+                    barcodes = analyzer.detect_and_decode_barcode(
+                        frame, roi=region, variants=self.ROI_VARIANTS, stop_on_first=True
+                    )
+                    if barcodes:
+                        return self._found(session, barcodes[0], frame.shape)
+            session.last_region = region
+
+        # 2. Occasional single-variant full-frame pass in case localisation misses
+        if region is None or (session.frames_processed - 1) % self.full_frame_every == 0:
+            barcodes = analyzer.detect_and_decode_barcode(
+                frame, variants=self.FULL_FRAME_VARIANTS, stop_on_first=True
+            )
+            if barcodes:
+                return self._found(session, barcodes[0], frame.shape)
+
+        return None
+
+    def _found(self, session, barcode, shape):
+        rect = barcode['rect']
+        session.last_region = self.product_analyzer.expand_region(
+            (rect.left, rect.top, rect.width, rect.height), shape
+        )
+        if barcode['type'] not in self.CHECKSUM_TYPES:
+            key = (barcode['data'], barcode['type'])
+            session.candidates[key] = session.candidates.get(key, 0) + 1
+            if session.candidates[key] < self.confirm_frames:
+                return None
+        session.barcode = barcode
+        return barcode
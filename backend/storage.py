@@ -0,0 +1,44 @@
+"""
+Storage engine selection.
+
+    storage = get_storage('sqlite', 'ecolife_users.db', 'ecolife_community.db')
+    storage = get_storage('memory')
+
+Managers that are built with the same engine and paths share one Storage.
+"""
+import os
+import threading
+from storage_sqlite import SQLiteStorage
+from storage_memory import MemoryStorage
+
+STORAGE_ENGINES = {
+    SQLiteStorage.engine: SQLiteStorage,
+    MemoryStorage.engine: MemoryStorage,
+}
+
+_storages = {}
+_storages_lock = threading.Lock()
+
+def create_storage(engine='sqlite', users_db_path='ecolife_users.db',
+                   community_db_path='ecolife_community.db'):
+    """A new Storage for the named engine"""
+    if engine not in STORAGE_ENGINES:
+        raise ValueError(f"Unknown storage engine: {engine}")
+    if engine == 'sqlite':
+        return SQLiteStorage(users_db_path, community_db_path)
+    return STORAGE_ENGINES[engine]()
+
+def get_storage(engine=None, users_db_path='ecolife_users.db',
+                community_db_path='ecolife_community.db'):
+    """Get or create the shared Storage (engine defaults to $ECOLIFE_STORAGE or sqlite)"""
+    engine = engine or os.environ.get('ECOLIFE_STORAGE', 'sqlite')
+    if engine == 'sqlite':
+        key = (engine, os.path.abspath(users_db_path), os.path.abspath(community_db_path))
+    else:
+        key = (engine,)
+    with _storages_lock:
+        storage = _storages.get(key)
+        if storage is None:
+            storage = create_storage(engine, users_db_path, community_db_path)
+            _storages[key] = storage
+        return storage
@@ -0,0 +1,429 @@
+import threading
+from datetime import datetime
+from center_materials import accepts_mask
+from repositories import (
+    center_dedupe_key, DuplicateRecordError, UserRepository, ScanRepository, AchievementRepository,
+    ChallengeRepository, CenterRepository, TipRepository, Storage
+)
+
+def _now():
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+class MemoryState:
+    """Everything the in-memory engine stores, behind one re-entrant lock"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.users = {}
+        self.user_ids_by_login = {}
+        self.scans = []
+        self.waste_counts = {}
+        self.daily_scores = {}
+        self.achievements = {}
+        self.challenges = {}
+        self.participants = {}
+        self.centers = []
+        self.center_ids_by_key = {}
+        self.centers_version = 0
+        # Change log: center_changes[i] has sequence number center_changes_offset + i + 1
+        self.center_changes = []
+        self.center_changes_offset = 0
+        self.tips = []
+        self.next_user_id = 1
+        self.next_challenge_id = 1
+
+class MemoryUserRepository(UserRepository):
+    def __init__(self, state):
+        self.state = state
+
+    def create(self, username, email, password_hash):
+        with self.state.lock:
+            if username in self.state.user_ids_by_login or email in self.state.user_ids_by_login:
+                raise DuplicateRecordError('username or email already exists')
+            user_id = self.state.next_user_id
+            self.state.next_user_id += 1
+            self.state.users[user_id] = {
+                'username': username,
+                'email': email,
+                'password_hash': password_hash,
+                'total_scans': 0,
+                'recycling_score': 0,
+                'co2_saved': 0.0,
+                'created_at': _now(),
+                'location': None,
+                'location_key': None
+            }
+            self.state.user_ids_by_login[username] = user_id
+            self.state.user_ids_by_login[email] = user_id
+            return user_id
+
+    def find_login(self, identifier):
+        with self.state.lock:
+            user_id = self.state.user_ids_by_login.get(identifier)
+            if user_id is None:
+                return None
+            user = self.state.users[user_id]
+            return (user_id, user['username'], user['password_hash'])
+
+    def replace_password_hash(self, user_id, old_hash, new_hash):
+        with self.state.lock:
+            user = self.state.users.get(user_id)
+            if user is not None and user['password_hash'] == old_hash:
+                user['password_hash'] = new_hash
+
+    def get(self, user_id):
+        with self.state.lock:
+            user = self.state.users.get(user_id)
+            if user is None:
+                return None
+            return {key: value for key, value in user.items() if key != 'password_hash'}
+
+    def _leaderboard_row(self, user_id, user):
+        return {
+            'user_id': user_id,
+            'username': user['username'],
+            'total_scans': user['total_scans'],
+            'recycling_score': user['recycling_score'],
+            'co2_saved': user['co2_saved'],
+            'location': user['location'],
+            'location_key': user['location_key']
+        }
+
+    def set_location(self, user_id, location, location_key):
+        with self.state.lock:
+            user = self.state.users.get(user_id)
+            if user is not None:
+                user['location'] = location
+                user['location_key'] = location_key
+
+    def top_by_location(self, location_key, limit):
+        with self.state.lock:
+            rows = [self._leaderboard_row(user_id, user) for user_id, user in self.state.users.items()
+                    if user['total_scans'] > 0 and user['location_key'] == location_key]
+        rows.sort(key=lambda row: (-row['recycling_score'], row['user_id']))
+        return rows[:limit]
+
+    def leaderboard_version(self):
+        # Memory storage is private to this process, whose scan listener already applies every write
+        return 0
+
+    def location_activity(self, limit):
+        activity = {}
+        with self.state.lock:
+            for user in self.state.users.values():
+                if user['location_key'] is not None and user['total_scans'] > 0:
+                    users, scans = activity.get(user['location_key'], (0, 0))
+                    activity[user['location_key']] = (users + 1, scans + user['total_scans'])
+        rows = [{'location': key, 'users': users, 'total_scans': scans}
+                for key, (users, scans) in activity.items()]
+        rows.sort(key=lambda row: row['total_scans'], reverse=True)
+        return rows[:limit]
+
+    def leaderboard_rows(self, user_ids=None):
+        with self.state.lock:
+            if user_ids is None:
+                user_ids = [user_id for user_id, user in self.state.users.items()
+                            if user['total_scans'] > 0]
+            return [self._leaderboard_row(user_id, self.state.users[user_id])
+                    for user_id in user_ids if user_id in self.state.users]
+
+    def totals(self):
+        with self.state.lock:
+            users = list(self.state.users.values())
+            return {
+                'total_users': len(users),
+                'total_scans': sum(user['total_scans'] for user in users),
+                'co2_saved': sum(user['co2_saved'] for user in users),
+                'avg_score': (sum(user['recycling_score'] for user in users) / len(users)
+                              if users else 0.0)
+            }
+
+class MemoryScanRepository(ScanRepository):
+    def __init__(self, state):
+        self.state = state
+
+    def apply_batch(self, events, achievement_thresholds):
+        awarded = []
+        with self.state.lock:
+            self.state.scans.extend(events)
+            for e in events:
+                counts = self.state.waste_counts.setdefault(e.user_id, {})
+                count, confidence = counts.get(e.waste_type, (0, 0.0))
+                counts[e.waste_type] = (count + 1, confidence + e.confidence)
+
+                day_key = (e.user_id, e.timestamp[:10])
+                score, scans = self.state.daily_scores.get(day_key, (0, 0))
+                self.state.daily_scores[day_key] = (score + int(e.confidence * 10), scans + 1)
+
+                user = self.state.users.get(e.user_id)
+                if user is None:
+                    continue
+                user['total_scans'] += 1
+                user['recycling_score'] += int(e.confidence * 10)
+                for threshold, achievement in achievement_thresholds:
+                    if user['total_scans'] == threshold:
+                        earned = self.state.achievements.setdefault(e.user_id, [])
+                        if all(existing[0] != achievement for existing in earned):
+                            earned.append((achievement, e.timestamp))
+                            awarded.append((e.user_id, achievement))
+        return awarded
+
+    def waste_counts(self, user_id):
+        with self.state.lock:
+            counts = self.state.waste_counts.get(user_id, {})
+            return sorted((waste_type, count) for waste_type, (count, _) in counts.items())
+
+    def summary(self, user_id):
+        with self.state.lock:
+            counts = self.state.waste_counts.get(user_id, {})
+            return [{'waste_type': waste_type, 'count': count, 'confidence': confidence}
+                    for waste_type, (count, confidence) in counts.items()]
+
+    def daily_scores(self, since_day, user_ids=None):
+        wanted = set(user_ids) if user_ids is not None else None
+        with self.state.lock:
+            return [(user_id, day, score, scans)
+                    for (user_id, day), (score, scans) in self.state.daily_scores.items()
+                    if day >= since_day and (wanted is None or user_id in wanted)]
+
+    def global_breakdown(self):
+        totals = {}
+        with self.state.lock:
+            for counts in self.state.waste_counts.values():
+                for waste_type, (count, _) in counts.items():
+                    totals[waste_type] = totals.get(waste_type, 0) + count
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+class MemoryAchievementRepository(AchievementRepository):
+    def __init__(self, state):
+        self.state = state
+
+    def for_user(self, user_id):
+        with self.state.lock:
+            earned = list(self.state.achievements.get(user_id, []))
+        return sorted(earned, key=lambda achievement: achievement[1], reverse=True)
+
+class MemoryChallengeRepository(ChallengeRepository):
+    def __init__(self, state):
+        self.state = state
+
+    def create(self, title, description, target_value, challenge_type,
+               start_date, end_date, reward_points):
+        with self.state.lock:
+            challenge_id = self.state.next_challenge_id
+            self.state.next_challenge_id += 1
+            self.state.challenges[challenge_id] = {
+                'id': challenge_id,
+                'title': title,
+                'description': description,
+                'target_value': target_value,
+                'challenge_type': challenge_type,
+                # Text, as sqlite3 stores datetimes, so both engines list the same JSON
+                'start_date': str(start_date),
+                'end_date': str(end_date),
+                'reward_points': reward_points,
+                'participant_count': 0
+            }
+            return challenge_id
+
+    def active(self):
+        now = _now()
+        with self.state.lock:
+            challenges = [dict(challenge, participants=challenge['participant_count'])
+                          for challenge in self.state.challenges.values()
+                          if challenge['end_date'] > now]
+        return sorted(challenges, key=lambda challenge: challenge['start_date'], reverse=True)
+
+    def join(self, user_id, challenge_id):
+        with self.state.lock:
+            key = (challenge_id, user_id)
+            challenge = self.state.challenges.get(challenge_id)
+            if challenge is None or key in self.state.participants:
+                return False
+            self.state.participants[key] = {'progress': 0, 'completed': False}
+            challenge['participant_count'] += 1
+            return True
+
+    def add_progress(self, user_id, challenge_id, increment):
+        with self.state.lock:
+            participant = self.state.participants.get((challenge_id, user_id))
+            challenge = self.state.challenges.get(challenge_id)
+            if participant is None:
+                return
+            participant['progress'] += increment
+            if challenge and participant['progress'] >= challenge['target_value']:
+                participant['completed'] = True
+
+    def apply_scan_progress(self, increments, challenge_types):
+        now = _now()
+        advanced = 0
+        with self.state.lock:
+            for challenge_id, challenge in self.state.challenges.items():
+                if (challenge['challenge_type'] not in challenge_types
+                        or not challenge['start_date'] <= now < challenge['end_date']):
+                    continue
+                for user_id, amount in increments.items():
+                    participant = self.state.participants.get((challenge_id, user_id))
+                    if participant is None or participant['completed']:
+                        continue
+                    participant['progress'] += amount
+                    participant['completed'] = participant['progress'] >= challenge['target_value']
+                    advanced += 1
+        return advanced
+
+class MemoryCenterRepository(CenterRepository):
+    def __init__(self, state):
+        self.state = state
+
+    def _record(self, name, address, latitude, longitude, accepts_types='',
+                operating_hours=None, contact=None, rating=0.0, verified=True):
+        return {
+            'name': name,
+            'address': address,
+            'latitude': latitude,
+            'longitude': longitude,
+            'accepts_types': accepts_types,
+            'accepts_mask': accepts_mask(accepts_types),
+            'operating_hours': operating_hours,
+            'contact': contact,
+            'rating': rating,
+            'verified': verified
+        }
+
+    def _insert(self, record):
+        """Append a new center (lock held)"""
+        center_id = len(self.state.centers) + 1
+        record['id'] = center_id
+        self.state.centers.append(record)
+        key = center_dedupe_key(record['name'], record['latitude'], record['longitude'])
+        self.state.center_ids_by_key[key] = center_id
+        self.state.center_changes.append(center_id)
+        return center_id
+
+    def add(self, name, address, latitude, longitude, accepts_types='',
+            operating_hours=None, contact=None, rating=0.0, verified=True):
+        record = self._record(name, address, latitude, longitude, accepts_types,
+                              operating_hours, contact, rating, verified)
+        with self.state.lock:
+            if center_dedupe_key(name, latitude, longitude) in self.state.center_ids_by_key:
+                raise DuplicateRecordError('recycling center already exists')
+            center_id = self._insert(record)
+            self.state.centers_version += 1
+            return center_id
+
+    def upsert_many(self, centers, update_existing=True):
+        written = 0
+        with self.state.lock:
+            for center in centers:
+                record = self._record(**center)
+                key = center_dedupe_key(record['name'], record['latitude'], record['longitude'])
+                center_id = self.state.center_ids_by_key.get(key)
+                if center_id is None:
+                    self._insert(record)
+                elif update_existing:
+                    self.state.centers[center_id - 1].update(record)
+                    self.state.center_changes.append(center_id)
+                else:
+                    continue
+                written += 1
+            if written:
+                self.state.centers_version += 1
+        return written
+
+    def version(self):
+        return self.state.centers_version
+
+    def verified_coordinates(self, center_ids=None):
+        with self.state.lock:
+            if center_ids is None:
+                centers = self.state.centers
+            else:
+                centers = [self.state.centers[center_id - 1] for center_id in center_ids
+                           if 0 < center_id <= len(self.state.centers)]
+            return [(center['id'], center['latitude'], center['longitude'], center['accepts_mask'])
+                    for center in centers
+                    if center['verified'] and center['latitude'] is not None
+                    and center['longitude'] is not None]
+
+    def verified_accepts_types(self):
+        with self.state.lock:
+            return [(center['id'], center['accepts_types']) for center in self.state.centers
+                    if center['verified'] and center['latitude'] is not None
+                    and center['longitude'] is not None]
+
+    def change_position(self):
+        with self.state.lock:
+            return self.state.center_changes_offset + len(self.state.center_changes)
+
+    def changes_since(self, position):
+        with self.state.lock:
+            if position < self.state.center_changes_offset:
+                return None
+            start = position - self.state.center_changes_offset
+            return (self.state.center_changes_offset + len(self.state.center_changes),
+                    set(self.state.center_changes[start:]))
+
+    def prune_changes(self, keep):
+        with self.state.lock:
+            drop = max(0, len(self.state.center_changes) - keep)
+            del self.state.center_changes[:drop]
+            self.state.center_changes_offset += drop
+
+    def get_many(self, center_ids):
+        with self.state.lock:
+            centers = [self.state.centers[center_id - 1] for center_id in center_ids
+                       if 0 < center_id <= len(self.state.centers)]
+            return [{key: value for key, value in center.items() if key != 'verified'}
+                    for center in centers]
+
+class MemoryTipRepository(TipRepository):
+    def __init__(self, state):
+        self.state = state
+
+    def add(self, tip_text, category=None, difficulty=None, impact_score=0):
+        with self.state.lock:
+            self.state.tips.append({
+                'id': len(self.state.tips) + 1,
+                'tip_text': tip_text,
+                'category': category,
+                'impact_score': impact_score
+            })
+            return len(self.state.tips)
+
+    def all(self):
+        with self.state.lock:
+            return [dict(tip) for tip in self.state.tips]
+
+    def version(self):
+        # Tips are only ever appended here
+        with self.state.lock:
+            return len(self.state.tips)
+
+class MemoryStorage(Storage):
+    """
+    Process-local engine with the same behaviour as SQLite and no disk I/O,
+    for load tests that want to separate storage cost from compute cost.
+    Nothing survives a restart.
+    """
+
+    engine = 'memory'
+
+    def __init__(self):
+        self.state = MemoryState()
+        super().__init__(
+            users=MemoryUserRepository(self.state),
+            scans=MemoryScanRepository(self.state),
+            achievements=MemoryAchievementRepository(self.state),
+            challenges=MemoryChallengeRepository(self.state),
+            centers=MemoryCenterRepository(self.state),
+            tips=MemoryTipRepository(self.state)
+        )
+
+    def health(self):
+        with self.state.lock:
+            return {
+                'engine': self.engine,
+                'users': len(self.state.users),
+                'scans': len(self.state.scans),
+                'challenges': len(self.state.challenges)
+            }
@@ -0,0 +1,708 @@
+import sqlite3
+from db_connection import get_connection_manager
+from center_materials import accepts_mask
+from migrations import run_migrations, USERS_MIGRATIONS, COMMUNITY_MIGRATIONS
+from repositories import (
+    center_dedupe_key, DuplicateRecordError, UserRepository, ScanRepository, AchievementRepository,
+    ChallengeRepository, CenterRepository, TipRepository, Storage
+)
+
+def init_users_database(db):
+    """Create the users database tables, then apply its migrations"""
+    with db.transaction() as cursor:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                email TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                total_scans INTEGER DEFAULT 0,
+                recycling_score INTEGER DEFAULT 0,
+                co2_saved REAL DEFAULT 0.0,
+                profile_picture TEXT,
+                location TEXT,
+                preferences TEXT
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                waste_type TEXT,
+                confidence REAL,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                image_path TEXT,
+                latitude REAL,
+                longitude REAL,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS achievements (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                achievement_type TEXT,
+                earned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+
+    # Indexes and later schema changes are versioned migrations
+    run_migrations(db, USERS_MIGRATIONS, 'users')
+
+def init_community_database(db):
+    """Create the community database tables, then apply its migrations"""
+    with db.transaction() as cursor:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard (
+                user_id INTEGER PRIMARY KEY,
+                username TEXT,
+                total_scans INTEGER,
+                recycling_score INTEGER,
+                co2_saved REAL,
+                rank INTEGER,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Community challenges
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS challenges (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                description TEXT,
+                target_value INTEGER,
+                challenge_type TEXT,
+                start_date TIMESTAMP,
+                end_date TIMESTAMP,
+                reward_points INTEGER,
+                created_by INTEGER
+            )
+        ''')
+
+        # Challenge participation
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS challenge_participants (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                challenge_id INTEGER,
+                user_id INTEGER,
+                progress INTEGER DEFAULT 0,
+                completed BOOLEAN DEFAULT 0,
+                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (challenge_id) REFERENCES challenges (id)
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS eco_tips (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tip_text TEXT NOT NULL,
+                category TEXT,
+                difficulty TEXT,
+                impact_score INTEGER,
+                likes INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_contributions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                contribution_type TEXT,
+                content TEXT,
+                upvotes INTEGER DEFAULT 0,
+                verified BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS recycling_centers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                address TEXT,
+                latitude REAL,
+                longitude REAL,
+                accepts_types TEXT,
+                operating_hours TEXT,
+                contact TEXT,
+                rating REAL DEFAULT 0.0,
+                verified BOOLEAN DEFAULT 0
+            )
+        ''')
+
+    # Indexes and later schema changes are versioned migrations
+    run_migrations(db, COMMUNITY_MIGRATIONS, 'community')
+
+class SQLiteUserRepository(UserRepository):
+    def __init__(self, db):
+        self.db = db
+
+    def create(self, username, email, password_hash):
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute(
+                    'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
+                    (username, email, password_hash)
+                )
+                return cursor.lastrowid
+        except sqlite3.IntegrityError as e:
+            raise DuplicateRecordError(str(e))
+
+    def find_login(self, identifier):
+        return self.db.connection().execute(
+            'SELECT id, username, password_hash FROM users WHERE username = ? OR email = ?',
+            (identifier, identifier)
+        ).fetchone()
+
+    def replace_password_hash(self, user_id, old_hash, new_hash):
+        with self.db.transaction() as cursor:
+            cursor.execute(
+                'UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?',
+                (new_hash, user_id, old_hash)
+            )
+
+    def get(self, user_id):
+        row = self.db.connection().execute('''
+            SELECT username, email, total_scans, recycling_score,
+                   co2_saved, created_at, location
+            FROM users WHERE id = ?
+        ''', (user_id,)).fetchone()
+        if not row:
+            return None
+        return {
+            'username': row[0],
+            'email': row[1],
+            'total_scans': row[2],
+            'recycling_score': row[3],
+            'co2_saved': row[4],
+            'created_at': row[5],
+            'location': row[6]
+        }
+
+    LEADERBOARD_COLUMNS = 'id, username, total_scans, recycling_score, co2_saved, location, location_key'
+
+    def _leaderboard_rows(self, rows):
+        return [{
+            'user_id': r[0],
+            'username': r[1],
+            'total_scans': r[2],
+            'recycling_score': r[3],
+            'co2_saved': r[4],
+            'location': r[5],
+            'location_key': r[6]
+        } for r in rows]
+
+    def set_location(self, user_id, location, location_key):
+        with self.db.transaction() as cursor:
+            cursor.execute(
+                'UPDATE users SET location = ?, location_key = ? WHERE id = ?',
+                (location, location_key, user_id)
+            )
+
+    def top_by_location(self, location_key, limit):
+        rows = self.db.connection().execute(f'''
+            SELECT {self.LEADERBOARD_COLUMNS}
+            FROM users
+            WHERE location_key = ? AND total_scans > 0
+            ORDER BY recycling_score DESC, id
+            LIMIT ?
+        ''', (location_key, limit)).fetchall()
+        return self._leaderboard_rows(rows)
+
+    def leaderboard_version(self):
+        row = self.db.connection().execute(
+            'SELECT version FROM leaderboard_version WHERE id = 1'
+        ).fetchone()
+        return row[0] if row else 0
+
+    def location_activity(self, limit):
+        rows = self.db.connection().execute('''
+            SELECT location_key, COUNT(*), SUM(total_scans)
+            FROM users
+            WHERE location_key IS NOT NULL AND total_scans > 0
+            GROUP BY location_key
+            ORDER BY SUM(total_scans) DESC
+            LIMIT ?
+        ''', (limit,)).fetchall()
+        return [{'location': r[0], 'users': r[1], 'total_scans': r[2]} for r in rows]
+
+    def leaderboard_rows(self, user_ids=None):
+        query = f'SELECT {self.LEADERBOARD_COLUMNS} FROM users'
+        conn = self.db.connection()
+        if user_ids is None:
+            rows = conn.execute(query + ' WHERE total_scans > 0').fetchall()
+        else:
+            user_ids = list(user_ids)
+            rows = []
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(user_ids), 500):
+                chunk = user_ids[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows.extend(conn.execute(query + f' WHERE id IN ({placeholders})', chunk).fetchall())
+        return self._leaderboard_rows(rows)
+
+    def totals(self):
+        row = self.db.connection().execute('''
+            SELECT
+                COUNT(*) as total_users,
+                SUM(total_scans) as total_scans,
+                SUM(co2_saved) as total_co2_saved,
+                AVG(recycling_score) as avg_score
+            FROM users
+        ''').fetchone()
+        return {
+            'total_users': row[0],
+            'total_scans': row[1] or 0,
+            'co2_saved': row[2] or 0.0,
+            'avg_score': row[3] or 0.0
+        }
+
+class SQLiteScanRepository(ScanRepository):
+    def __init__(self, db):
+        self.db = db
+
+    def apply_batch(self, events, achievement_thresholds):
+        with self.db.transaction() as cursor:
+            cursor.executemany('''
+                INSERT INTO scan_history (user_id, waste_type, confidence, latitude, longitude, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(e.user_id, e.waste_type, e.confidence, e.latitude, e.longitude, e.timestamp)
+                  for e in events])
+
+            # Coalesce counter updates so each user is touched once per batch
+            per_user = {}
+            for e in events:
+                scans, score = per_user.get(e.user_id, (0, 0))
+                per_user[e.user_id] = (scans + 1, score + int(e.confidence * 10))
+
+            cursor.executemany('''
+                UPDATE users
+                SET total_scans = total_scans + ?,
+                    recycling_score = recycling_score + ?
+                WHERE id = ?
+            ''', [(scans, score, user_id) for user_id, (scans, score) in per_user.items()])
+
+            # Per-user waste-type counters, kept in step with scan_history
+            per_type = {}
+            for e in events:
+                key = (e.user_id, e.waste_type)
+                per_type[key] = per_type.get(key, 0) + 1
+
+            cursor.executemany('''
+                INSERT INTO user_waste_counts (user_id, waste_type, scan_count)
+                VALUES (?, ?, ?)
+                ON CONFLICT (user_id, waste_type)
+                DO UPDATE SET scan_count = scan_count + excluded.scan_count
+            ''', [(user_id, waste_type, count) for (user_id, waste_type), count in per_type.items()])
+
+            # Daily score buckets for the windowed leaderboards
+            per_day = {}
+            for e in events:
+                key = (e.user_id, e.timestamp[:10])
+                scans, score = per_day.get(key, (0, 0))
+                per_day[key] = (scans + 1, score + int(e.confidence * 10))
+
+            cursor.executemany('''
+                INSERT INTO user_daily_scores (user_id, day, score, scan_count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (user_id, day)
+                DO UPDATE SET score = score + excluded.score,
+                              scan_count = scan_count + excluded.scan_count
+            ''', [(user_id, day, score, scans) for (user_id, day), (scans, score) in per_day.items()])
+
+            awarded = []
+            for user_id, (scans, _) in per_user.items():
+                awarded.extend(self._award_achievements(cursor, user_id, scans, achievement_thresholds))
+            return awarded
+
+    def _award_achievements(self, cursor, user_id, new_scans, thresholds):
+        """Award achievements crossed by the last new_scans scans"""
+        cursor.execute('SELECT total_scans FROM users WHERE id = ?', (user_id,))
+        row = cursor.fetchone()
+        if not row:
+            return []
+        total_scans = row[0]
+        previous_scans = total_scans - new_scans
+
+        achievements_to_award = [
+            achievement for threshold, achievement in thresholds
+            if previous_scans < threshold <= total_scans
+        ]
+
+        for achievement in achievements_to_award:
+            cursor.execute('''
+                INSERT OR IGNORE INTO achievements (user_id, achievement_type)
+                VALUES (?, ?)
+            ''', (user_id, achievement))
+        return [(user_id, achievement) for achievement in achievements_to_award]
+
+    def waste_counts(self, user_id):
+        return self.db.connection().execute('''
+            SELECT waste_type, scan_count
+            FROM user_waste_counts
+            WHERE user_id = ? AND scan_count > 0
+            ORDER BY waste_type
+        ''', (user_id,)).fetchall()
+
+    def summary(self, user_id):
+        # Compacted scans live on as daily rollups
+        rows = self.db.connection().execute('''
+            SELECT waste_type, SUM(scan_count), SUM(confidence_sum)
+            FROM (
+                SELECT waste_type, scan_count, confidence_sum
+                FROM scan_rollups
+                WHERE user_id = ?
+                UNION ALL
+                SELECT waste_type, COUNT(*), SUM(confidence)
+                FROM scan_history
+                WHERE user_id = ?
+                GROUP BY waste_type
+            )
+            GROUP BY waste_type
+        ''', (user_id, user_id)).fetchall()
+
+        return [{'waste_type': row[0], 'count': row[1], 'confidence': row[2] or 0.0}
+                for row in rows]
+
+    def daily_scores(self, since_day, user_ids=None):
+        query = '''
+            SELECT user_id, day, score, scan_count
+            FROM user_daily_scores
+            WHERE day >= ?
+        '''
+        conn = self.db.connection()
+        if user_ids is None:
+            return conn.execute(query, (since_day,)).fetchall()
+
+        user_ids = list(user_ids)
+        rows = []
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows.extend(conn.execute(
+                query + f' AND user_id IN ({placeholders})', [since_day] + chunk
+            ).fetchall())
+        return rows
+
+    def global_breakdown(self):
+        return self.db.connection().execute('''
+            SELECT waste_type, SUM(count) as count
+            FROM (
+                SELECT waste_type, COUNT(*) as count
+                FROM scan_history
+                GROUP BY waste_type
+                UNION ALL
+                SELECT waste_type, SUM(scan_count)
+                FROM scan_rollups
+                GROUP BY waste_type
+            )
+            GROUP BY waste_type
+            ORDER BY count DESC
+        ''').fetchall()
+
+class SQLiteAchievementRepository(AchievementRepository):
+    def __init__(self, db):
+        self.db = db
+
+    def for_user(self, user_id):
+        return self.db.connection().execute('''
+            SELECT achievement_type, earned_at
+            FROM achievements
+            WHERE user_id = ?
+            ORDER BY earned_at DESC
+        ''', (user_id,)).fetchall()
+
+class SQLiteChallengeRepository(ChallengeRepository):
+    def __init__(self, db):
+        self.db = db
+
+    def create(self, title, description, target_value, challenge_type,
+               start_date, end_date, reward_points):
+        with self.db.transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO challenges
+                (title, description, target_value, challenge_type, start_date, end_date, reward_points)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (title, description, target_value, challenge_type,
+                  start_date, end_date, reward_points))
+            return cursor.lastrowid
+
+    def active(self):
+        results = self.db.connection().execute('''
+            SELECT id, title, description, target_value, challenge_type,
+                   start_date, end_date, reward_points, participant_count
+            FROM challenges
+            WHERE end_date > datetime('now')
+            ORDER BY start_date DESC
+        ''').fetchall()
+
+        return [{
+            'id': r[0],
+            'title': r[1],
+            'description': r[2],
+            'target_value': r[3],
+            'challenge_type': r[4],
+            'start_date': r[5],
+            'end_date': r[6],
+            'reward_points': r[7],
+            'participants': r[8]
+        } for r in results]
+
+    def join(self, user_id, challenge_id):
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute('''
+                    UPDATE challenges SET participant_count = participant_count + 1
+                    WHERE id = ?
+                ''', (challenge_id,))
+                if cursor.rowcount == 0:
+                    return False
+                # A duplicate join rolls the count back with it
+                cursor.execute('''
+                    INSERT INTO challenge_participants (challenge_id, user_id)
+                    VALUES (?, ?)
+                ''', (challenge_id, user_id))
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    def add_progress(self, user_id, challenge_id, increment):
+        with self.db.transaction() as cursor:
+            cursor.execute('''
+                UPDATE challenge_participants
+                SET progress = progress + ?
+                WHERE user_id = ? AND challenge_id = ?
+            ''', (increment, user_id, challenge_id))
+
+            # Check if challenge is completed
+            cursor.execute('''
+                SELECT cp.progress, c.target_value
+                FROM challenge_participants cp
+                JOIN challenges c ON cp.challenge_id = c.id
+                WHERE cp.user_id = ? AND cp.challenge_id = ?
+            ''', (user_id, challenge_id))
+
+            result = cursor.fetchone()
+            if result and result[0] >= result[1]:
+                cursor.execute('''
+                    UPDATE challenge_participants
+                    SET completed = 1
+                    WHERE user_id = ? AND challenge_id = ?
+                ''', (user_id, challenge_id))
+
+    def apply_scan_progress(self, increments, challenge_types):
+        # One statement per distinct increment (most users scan once per batch)
+        # rather than a VALUES list, which SQLite would rescan for every row
+        users_by_amount = {}
+        for user_id, amount in increments.items():
+            users_by_amount.setdefault(amount, []).append(user_id)
+        type_placeholders = ','.join('?' * len(challenge_types))
+        advanced = 0
+        with self.db.transaction() as cursor:
+            for amount, user_ids in users_by_amount.items():
+                for start in range(0, len(user_ids), 500):
+                    chunk = user_ids[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    # SET expressions all see the old row, so completion uses the new progress explicitly
+                    cursor.execute(f'''
+                        UPDATE challenge_participants
+                        SET progress = progress + ?,
+                            completed = progress + ? >= (
+                                SELECT target_value FROM challenges
+                                WHERE challenges.id = challenge_participants.challenge_id
+                            )
+                        WHERE completed = 0
+                          AND user_id IN ({placeholders})
+                          AND challenge_id IN (
+                              SELECT id FROM challenges
+                              WHERE challenge_type IN ({type_placeholders})
+                                AND start_date <= datetime('now') AND end_date > datetime('now')
+                          )
+                    ''', [amount, amount] + chunk + list(challenge_types))
+                    advanced += cursor.rowcount
+        return advanced
+
+class SQLiteCenterRepository(CenterRepository):
+    def __init__(self, db):
+        self.db = db
+
+    COLUMNS = ('name', 'address', 'latitude', 'longitude', 'accepts_types', 'accepts_mask',
+               'operating_hours', 'contact', 'rating', 'verified', 'dedupe_key')
+    INSERT_SQL = (f'INSERT INTO recycling_centers ({", ".join(COLUMNS)}) '
+                  f'VALUES ({", ".join("?" * len(COLUMNS))})')
+
+    def _params(self, name, address, latitude, longitude, accepts_types='',
+                operating_hours=None, contact=None, rating=0.0, verified=True):
+        return (name, address, latitude, longitude, accepts_types, accepts_mask(accepts_types),
+                operating_hours, contact, rating, 1 if verified else 0,
+                center_dedupe_key(name, latitude, longitude))
+
+    def add(self, name, address, latitude, longitude, accepts_types='',
+            operating_hours=None, contact=None, rating=0.0, verified=True):
+        params = self._params(name, address, latitude, longitude, accepts_types,
+                              operating_hours, contact, rating, verified)
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute(self.INSERT_SQL, params)
+                return cursor.lastrowid
+        except sqlite3.IntegrityError as e:
+            raise DuplicateRecordError(str(e))
+
+    def upsert_many(self, centers, update_existing=True):
+        if update_existing:
+            conflict = 'DO UPDATE SET ' + ', '.join(
+                f'{column} = excluded.{column}' for column in self.COLUMNS if column != 'dedupe_key'
+            )
+        else:
+            conflict = 'DO NOTHING'
+        with self.db.transaction() as cursor:
+            cursor.executemany(
+                f'{self.INSERT_SQL} ON CONFLICT (dedupe_key) {conflict}',
+                [self._params(**center) for center in centers]
+            )
+            return cursor.rowcount
+
+    def version(self):
+        row = self.db.connection().execute(
+            'SELECT version FROM recycling_centers_version WHERE id = 1'
+        ).fetchone()
+        return row[0] if row else 0
+
+    VERIFIED_COORDINATES_SQL = '''
+        SELECT id, latitude, longitude, accepts_mask FROM recycling_centers
+        WHERE verified = 1 AND latitude IS NOT NULL AND longitude IS NOT NULL
+    '''
+
+    def verified_coordinates(self, center_ids=None):
+        conn = self.db.connection()
+        if center_ids is None:
+            return conn.execute(self.VERIFIED_COORDINATES_SQL).fetchall()
+
+        center_ids = list(center_ids)
+        rows = []
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(center_ids), 500):
+            chunk = center_ids[start:start + 500]
+            rows.extend(conn.execute(
+                f"{self.VERIFIED_COORDINATES_SQL} AND id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return rows
+
+    def verified_accepts_types(self):
+        return self.db.connection().execute('''
+            SELECT id, accepts_types FROM recycling_centers
+            WHERE verified = 1 AND latitude IS NOT NULL AND longitude IS NOT NULL
+        ''').fetchall()
+
+    def change_position(self):
+        row = self.db.connection().execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'recycling_center_changes'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    def changes_since(self, position):
+        conn = self.db.connection()
+        oldest = conn.execute('SELECT MIN(seq) FROM recycling_center_changes').fetchone()[0]
+        latest = self.change_position()
+        if latest > position and (oldest is None or oldest > position + 1):
+            return None
+        rows = conn.execute(
+            'SELECT DISTINCT center_id FROM recycling_center_changes WHERE seq > ? AND seq <= ?',
+            (position, latest)
+        ).fetchall()
+        return latest, {row[0] for row in rows}
+
+    def prune_changes(self, keep):
+        with self.db.transaction() as cursor:
+            cursor.execute(
+                'DELETE FROM recycling_center_changes WHERE seq <= ?',
+                (self.change_position() - keep,)
+            )
+
+    def get_many(self, center_ids):
+        if not center_ids:
+            return []
+        placeholders = ','.join('?' * len(center_ids))
+        results = self.db.connection().execute(f'''
+            SELECT id, name, address, latitude, longitude, accepts_types,
+                   operating_hours, contact, rating, accepts_mask
+            FROM recycling_centers
+            WHERE id IN ({placeholders})
+        ''', list(center_ids)).fetchall()
+
+        return [{
+            'id': r[0],
+            'name': r[1],
+            'address': r[2],
+            'latitude': r[3],
+            'longitude': r[4],
+            'accepts_types': r[5],
+            'operating_hours': r[6],
+            'contact': r[7],
+            'rating': r[8],
+            'accepts_mask': r[9]
+        } for r in results]
+
+class SQLiteTipRepository(TipRepository):
+    def __init__(self, db):
+        self.db = db
+
+    def add(self, tip_text, category=None, difficulty=None, impact_score=0):
+        with self.db.transaction() as cursor:
+            cursor.execute('''
+                INSERT INTO eco_tips (tip_text, category, difficulty, impact_score)
+                VALUES (?, ?, ?, ?)
+            ''', (tip_text, category, difficulty, impact_score))
+            return cursor.lastrowid
+
+    def all(self):
+        results = self.db.connection().execute('''
+            SELECT id, tip_text, category, impact_score
+            FROM eco_tips
+            ORDER BY id
+        ''').fetchall()
+
+        return [{
+            'id': r[0],
+            'tip_text': r[1],
+            'category': r[2],
+            'impact_score': r[3]
+        } for r in results]
+
+    def version(self):
+        row = self.db.connection().execute(
+            'SELECT version FROM eco_tips_version WHERE id = 1'
+        ).fetchone()
+        return row[0] if row else 0
+
+class SQLiteStorage(Storage):
+    """The original two SQLite files behind the repository interfaces"""
+
+    engine = 'sqlite'
+
+    def __init__(self, users_db_path='ecolife_users.db', community_db_path='ecolife_community.db'):
+        self.users_db = get_connection_manager(users_db_path)
+        self.community_db = get_connection_manager(community_db_path)
+        init_users_database(self.users_db)
+        init_community_database(self.community_db)
+
+        super().__init__(
+            users=SQLiteUserRepository(self.users_db),
+            scans=SQLiteScanRepository(self.users_db),
+            achievements=SQLiteAchievementRepository(self.users_db),
+            challenges=SQLiteChallengeRepository(self.community_db),
+            centers=SQLiteCenterRepository(self.community_db),
+            tips=SQLiteTipRepository(self.community_db)
+        )
+
+    def health(self):
+        return {
+            'engine': self.engine,
+            'users': self.users_db.health_check(),
+            'community': self.community_db.health_check()
+        }
@@ -0,0 +1,109 @@
+import hashlib
+import threading
+import time
+from waste_categories import ECO_TIPS_DATABASE
+from windowed_leaderboard import utc_today
+
+# The built-in tips carry no impact score of their own
+STATIC_TIP_IMPACT = 5
+
+class DailyTipCatalog:
+    """
+    Eco tip of the day.
+    The catalog (eco_tips rows followed by the static ECO_TIPS_DATABASE) is
+    loaded into memory once per UTC day. A category's tip is the entry at
+    an offset derived from a hash of the date and category, so it stays the
+    same all day and across processes. Picks are cached until the date
+    changes, making a request a dictionary lookup. The tips version counter
+    is checked at most every refresh_interval seconds, and the catalog is
+    reloaded as soon as eco_tips changes.
+    """
+
+    def __init__(self, tips, refresh_interval=30.0):
+        self.tips = tips
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._day = None
+        self._version = None
+        self._checked_at = 0.0
+        self._all = []
+        self._by_category = {}
+        self._picks = {}
+        self.loads = 0
+
+    def _load(self, day):
+        """Rebuild the catalog for a new day (lock held)"""
+        # Read the version first so a write during the load triggers another one
+        version = self.tips.version()
+        catalog = []
+        seen = set()
+        for tip in self.tips.all():
+            if tip['tip_text'] not in seen:
+                seen.add(tip['tip_text'])
+                catalog.append({
+                    'tip': tip['tip_text'],
+                    'category': tip['category'],
+                    'impact_score': tip['impact_score']
+                })
+        for category, texts in ECO_TIPS_DATABASE.items():
+            for text in texts:
+                if text not in seen:
+                    seen.add(text)
+                    catalog.append({'tip': text, 'category': category, 'impact_score': STATIC_TIP_IMPACT})
+
+        by_category = {}
+        for tip in catalog:
+            if tip['category']:
+                by_category.setdefault(tip['category'], []).append(tip)
+
+        self._all = catalog
+        self._by_category = by_category
+        self._picks = {}
+        self._day = day
+        self._version = version
+        self._checked_at = time.monotonic()
+        self.loads += 1
+
+    def invalidate(self):
+        """Reload the catalog on the next request, e.g. after writing tips"""
+        self._day = None
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_interval:
+            return
+        self._checked_at = now
+        if self.tips.version() != self._version:
+            self.invalidate()
+
+    def tip_of_the_day(self, category=None, day=None):
+        """Today's tip, from category when it has any tips; None if there are no tips"""
+        day = day or utc_today()
+        self._check_version()
+        picks = self._picks
+        if self._day == day and category in picks:
+            return picks[category]
+
+        with self._lock:
+            if self._day != day:
+                self._load(day)
+            # Unknown categories share the overall pick, which keeps the cache bounded
+            if category not in self._by_category:
+                category = None
+            if category not in self._picks:
+                choices = self._by_category[category] if category else self._all
+                pick = None
+                if choices:
+                    digest = hashlib.sha256(f"{day}:{category or ''}".encode()).digest()
+                    pick = choices[int.from_bytes(digest[:8], 'big') % len(choices)]
+                self._picks[category] = pick
+            return self._picks[category]
+
+    def stats(self):
+        return {
+            'day': self._day,
+            'version': self._version,
+            'tips': len(self._all),
+            'categories': len(self._by_category),
+            'loads': self.loads
+        }
@@ -106,7 +106,7 @@ ECO_TIPS_DATABASE = {
 
 def get_eco_tips(waste_type, confidence):
     """Get dynamic eco tips based on waste type and confidence"""
-    tips = ECO_TIPS_DATABASE.get(waste_type, [])
+    tips = list(ECO_TIPS_DATABASE.get(waste_type, []))
     
     if confidence < 0.7:
         tips.append("Consider taking another photo with better lighting for more accurate classification")
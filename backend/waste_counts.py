@@ -0,0 +1,101 @@
+"""
+Maintenance for the user_waste_counts counters.
+
+The counters are updated in the same transaction as every scan batch;
+these helpers rebuild them from scan_history plus the scan_rollups of
+compacted scans, and check them against both.
+
+    python waste_counts.py check [--user-id N]
+    python waste_counts.py rebuild [--user-id N]
+"""
+import argparse
+
+def _history_counts_sql(user_filter):
+    """Per user/waste_type scan totals over raw scans and rollups"""
+    condition = f"{user_filter} {'AND' if user_filter else 'WHERE'} user_id IS NOT NULL AND waste_type IS NOT NULL"
+    return f'''
+        SELECT user_id, waste_type, SUM(scan_count) FROM (
+            SELECT user_id, waste_type, COUNT(*) as scan_count FROM scan_history
+            {condition}
+            GROUP BY user_id, waste_type
+            UNION ALL
+            SELECT user_id, waste_type, scan_count FROM scan_rollups
+            {user_filter}
+        )
+        GROUP BY user_id, waste_type
+    '''
+
+def rebuild_waste_counts(db, user_id=None):
+    """Recompute counters from scan history (one user or everyone); returns rows written"""
+    user_filter = 'WHERE user_id = ?' if user_id is not None else ''
+    params = (user_id,) if user_id is not None else ()
+
+    conn = db.connection()
+    cursor = conn.cursor()
+    # IMMEDIATE so the scan writer cannot slip a batch in between delete and insert
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        cursor.execute(f'DELETE FROM user_waste_counts {user_filter}', params)
+        cursor.execute(
+            'INSERT INTO user_waste_counts (user_id, waste_type, scan_count) '
+            + _history_counts_sql(user_filter),
+            params * 2
+        )
+        written = cursor.rowcount
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return written
+
+def check_waste_counts(db, user_id=None):
+    """Compare counters with scan history; returns a list of mismatches"""
+    user_filter = 'WHERE user_id = ?' if user_id is not None else ''
+    params = (user_id,) if user_id is not None else ()
+
+    conn = db.connection()
+    history = {
+        (row[0], row[1]): row[2]
+        for row in conn.execute(_history_counts_sql(user_filter), params * 2)
+    }
+    counters = {
+        (row[0], row[1]): row[2] for row in conn.execute(f'''
+            SELECT user_id, waste_type, scan_count FROM user_waste_counts {user_filter}
+        ''', params)
+    }
+
+    mismatches = []
+    for key in sorted(set(history) | set(counters), key=str):
+        expected, actual = history.get(key, 0), counters.get(key, 0)
+        if expected != actual:
+            mismatches.append({
+                'user_id': key[0],
+                'waste_type': key[1],
+                'history_count': expected,
+                'counter': actual
+            })
+    return mismatches
+
+if __name__ == "__main__":
+    from auth_manager import get_auth_manager
+
+    parser = argparse.ArgumentParser(description='Check or rebuild per-user waste-type counters')
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    parser.add_argument('--user-id', type=int)
+    args = parser.parse_args()
+
+    auth = get_auth_manager()
+    # Make sure queued scans are in scan_history before comparing
+    auth.scan_recorder.flush()
+
+    if args.command == 'rebuild':
+        written = rebuild_waste_counts(auth.storage.users_db, args.user_id)
+        print(f"Rebuilt {written} counter rows")
+    else:
+        mismatches = check_waste_counts(auth.storage.users_db, args.user_id)
+        for mismatch in mismatches:
+            print(f"user {mismatch['user_id']} {mismatch['waste_type']}: "
+                  f"history={mismatch['history_count']} counter={mismatch['counter']}")
+        print(f"{len(mismatches)} mismatched counters")
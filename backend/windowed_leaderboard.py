@@ -0,0 +1,137 @@
+import threading
+from datetime import datetime, timedelta
+from leaderboard_index import LeaderboardIndex
+
+def utc_today():
+    return datetime.utcnow().strftime('%Y-%m-%d')
+
+def days_before(day, days):
+    return (datetime.strptime(day, '%Y-%m-%d') - timedelta(days=days)).strftime('%Y-%m-%d')
+
+class WindowedLeaderboard:
+    """
+    Sliding N-day leaderboard built from daily per-user score buckets.
+    Buckets for the days inside the window are held in memory; each user's
+    window total lives in a LeaderboardIndex. New buckets are rolled in as
+    scans commit and the oldest day is rolled out when the UTC date
+    changes, re-ranking only the users who had scores that day. Top-N
+    lists are cached until the next change or day boundary.
+    """
+
+    def __init__(self, days, top_cache_size=8):
+        self.days = days
+        self.top_cache_size = top_cache_size
+        self.index = LeaderboardIndex()
+        self._lock = threading.RLock()
+        self._buckets = {}
+        self._user_days = {}
+        self._users = {}
+        self._top_cache = {}
+        self.current_day = None
+        self.rollovers = 0
+
+    def first_day(self, today=None):
+        """Oldest day inside the window ending today"""
+        return days_before(today or utc_today(), self.days - 1)
+
+    def load(self, buckets, user_rows, today=None):
+        """Replace the contents; buckets are (user_id, day, score, scan_count)"""
+        with self._lock:
+            self._buckets = {}
+            self._user_days = {}
+            self._users = {row['user_id']: row for row in user_rows}
+            self.current_day = today or utc_today()
+            self._set_buckets(buckets)
+            self.index.load([row for row in map(self._window_row, self._user_days) if row])
+            self._top_cache.clear()
+
+    def apply(self, buckets, user_rows, today=None):
+        """Roll in fresh absolute bucket values for the users in a committed batch"""
+        with self._lock:
+            self._roll(today or utc_today())
+            for row in user_rows:
+                self._users[row['user_id']] = row
+            changed = self._set_buckets(buckets)
+            for user_id in changed:
+                self._reindex(user_id)
+            if changed:
+                self._top_cache.clear()
+
+    def _set_buckets(self, buckets):
+        first_day = self.first_day(self.current_day)
+        changed = set()
+        for user_id, day, score, scans in buckets:
+            if day < first_day or day > self.current_day:
+                continue
+            self._buckets.setdefault(day, {})[user_id] = (score, scans)
+            self._user_days.setdefault(user_id, set()).add(day)
+            changed.add(user_id)
+        return changed
+
+    def _window_row(self, user_id):
+        days = self._user_days.get(user_id)
+        user = self._users.get(user_id)
+        if not days or user is None:
+            return None
+        score = scans = 0
+        for day in days:
+            day_score, day_scans = self._buckets[day][user_id]
+            score += day_score
+            scans += day_scans
+        return {
+            'user_id': user_id,
+            'username': user['username'],
+            'total_scans': scans,
+            'recycling_score': score,
+            'co2_saved': user['co2_saved']
+        }
+
+    def _reindex(self, user_id):
+        row = self._window_row(user_id)
+        self.index.update(row or {'user_id': user_id, 'total_scans': 0, 'recycling_score': 0})
+
+    def _roll(self, today):
+        """Drop the days that have left the window"""
+        if today == self.current_day:
+            return
+        self.current_day = today
+        first_day = self.first_day(today)
+        expired = [day for day in self._buckets if day < first_day]
+        affected = set()
+        for day in expired:
+            for user_id in self._buckets.pop(day):
+                self._user_days[user_id].discard(day)
+                affected.add(user_id)
+        for user_id in affected:
+            if not self._user_days[user_id]:
+                del self._user_days[user_id]
+                self._users.pop(user_id, None)
+            self._reindex(user_id)
+        self._top_cache.clear()
+        self.rollovers += 1
+
+    def top(self, limit, today=None):
+        with self._lock:
+            self._roll(today or utc_today())
+            cached = self._top_cache.get(limit)
+            if cached is None:
+                cached = self.index.top(limit)
+                if len(self._top_cache) >= self.top_cache_size:
+                    self._top_cache.clear()
+                self._top_cache[limit] = cached
+            return cached
+
+    def around(self, user_id, radius=5, today=None):
+        with self._lock:
+            self._roll(today or utc_today())
+            return self.index.around(user_id, radius)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'days': self.days,
+                'current_day': self.current_day,
+                'buckets': len(self._buckets),
+                'ranked_users': len(self.index),
+                'rollovers': self.rollovers
+            }